@@ -0,0 +1,321 @@
+"""取得したレスポンスを保存する追記専用のアーカイブ。
+
+レスポンスは WARC 形式のレコード (1レコード = 1つの gzip メンバー) としてセグメント
+ファイル ``<書き込み元>-NNNNN.warc.gz`` に追記し、URL のハッシュからセグメント内の
+位置を引く固定長の索引 ``<書き込み元>.idx`` を併せて書き出す。書き込み元は実行ごと
+(プロセスごと) に分かれるため、複数のプロセスが同じディレクトリへ同時に書き込める。
+読み出し時は索引とセグメントを mmap で開き、同じ URL は後に保存したものを使う。
+
+本文は Content-Encoding を復号した状態で保存する (Content-Encoding / Transfer-Encoding
+ヘッダは保存しない)。受信を途中で打ち切った本文は WARC-Truncated を付けて保存する。
+"""
+
+from __future__ import annotations
+
+import glob
+import gzip
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.client import responses as REASONS
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+from ratelimit import AdaptiveRateLimiter
+
+# 索引の1エントリ: URLのハッシュ, セグメント番号, レコードの位置, レコードの長さ
+INDEX_ENTRY = struct.Struct("<8sIQI")
+# 保存しないヘッダ (本文は復号済みで、長さは保存時に付け直す)
+DROPPED_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+def url_key(url: str) -> bytes:
+    """索引に使う URL のハッシュを返す。"""
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+
+
+class ArchivedResponse(NamedTuple):
+    """アーカイブから読み出したレスポンス。"""
+
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    date: str
+    # 受信を途中で打ち切った本文 (WARC-Truncated)
+    truncated: bool = False
+
+
+def _load_index(path: str) -> Iterator[Tuple[bytes, int, int, int]]:
+    """索引ファイルのエントリを順に返す。書き込み途中の末尾は無視する。"""
+    size = os.path.getsize(path)
+    usable = size - size % INDEX_ENTRY.size
+    if not usable:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield from INDEX_ENTRY.iter_unpack(mm[:usable])
+
+
+def _writer_prefixes(directory: str) -> List[str]:
+    """書き込み元の名前を古い順に返す。"""
+    return sorted(os.path.basename(path)[: -len(".idx")] for path in glob.glob(os.path.join(directory, "*.idx")))
+
+
+def _segment_path(directory: str, prefix: str, number: int) -> str:
+    return os.path.join(directory, f"{prefix}-{number:05d}.warc.gz")
+
+
+def encode_record(url: str, status: int, headers, body: bytes, truncated: bool = False) -> bytes:
+    """レスポンスを WARC の response レコードにして gzip で圧縮する。
+
+    ``truncated`` なら本文を途中で打ち切ったことを WARC-Truncated に記録する。
+    """
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}".rstrip()]
+    for name, value in (headers or {}).items():
+        if name.lower() not in DROPPED_HEADERS:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    block = ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8") + body
+    warc_headers = [
+        "WARC/1.1",
+        "WARC-Type: response",
+        f"WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>",
+        f"WARC-Date: {datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}",
+        f"WARC-Target-URI: {url}",
+        "Content-Type: application/http;msgtype=response",
+        f"Content-Length: {len(block)}",
+    ]
+    if truncated:
+        warc_headers.append("WARC-Truncated: length")
+    record = ("\r\n".join(warc_headers) + "\r\n\r\n").encode("utf-8") + block + b"\r\n\r\n"
+    return gzip.compress(record, compresslevel=6)
+
+
+def decode_record(data: bytes) -> ArchivedResponse:
+    """gzip で圧縮された WARC の response レコードを読み出す。"""
+    record = gzip.decompress(data)
+    warc_head, _, rest = record.partition(b"\r\n\r\n")
+    warc = _parse_headers(warc_head.decode("utf-8").split("\r\n")[1:])
+    block = rest[: int(warc["Content-Length"])]
+    http_head, _, body = block.partition(b"\r\n\r\n")
+    status_line, *header_lines = http_head.decode("utf-8").split("\r\n")
+    headers = _parse_headers(header_lines)
+    headers.pop("Content-Length", None)
+    return ArchivedResponse(
+        url=warc["WARC-Target-URI"],
+        status=int(status_line.split()[1]),
+        headers=headers,
+        body=body,
+        date=warc.get("WARC-Date", ""),
+        truncated="WARC-Truncated" in warc,
+    )
+
+
+def _parse_headers(lines: List[str]) -> Dict[str, str]:
+    headers: Dict[str, str] = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        headers[name.strip()] = value.strip()
+    return headers
+
+
+class ArchiveWriter:
+    """レスポンスをセグメントに追記し、索引を書き出すライター。スレッド間で共有できる。
+
+    セグメントが ``segment_bytes`` を超えると次のセグメントに切り替える。
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 256 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.prefix = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{os.getpid()}"
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.stats = {"records": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        # 既存の書き込み元を含め、保存済みの URL
+        self._keys: Set[bytes] = {
+            key for prefix in _writer_prefixes(directory)
+            for key, _, _, _ in _load_index(os.path.join(directory, f"{prefix}.idx"))
+        }
+        self._segment_number = 0
+        self._segment = open(_segment_path(directory, self.prefix, 0), "ab")
+        self._index = open(os.path.join(directory, f"{self.prefix}.idx"), "ab")
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._keys
+
+    def record(self, url: str, status: int, headers, body: bytes, truncated: bool = False) -> None:
+        """レスポンスを1件保存する。``truncated`` なら途中で打ち切った本文。"""
+        data = encode_record(url, status, headers, body, truncated)
+        key = url_key(url)
+        with self._lock:
+            if self._segment.tell() and self._segment.tell() + len(data) > self.segment_bytes:
+                self._rotate()
+            offset = self._segment.tell()
+            self._segment.write(data)
+            # 索引から参照される時点でレコードが読めるよう、先にセグメントを書き出す
+            self._segment.flush()
+            self._index.write(INDEX_ENTRY.pack(key, self._segment_number, offset, len(data)))
+            self._index.flush()
+            self._keys.add(key)
+            self.stats["records"] += 1
+            self.stats["bytes"] += len(data)
+
+    def _rotate(self) -> None:
+        self._sync(self._segment)
+        self._segment.close()
+        self._segment_number += 1
+        self._segment = open(_segment_path(self.directory, self.prefix, self._segment_number), "ab")
+
+    @staticmethod
+    def _sync(f) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment.closed:
+                return
+            for f in (self._segment, self._index):
+                self._sync(f)
+                f.close()
+
+
+class ArchiveReader:
+    """アーカイブを mmap で開き、URL からレスポンスを読み出すリーダー。スレッド間で共有できる。"""
+
+    def __init__(self, directory: str):
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"アーカイブが見つかりません: {directory}")
+        self.directory = directory
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._prefixes = _writer_prefixes(directory)
+        # URL のハッシュ → (書き込み元の番号, セグメント番号, 位置, 長さ)。後に保存したものを優先する
+        self._entries: Dict[bytes, Tuple[int, int, int, int]] = {}
+        for i, prefix in enumerate(self._prefixes):
+            for key, segment, offset, length in _load_index(os.path.join(directory, f"{prefix}.idx")):
+                self._entries[key] = (i, segment, offset, length)
+        self._lock = threading.Lock()
+        self._maps: Dict[Tuple[int, int], mmap.mmap] = {}
+        self._files = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url_key(url) in self._entries
+
+    def _segment(self, writer: int, segment: int) -> Optional[mmap.mmap]:
+        with self._lock:
+            mm = self._maps.get((writer, segment))
+            if mm is None:
+                path = _segment_path(self.directory, self._prefixes[writer], segment)
+                if not os.path.exists(path) or not os.path.getsize(path):
+                    return None
+                f = open(path, "rb")
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._files.append(f)
+                self._maps[(writer, segment)] = mm
+            return mm
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        """URL の最新のレスポンスを返す。保存されていなければ None。"""
+        entry = self._entries.get(url_key(url))
+        if entry is None:
+            return None
+        writer, segment, offset, length = entry
+        mm = self._segment(writer, segment)
+        if mm is None or offset + length > len(mm):
+            self.logger.warning("アーカイブのレコードが欠けています url=%s", url)
+            return None
+        response = decode_record(mm[offset:offset + length])
+        if response.url != url:
+            # ハッシュの衝突
+            return None
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            for mm in self._maps.values():
+                mm.close()
+            for f in self._files:
+                f.close()
+            self._maps.clear()
+            self._files.clear()
+
+
+class ReplayRateLimiter(AdaptiveRateLimiter):
+    """待機を行わないレートリミッタ (アーカイブからの再抽出用)。"""
+
+    def __init__(self) -> None:
+        super().__init__(initial_rate=1, min_rate=1, max_rate=1)
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        yield
+
+    def record(self, url: str, status: Optional[int], latency: float) -> None:
+        pass
+
+    def block(self, url: str, seconds: float) -> None:
+        pass
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {}
+
+
+class ArchiveSession:
+    """``HttpSession`` の代わりにアーカイブからレスポンスを返すセッション。通信は行わない。
+
+    アーカイブにない URL は 404 として返す。途中で打ち切って保存された本文はそのまま返し、
+    打ち切った位置より後ろの項目は抽出できないため警告する。
+    """
+
+    def __init__(self, reader: ArchiveReader):
+        self.reader = reader
+        self.cache = None
+        self.archive = None
+        self.rate_limiter = ReplayRateLimiter()
+        self.stats = http_client.ConnectionStats()
+        self.misses = 0
+        self.truncated = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """アーカイブから URL のレスポンスを返す。"""
+        self.stats.record_request()
+        archived = self.reader.get(url)
+        response = requests.Response()
+        response.url = url
+        # iter_content で保存済みの本文を返す
+        response._content_consumed = True
+        if archived is None:
+            self.misses += 1
+            self.logger.debug("アーカイブに保存されていません url=%s", url)
+            response.status_code = 404
+            response.reason = "Not Archived"
+            response._content = b""
+            return response
+        if archived.truncated:
+            self.truncated += 1
+            self.logger.warning(
+                "途中で打ち切って保存された本文です。打ち切った位置より後ろの項目は抽出できません url=%s", url
+            )
+        response.status_code = archived.status
+        response.reason = REASONS.get(archived.status, "")
+        response.headers = CaseInsensitiveDict(archived.headers)
+        response._content = archived.body
+        return response
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1 @@
+"""保存済みフィクスチャを使ったオフラインのベンチマーク。"""
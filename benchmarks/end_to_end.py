@@ -0,0 +1,160 @@
+"""ローカルのフィクスチャサーバーに対して実際の scrape を実行し、処理性能を計測する。
+
+ネットワークに接続せずに、ページ/秒・求人/秒・ピークメモリ・1ページあたりの
+解析時間を出力する。``--save`` で結果を保存し、``--compare`` で保存済みの結果と
+比較すると、許容範囲を超えて悪化した項目があれば終了コード 1 で終わる。
+
+実行例:
+    python -m benchmarks.end_to_end --pages 5 --workers 4 --latency 20
+    python -m benchmarks.end_to_end --save baseline.json
+    python -m benchmarks.end_to_end --compare baseline.json --tolerance 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+import config
+import http_client
+import metrics
+from benchmarks.fixture_server import FixtureServer
+from main import SCRAPER_CLASSES, create_parse_pool
+from ratelimit import AdaptiveRateLimiter
+
+# 値が大きいほど良い項目と、小さいほど良い項目
+HIGHER_IS_BETTER = ("pages_per_sec", "items_per_sec")
+LOWER_IS_BETTER = ("peak_memory_mb", "parse_ms_per_page")
+
+
+def configure(rate: float) -> None:
+    """アクセス速度の制御をベンチマーク向けに緩める (計測対象はクローラ自身の処理)。"""
+    config.RETRY_BACKOFF_BASE = 0.01
+    config.RETRY_BACKOFF_MAX = 0.1
+    config.RATE_LIMIT_INITIAL = rate
+    config.RATE_LIMIT_MAX = rate
+
+
+def run_site(
+    server: FixtureServer,
+    site: str,
+    workers: int,
+    rate: float,
+    parse_pool=None,
+    trace_memory: bool = False,
+) -> Dict[str, float]:
+    """1サイト分の scrape を最後まで実行し、計測結果を返す。"""
+    site_config = dict(config.SITE_CONFIGS[site], **server.site_urls(site))
+    limiter = AdaptiveRateLimiter(
+        initial_rate=rate, min_rate=rate / 10, max_rate=rate, burst=workers, max_concurrency=workers
+    )
+    session = http_client.HttpSession(cache=None, rate_limiter=limiter)
+    scraper = SCRAPER_CLASSES[site](site, site_config, max_workers=workers, session=session, parse_pool=parse_pool)
+
+    recorder = metrics.enable()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    items = sum(1 for _ in scraper.scrape(start_page=1, max_items=None))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    if trace_memory:
+        tracemalloc.stop()
+    metrics.disable()
+    session.close()
+
+    summary = recorder.summary()
+    parse = summary["phases"].get("parse", {})
+    extract = summary["phases"].get("extract", {})
+    pool = summary["phases"].get("pool", {})
+    return {
+        "pages": summary["pages"],
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(summary["pages"] / elapsed, 3),
+        "items_per_sec": round(items / elapsed, 3),
+        "peak_memory_mb": round(peak / 2**20, 2),
+        # 一覧・詳細を問わず、HTML 1ページあたりの解析時間
+        "parse_ms_per_page": round(parse.get("mean", 0) * 1000, 2),
+        "extract_ms_per_item": round(extract.get("sum", 0) * 1000 / max(items, 1), 2),
+        # --parse-processes を指定した場合の、プロセスプールでの解析と抽出 (受け渡しを含む)
+        "pool_ms_per_item": round(pool.get("sum", 0) * 1000 / max(items, 1), 2),
+    }
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """基準の結果より ``tolerance`` の割合を超えて悪化した項目を返す。"""
+    regressions = []
+    for site, current in results.items():
+        previous = baseline.get(site)
+        if not previous:
+            continue
+        for key in HIGHER_IS_BETTER:
+            if previous.get(key) and current[key] < previous[key] * (1 - tolerance):
+                regressions.append(f"{site} {key}: {previous[key]} -> {current[key]}")
+        for key in LOWER_IS_BETTER:
+            if previous.get(key) and current[key] > previous[key] * (1 + tolerance):
+                regressions.append(f"{site} {key}: {previous[key]} -> {current[key]}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="フィクスチャサーバーに対して scrape を実行し、処理性能を計測します。")
+    parser.add_argument("--sites", nargs="+", default=list(SCRAPER_CLASSES), help="計測するサイト")
+    parser.add_argument("--pages", type=int, default=3, help="一覧ページ数 (1ページ30件)")
+    parser.add_argument("--workers", type=int, default=1, help="詳細ページを並列取得するワーカー数")
+    parser.add_argument("--parse-processes", type=int, default=0, help="詳細ページの解析を行うプロセス数")
+    parser.add_argument("--latency", type=float, default=0.0, help="1応答あたりの遅延 (ミリ秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="503 を返す割合 (0〜1)")
+    parser.add_argument("--rate", type=float, default=1000.0, help="ホストごとのアクセス速度の上限 (リクエスト/秒)")
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc によるピークメモリの計測を省略します")
+    parser.add_argument("--save", metavar="PATH", help="結果をJSONで保存します")
+    parser.add_argument("--compare", metavar="PATH", help="保存済みの結果と比較します")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="悪化とみなす変化の割合")
+    args = parser.parse_args(argv)
+
+    # 注入したエラーによる再試行の警告は表示しない
+    logging.basicConfig(level=logging.ERROR)
+    configure(args.rate)
+    parse_pool = create_parse_pool(args.parse_processes)
+    results: Dict[str, Dict[str, float]] = {}
+    try:
+        with FixtureServer(args.pages, args.latency / 1000, args.error_rate) as server:
+            for site in args.sites:
+                results[site] = run_site(server, site, args.workers, args.rate, parse_pool)
+                if not args.no_memory:
+                    # tracemalloc は処理速度を落とすため、メモリは別の実行で計測する
+                    memory = run_site(server, site, args.workers, args.rate, parse_pool, trace_memory=True)
+                    results[site]["peak_memory_mb"] = memory["peak_memory_mb"]
+            print(f"server: {server.requests} requests, {server.errors} injected errors")
+    finally:
+        if parse_pool:
+            parse_pool.shutdown()
+
+    print(f"{'site':<12}{'pages':>7}{'items':>7}{'sec':>8}{'pages/s':>9}{'items/s':>9}{'peak MB':>9}{'parse ms/pg':>13}{'extract ms/item':>17}{'pool ms/item':>14}")
+    for site, r in results.items():
+        print(
+            f"{site:<12}{r['pages']:>7.0f}{r['items']:>7}{r['seconds']:>8.2f}{r['pages_per_sec']:>9.2f}"
+            f"{r['items_per_sec']:>9.1f}{r['peak_memory_mb']:>9.2f}{r['parse_ms_per_page']:>13.2f}"
+            f"{r['extract_ms_per_item']:>17.2f}{r['pool_ms_per_item']:>14.2f}"
+        )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""EXTRACTION_TARGETS の抽出について、旧実装と ExtractionPlan の結果と1件あたりの処理時間を比較する。
+
+kyujinbox は一覧ページの求人カードごと、01intern は詳細ページごとに計測する。
+
+実行例:
+    python -m benchmarks.extraction_plan --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+from bs4 import BeautifulSoup
+
+import config
+from extraction_plan import ExtractionPlan
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_parse_dl_tags(section_div: BeautifulSoup) -> Dict[str, str]:
+    """dl ごとに dt / dd を検索する旧実装 (比較用)。"""
+    details: Dict[str, str] = {}
+    if not section_div:
+        return details
+    for dl in section_div.find_all("dl"):
+        dt = dl.find("dt")
+        dd = dl.find("dd")
+        if dt:
+            key = dt.text.strip()
+            value = " ".join(dd.text.strip().split()) if dd else "N/A"
+            details[key] = value
+    return details
+
+
+def legacy_intern_detail(soup: BeautifulSoup, targets: Dict) -> Dict[str, str]:
+    """対象ごとに文書全体を検索する 01intern の旧実装 (比較用)。"""
+    details: Dict[str, str] = {}
+    for key, target in targets.items():
+        if "tag" in target and "class" in target:
+            elem = soup.find(target["tag"], class_=target.get("class"))
+            details[key] = elem.get_text(separator=" ", strip=True) if elem else "N/A"
+        elif "div_class" in target:
+            section_div = soup.find("div", class_=target["div_class"])
+            details.update(legacy_parse_dl_tags(section_div))
+    return details
+
+
+def legacy_kyujinbox_card(job_card: BeautifulSoup, targets: Dict) -> Dict[str, str]:
+    """対象ごとにカード全体を検索する kyujinbox の旧実装 (比較用)。"""
+    details: Dict[str, str] = {}
+    for key, target in targets.items():
+        elem = job_card.find(target["tag"], class_=target.get("class"))
+        details[key] = elem.get_text(separator=" ", strip=True) if elem else "N/A"
+    source_elem = job_card.find("div", class_="p-result_source")
+    if source_elem:
+        details["掲載元"] = source_elem.get_text(separator=" ", strip=True)
+    return details
+
+
+def measure(func: Callable, items: List, repeat: int) -> float:
+    """1件あたりの平均処理時間 (ミリ秒) を返す。"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(items))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="EXTRACTION_TARGETS の抽出の旧実装と抽出プランを比較します。")
+    parser.add_argument("--repeat", type=int, default=10, help="抽出を繰り返す回数")
+    parser.add_argument("--parser", default="lxml", help="BeautifulSoup のパーサ")
+    args = parser.parse_args()
+
+    def load(name: str) -> BeautifulSoup:
+        with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+            return BeautifulSoup(f.read(), args.parser)
+
+    intern = config.SITE_CONFIGS["01intern"]
+    kyujinbox = config.SITE_CONFIGS["kyujinbox"]
+    intern_targets = intern["EXTRACTION_TARGETS"]
+    kyujinbox_targets = kyujinbox["EXTRACTION_TARGETS"]
+    intern_plan = ExtractionPlan(intern_targets)
+    kyujinbox_plan = ExtractionPlan(
+        dict(kyujinbox_targets, 掲載元={"tag": "div", "class": "p-result_source", "optional": True})
+    )
+
+    cases = [
+        (
+            "01intern detail",
+            [load("01intern_detail.html")],
+            lambda soup: legacy_intern_detail(soup, intern_targets),
+            intern_plan.extract,
+        ),
+        (
+            "kyujinbox card",
+            load("kyujinbox_list.html").find_all(kyujinbox["JOB_CARD_TAG"], class_=kyujinbox["JOB_CARD_CLASS"]),
+            lambda card: legacy_kyujinbox_card(card, kyujinbox_targets),
+            kyujinbox_plan.extract,
+        ),
+    ]
+
+    mismatches = 0
+    print(f"{'case':<18}{'items':>6}{'legacy ms':>11}{'plan ms':>10}{'speedup':>9}{'match':>7}")
+    for name, items, legacy, plan in cases:
+        match = all(legacy(item) == plan(item) and list(legacy(item)) == list(plan(item)) for item in items)
+        mismatches += not match
+        legacy_ms = measure(legacy, items, args.repeat)
+        plan_ms = measure(plan, items, args.repeat)
+        print(
+            f"{name:<18}{len(items):>6}{legacy_ms:>11.3f}{plan_ms:>10.3f}"
+            f"{legacy_ms / plan_ms:>8.1f}x{'ok' if match else 'NG':>7}"
+        )
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""保存済みフィクスチャを配信するローカルHTTPサーバー (ベンチマーク用のサイトの代役)。
+
+一覧ページは指定したページ数分を同じフィクスチャから生成し、求人カードのリンクを
+ページごとに一意なURLへ書き換える。kyujinbox の掲載元 (外部ホスト) へのリンクは
+ローカルのホスト名 (127.0.0.1 / localhost) に振り分け、ホストごとのアクセス制御も
+実際に近い形で動くようにする。応答には遅延とエラー (503) を注入できる。
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+ITEMS_PER_PAGE = 30
+# 外部ホストの代わりに使うホスト名 (どちらもループバックに解決される)
+LOCAL_HOSTS = ("127.0.0.1", "localhost")
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    """クライアントが途中で切断した場合 (受信の打ち切りなど) のエラーを出力しないサーバー。"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError, ConnectionAbortedError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FixtureServer:
+    """01intern と kyujinbox の一覧・詳細・外部ページを配信するサーバー。
+
+    ``latency`` は1応答あたりの遅延 (秒)、``error_rate`` は 503 を返す割合。
+    """
+
+    def __init__(self, pages: int = 3, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._intern_list = _read("01intern_list.html")
+        self._intern_detail = _read("01intern_detail.html").encode("utf-8")
+        self._kyujinbox_list = _read("kyujinbox_list.html")
+        self._externals: List[bytes] = [
+            _read(os.path.basename(path)).encode("utf-8")
+            for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "kyujinbox_external*.html")))
+        ]
+        self._external_hosts: Dict[str, str] = {}
+        self._server: Optional[_QuietHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def site_urls(self, site: str) -> Dict[str, str]:
+        """サイト設定の BASE_URL / TARGET_URL を返す。"""
+        base_url = f"http://127.0.0.1:{self.port}"
+        if site == "01intern":
+            return {"BASE_URL": base_url, "TARGET_URL": f"{base_url}/01intern/job/list.html?jobTypes=1"}
+        return {"BASE_URL": base_url, "TARGET_URL": f"{base_url}/kyujinbox/list"}
+
+    def start(self) -> "FixtureServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self) -> None:
+                server._handle(self)
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        self._server = _QuietHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FixtureServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+    def _local_host(self, host: str) -> str:
+        with self._lock:
+            if host not in self._external_hosts:
+                self._external_hosts[host] = LOCAL_HOSTS[len(self._external_hosts) % len(LOCAL_HOSTS)]
+            return self._external_hosts[host]
+
+    def _total_text(self, html: str, pattern: str) -> str:
+        total = f"{self.pages * ITEMS_PER_PAGE:,}"
+        return re.sub(pattern, lambda m: f"{m.group(1)}{total}件", html, count=1)
+
+    def intern_list(self, page: int) -> bytes:
+        html = self._total_text(self._intern_list, r'(class="i-recruitment-title">[^<\d]*)[\d,]+件')
+        html = re.sub(r'href="/job/(\d+)\.html"', lambda m: f'href="/01intern/job/p{page}-{m.group(1)}.html"', html)
+        return html.encode("utf-8")
+
+    def kyujinbox_list(self, page: int) -> bytes:
+        html = self._total_text(self._kyujinbox_list, r'(class="p-resultArea_num">[^<\d]*)[\d,]+件')
+
+        def rewrite(match: "re.Match[str]") -> str:
+            host = self._local_host(match.group(1))
+            return f'href="http://{host}:{self.port}/ext/{match.group(1)}/p{page}-{match.group(2)}"'
+
+        html = re.sub(r'href="https?://([^/"]+)/jobs/(\d+)"', rewrite, html)
+        return html.encode("utf-8")
+
+    def external(self, job_id: str) -> bytes:
+        number = int(re.sub(r"\D", "", job_id) or 0)
+        return self._externals[number % len(self._externals)]
+
+    def _route(self, path: str, query: Dict[str, List[str]]) -> Optional[bytes]:
+        if path == "/01intern/job/list.html":
+            return self.intern_list(int(query.get("page", ["1"])[0]))
+        if path.startswith("/01intern/job/"):
+            return self._intern_detail
+        if path == "/kyujinbox/list":
+            return self.kyujinbox_list(int(query.get("pg", ["1"])[0]))
+        if path.startswith("/ext/"):
+            return self.external(path.rsplit("/", 1)[-1])
+        return None
+
+    def _handle(self, handler: BaseHTTPRequestHandler) -> None:
+        url = urlsplit(handler.path)
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        body = None if fail else self._route(url.path, parse_qs(url.query))
+        if fail:
+            handler.send_response(503)
+            handler.send_header("Retry-After", "0")
+        elif body is None:
+            handler.send_response(404)
+        else:
+            handler.send_response(200)
+            handler.send_header("Content-Type", "text/html; charset=utf-8")
+        body = body or b""
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
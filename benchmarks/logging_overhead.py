@@ -0,0 +1,83 @@
+"""ログを出力するスレッドの待ち時間を、同期出力とキュー経由の出力 (DEBUG ログの件数制限の有無) で比較する。
+
+詳細ページの取得と同じように複数のスレッドから URL 付きの DEBUG / INFO ログを出力し、
+1件あたりの出力時間 (ログを出力したスレッドでの所要時間) と、すべてのログが
+ファイルに書き込まれるまでの時間を計測する。ログファイルは一時ディレクトリに出力する。
+
+実行例:
+    python -m benchmarks.logging_overhead --threads 8 --records 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+import logging_config
+
+# (名前, キュー経由, DEBUG ログの1秒あたりの上限)
+MODES = [
+    ("sync", False, None),
+    ("queued", True, None),
+    ("queued+rate", True, 20),
+]
+
+
+def emit(records: int, thread_index: int) -> None:
+    """1スレッド分のログを出力する (取得1回あたりのログを模したもの)。"""
+    logger = logging.getLogger("benchmark")
+    for i in range(records):
+        url = f"https://host{thread_index % 4}.example.com/job/{i}.html"
+        logger.debug("HTTPリクエストを送信します url=%s attempt=%d", url, 1)
+        logger.debug("HTTPレスポンスを受信しました status_code=%s url=%s", 200, url)
+        if i % 10 == 0:
+            logger.info("求人カードを処理しました url=%s", url)
+
+
+def run(mode: str, queued: bool, debug_rate: Optional[int], threads: int, records: int, log_format: str) -> Dict[str, float]:
+    logging_config.setup_logging(
+        log_level="DEBUG", enable_console=False, queued=queued, log_format=log_format, debug_rate=debug_rate
+    )
+    workers = [threading.Thread(target=emit, args=(records, i)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    emitted = time.perf_counter() - start
+    logging_config.stop_logging()
+    drained = time.perf_counter() - start
+    total = threads * records * 2.1
+    return {"mode": mode, "emit_us": emitted * 1e6 / total, "emit_s": emitted, "drain_s": drained}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同期出力とキュー経由の出力で、ログを出力するスレッドの待ち時間を比較します。")
+    parser.add_argument("--threads", type=int, default=8, help="ログを出力するスレッド数")
+    parser.add_argument("--records", type=int, default=5000, help="1スレッドあたりの取得回数 (取得1回あたり約2件のログ)")
+    parser.add_argument("--format", choices=logging_config.LOG_FORMATS, default="text", help="ログの形式")
+    args = parser.parse_args()
+
+    results: List[Dict[str, float]] = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            for mode, queued, debug_rate in MODES:
+                results.append(run(mode, queued, debug_rate, args.threads, args.records, args.format))
+        finally:
+            logging.getLogger().handlers.clear()
+            os.chdir(cwd)
+
+    print(f"{'mode':<14}{'emit us/rec':>12}{'emit s':>9}{'drain s':>9}")
+    for row in results:
+        print(f"{row['mode']:<14}{row['emit_us']:>12.2f}{row['emit_s']:>9.2f}{row['drain_s']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""保存済みフィクスチャでパーサバックエンドごとの1ページあたりの解析時間を比較する。
+
+実行例:
+    python -m benchmarks.parser_backends --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+import config
+import utils
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+PARSERS = ["html.parser", "lxml", "html5lib"]
+
+# (フィクスチャ, サイト名, 一覧ページかどうか)
+FIXTURES: List[Tuple[str, str, bool]] = [
+    ("01intern_list.html", "01intern", True),
+    ("01intern_detail.html", "01intern", False),
+    ("kyujinbox_list.html", "kyujinbox", True),
+    ("kyujinbox_external.html", "kyujinbox", False),
+]
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def listing_strainer(site_name: str) -> SoupStrainer:
+    site_config = config.SITE_CONFIGS[site_name]
+    return utils.make_strainer([
+        (site_config["JOB_CARD_TAG"], site_config["JOB_CARD_CLASS"]),
+        (site_config["TOTAL_COUNT_TAG"], site_config["TOTAL_COUNT_CLASS"]),
+    ])
+
+
+def time_parse(html: str, parser: str, parse_only: Optional[SoupStrainer], repeat: int) -> Tuple[float, BeautifulSoup]:
+    """1回あたりの解析時間 (ミリ秒) と最後に生成したツリーを返す。"""
+    soup = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        soup = BeautifulSoup(html, parser, parse_only=parse_only)
+    return (time.perf_counter() - start) * 1000 / repeat, soup
+
+
+def count_cards(soup: BeautifulSoup, site_name: str) -> int:
+    site_config = config.SITE_CONFIGS[site_name]
+    return len(soup.find_all(site_config["JOB_CARD_TAG"], class_=site_config["JOB_CARD_CLASS"]))
+
+
+def run(repeat: int) -> List[Dict[str, object]]:
+    rows: List[Dict[str, object]] = []
+    available = [p for p in PARSERS if builder_registry.lookup(p) is not None]
+    for fixture, site_name, is_listing in FIXTURES:
+        html = load_fixture(fixture)
+        modes = [("full", None)]
+        if is_listing:
+            modes.append(("strained", listing_strainer(site_name)))
+        for parser in available:
+            for mode, strainer in modes:
+                # html5lib は parse_only に対応していない
+                if strainer is not None and parser == "html5lib":
+                    continue
+                ms, soup = time_parse(html, parser, strainer, repeat)
+                rows.append({
+                    "fixture": fixture,
+                    "parser": parser,
+                    "mode": mode,
+                    "ms_per_page": ms,
+                    "cards": count_cards(soup, site_name) if is_listing else None,
+                })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="パーサバックエンドごとの解析時間を比較します。")
+    parser.add_argument("--repeat", type=int, default=10, help="1フィクスチャあたりの解析回数")
+    args = parser.parse_args()
+
+    rows = run(args.repeat)
+    print(f"{'fixture':<26}{'parser':<13}{'mode':<10}{'ms/page':>10}{'cards':>7}")
+    for row in rows:
+        cards = "" if row["cards"] is None else row["cards"]
+        print(f"{row['fixture']:<26}{row['parser']:<13}{row['mode']:<10}{row['ms_per_page']:>10.2f}{cards:>7}")
+
+
+if __name__ == "__main__":
+    main()
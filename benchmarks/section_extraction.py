@@ -0,0 +1,90 @@
+"""外部詳細ページの見出し抽出について、旧実装と SectionExtractor の結果と処理時間を比較する。
+
+実行例:
+    python -m benchmarks.section_extraction --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, Optional
+
+from bs4 import BeautifulSoup
+
+import config
+from section_extractor import SectionExtractor
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def legacy_extract(soup: BeautifulSoup, rules: Optional[Dict] = None) -> Dict[str, str]:
+    """見出しタグとルールの組ごとに文書全体を検索する旧実装 (比較用)。"""
+    result = {}
+    targets = rules or {}
+    heading_tags = ["h1", "h2", "h3", "h4", "dt", "th", "strong", "p", "div"]
+
+    for out_key, keywords in targets.items():
+        heading = None
+        for tag in heading_tags:
+            heading = soup.find(tag, string=lambda s: s and any(k in s for k in keywords))
+            if heading:
+                break
+        if not heading:
+            continue
+
+        content = None
+        for finder in [
+            lambda h: h.find_next(["p", "ul", "ol", "section"]),
+            lambda h: h.find_parent().find_next(["p", "ul", "ol", "section"]) if h.find_parent() else None,
+            lambda h: h.find_next("div"),
+        ]:
+            content = finder(heading)
+            if content and content.get_text(strip=True):
+                break
+
+        if content:
+            result[out_key] = content.get_text(separator=" ", strip=True)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="見出し抽出の旧実装と新実装を比較します。")
+    parser.add_argument("--repeat", type=int, default=10, help="1フィクスチャあたりの抽出回数")
+    parser.add_argument("--parser", default="lxml", help="BeautifulSoup のパーサ")
+    args = parser.parse_args()
+
+    rules = config.SITE_CONFIGS["kyujinbox"]["EXTERNAL_SECTION_RULES"]
+    extractor = SectionExtractor(rules)
+    mismatches = 0
+
+    print(f"{'fixture':<36}{'legacy ms':>10}{'new ms':>10}{'match':>7}")
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "kyujinbox_external*.html"))):
+        with open(path, encoding="utf-8") as f:
+            soup = BeautifulSoup(f.read(), args.parser)
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = legacy_extract(soup, rules)
+        legacy_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            actual = extractor.extract(soup)
+        new_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+        match = actual == expected
+        mismatches += not match
+        print(f"{os.path.basename(path):<36}{legacy_ms:>10.2f}{new_ms:>10.2f}{'ok' if match else 'NG':>7}")
+        if not match:
+            print(f"  legacy: {expected}\n  new:    {actual}")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""外部詳細ページの受信を途中で打ち切る場合について、全体を受信した場合と抽出結果・受信量・処理時間を比較する。
+
+フィクスチャをチャンクに分けて SectionStreamScanner に渡し、すべての見出しと本文が
+揃った時点で打ち切った本文から抽出する。本文は utils.parse_html と同じく UTF-8 として
+解釈する (文字の途中で打ち切った場合も文字コードの判定が変わらないように)。
+``kyujinbox_external_priority.html`` は打ち切った後ろに優先度の高い見出しがある場合、
+``kyujinbox_external_h1.html`` は最優先の見出しで打ち切れる場合のフィクスチャ。
+
+実行例:
+    python -m benchmarks.streaming_fetch --chunk-bytes 4096 --repeat 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, Tuple
+
+from bs4 import BeautifulSoup
+
+import config
+from section_extractor import SectionExtractor, SectionStreamScanner
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def parse(body: bytes, parser: str) -> BeautifulSoup:
+    return BeautifulSoup(str(body, "utf-8", errors="replace"), parser)
+
+
+def extract_full(extractor: SectionExtractor, body: bytes, parser: str) -> Dict[str, str]:
+    """本文全体を解析して抽出する (比較用)。"""
+    return extractor.extract(parse(body, parser))
+
+
+def extract_streaming(
+    extractor: SectionExtractor, body: bytes, parser: str, chunk_bytes: int
+) -> Tuple[Dict[str, str], int]:
+    """チャンクごとに受信したものとして打ち切りを判定し、(抽出結果, 受信したバイト数) を返す。"""
+    scanner = SectionStreamScanner(extractor)
+    received = len(body)
+    for offset in range(0, len(body), chunk_bytes):
+        if scanner.feed_bytes(body[offset:offset + chunk_bytes]):
+            received = min(offset + chunk_bytes, len(body))
+            break
+    return extractor.extract(parse(body[:received], parser)), received
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="外部詳細ページの受信の打ち切りの有無で抽出結果と受信量を比較します。")
+    parser.add_argument("--chunk-bytes", type=int, default=getattr(config, "STREAM_CHUNK_BYTES", 16 * 1024),
+                        help="受信するチャンクのサイズ")
+    parser.add_argument("--repeat", type=int, default=10, help="1フィクスチャあたりの抽出回数")
+    parser.add_argument("--parser", default="lxml", help="BeautifulSoup のパーサ")
+    args = parser.parse_args()
+
+    extractor = SectionExtractor(config.SITE_CONFIGS["kyujinbox"]["EXTERNAL_SECTION_RULES"])
+    mismatches = 0
+    total = received_total = 0
+
+    print(f"{'fixture':<36}{'bytes':>8}{'received':>10}{'full ms':>9}{'stream ms':>11}{'match':>7}")
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "kyujinbox_external*.html"))):
+        with open(path, "rb") as f:
+            body = f.read()
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = extract_full(extractor, body, args.parser)
+        full_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            actual, received = extract_streaming(extractor, body, args.parser, args.chunk_bytes)
+        stream_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+        match = actual == expected
+        mismatches += not match
+        total += len(body)
+        received_total += received
+        print(
+            f"{os.path.basename(path):<36}{len(body):>8}{received:>10}{full_ms:>9.2f}{stream_ms:>11.2f}"
+            f"{'ok' if match else 'NG':>7}"
+        )
+        if not match:
+            print(f"  full:      {expected}\n  streaming: {actual}")
+
+    print(f"受信量: {received_total} / {total} バイト ({total - received_total} バイト削減)")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
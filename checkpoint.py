@@ -0,0 +1,133 @@
+"""途中再開のためにページの進捗と取得済みURLを記録するチェックポイントストア。"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional, Set
+
+
+class CheckpointState(NamedTuple):
+    """サイトごとの再開情報。"""
+
+    output_path: str
+    last_completed_page: int
+    rows_written: int
+
+
+class CheckpointStore:
+    """SQLiteにサイトごとの進捗と取得済みの求人URLを保存する。
+
+    取得済みURLはメモリ上の集合でも保持し、O(1)で判定する。
+    ``mark_done`` / ``mark_page_done`` はバッファされ、``commit`` で書き込まれる。
+    結果ファイルをフラッシュした直後に ``commit`` することで、
+    ファイルに書かれていない求人を取得済みとして記録しないようにする。
+    """
+
+    def __init__(self, path: str, site: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.site = site
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                site TEXT PRIMARY KEY,
+                output_path TEXT NOT NULL,
+                last_completed_page INTEGER NOT NULL DEFAULT 0,
+                rows_written INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS done_urls (
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (site, url)
+            );
+            """
+        )
+        self._conn.commit()
+        self._done: Set[str] = set()
+        self._pending_urls: List[str] = []
+        self._pending_page: Optional[int] = None
+        self._rows_written = 0
+
+    def load(self) -> Optional[CheckpointState]:
+        """保存済みの再開情報を読み込み、取得済みURLの集合を復元する。"""
+        row = self._conn.execute(
+            "SELECT output_path, last_completed_page, rows_written FROM runs WHERE site = ?",
+            (self.site,),
+        ).fetchone()
+        if row is None:
+            return None
+        state = CheckpointState(*row)
+        self._done = {
+            url for (url,) in self._conn.execute(
+                "SELECT url FROM done_urls WHERE site = ?", (self.site,)
+            )
+        }
+        self._rows_written = state.rows_written
+        self.logger.debug("チェックポイントを読み込みました urls=%d state=%s", len(self._done), state)
+        return state
+
+    def start_run(self, output_path: str) -> None:
+        """新しい実行としてサイトの進捗を初期化する。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM done_urls WHERE site = ?", (self.site,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (site, output_path, last_completed_page, rows_written, updated_at)"
+                " VALUES (?, ?, 0, 0, ?)",
+                (self.site, output_path, time.time()),
+            )
+            self._conn.commit()
+            self._done.clear()
+            self._pending_urls.clear()
+            self._pending_page = None
+            self._rows_written = 0
+
+    def is_done(self, url: str) -> bool:
+        """求人URLが取得済みかどうかを返す。"""
+        return url in self._done
+
+    def mark_done(self, url: str) -> None:
+        with self._lock:
+            if url not in self._done:
+                self._done.add(url)
+                self._pending_urls.append(url)
+
+    def mark_page_done(self, page: int) -> None:
+        with self._lock:
+            self._pending_page = page
+
+    def commit(self, rows_written: Optional[int] = None) -> None:
+        """バッファされた進捗をSQLiteへ書き込む。"""
+        with self._lock:
+            if rows_written is not None:
+                self._rows_written = rows_written
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO done_urls (site, url) VALUES (?, ?)",
+                [(self.site, url) for url in self._pending_urls],
+            )
+            if self._pending_page is not None:
+                self._conn.execute(
+                    "UPDATE runs SET last_completed_page = MAX(last_completed_page, ?) WHERE site = ?",
+                    (self._pending_page, self.site),
+                )
+            self._conn.execute(
+                "UPDATE runs SET rows_written = ?, updated_at = ? WHERE site = ?",
+                (self._rows_written, time.time(), self.site),
+            )
+            self._conn.commit()
+            self._pending_urls.clear()
+            self._pending_page = None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -6,6 +6,12 @@ SITE_CONFIGS = {
         "BASE_URL": "https://01intern.com",
         "TARGET_URL": "https://01intern.com/job/list.html?jobTypes=1",
         "ITEMS_PER_PAGE": 30,
+        # HTMLパーサ ("html.parser", "lxml", "html5lib")。未インストールなら html.parser
+        "PARSER": "lxml",
+        # 一覧ページは求人カードと総件数の要素だけを解析する
+        "PARTIAL_PARSE": True,
+        "TOTAL_COUNT_TAG": "p",
+        "TOTAL_COUNT_CLASS": "i-recruitment-title",
         "JOB_CARD_TAG": "section",
         "JOB_CARD_CLASS": "i-job-item",
         "DETAIL_URL_TAG": "a",
@@ -15,13 +21,34 @@ SITE_CONFIGS = {
             "募集要項": {"div_class": "l-job-requirements"},
             "会社概要": {"div_class": "l-job-profile"},
         },
-        # 任意: CSVに常に含めたい列（不足時はN/A）
-        "REQUIRED_FIELDS": ["会社名", "募集要項", "会社概要"],
+        # CSVの列（不足時はN/A）。列にない項目は <CSV>.extra.jsonl に保存される
+        # div_class の対象は配下の dt の見出しを項目名として出力するため、列も dt の見出しで指定する
+        "REQUIRED_FIELDS": [
+            "会社名",
+            # 募集要項 (l-job-requirements)
+            "仕事内容", "応募資格", "勤務地", "給与", "勤務時間", "福利厚生", "選考フロー",
+            # 会社概要 (l-job-profile)
+            "設立", "代表者", "所在地", "従業員数", "事業内容",
+            "求人URL",
+        ],
+        # --discover で一覧ページの代わりに詳細ページのURLを列挙するサイトマップ・RSS/Atom フィード
+        "DISCOVERY": {
+            "SITEMAPS": ["https://01intern.com/sitemap.xml"],
+            "FEEDS": [],
+            # 詳細ページとみなすURL (正規表現)
+            "URL_PATTERN": r"/job/\d+\.html$",
+            # 更新日時がこの日数より前のURLは取得しない (None で制限しない)
+            "MAX_AGE_DAYS": None,
+        },
     },
     "kyujinbox": {
         "BASE_URL": "https://xn--pckua2a7gp15o89zb.com",
         "TARGET_URL": "https://xn--pckua2a7gp15o89zb.com/%E3%82%A4%E3%83%B3%E3%82%B5%E3%82%A4%E3%83%89%E3%82%BB%E3%83%BC%E3%83%AB%E3%82%B9%E3%81%AE%E4%BB%95%E4%BA%8B",
         "ITEMS_PER_PAGE": 30,
+        "PARSER": "lxml",
+        "PARTIAL_PARSE": True,
+        "TOTAL_COUNT_TAG": "div",
+        "TOTAL_COUNT_CLASS": "p-resultArea_num",
         "JOB_CARD_TAG": "section",
         "JOB_CARD_CLASS": "p-result_card",
         "DETAIL_URL_TAG": "a",
@@ -42,6 +69,8 @@ SITE_CONFIGS = {
             "仕事内容": ["仕事内容", "業務内容", "仕事の内容", "業務詳細", "業務内容・仕事の特色"],
             "対象となる方": ["対象となる方", "応募資格", "求める人物像", "求める人材", "応募要件", "必須条件"],
         },
+        # 重複カードの判定で完全一致を求める項目 (同じ求人の掲載はこれらが一致する)
+        "DEDUP_EXACT_FIELDS": ["会社名", "勤務地", "給与", "雇用形態", "掲載元"],
     },
 }
 
@@ -51,5 +80,126 @@ MIN_INTERVAL = 1
 MAX_INTERVAL = 5
 MAX_ITEMS = 100
 
+# 詳細ページを並列取得するワーカー数 (1で逐次実行)
+DETAIL_WORKERS = 1
+# 詳細ページのHTML解析・抽出を行うプロセス数 (0でスレッド内で解析)
+PARSE_PROCESSES = 0
+# メモリ上限 (MB)。指定するとメモリ上限付きで実行し、解析木を使い終わった時点で解放して
+# ページごとのピークメモリを報告する (tracemalloc で計測するため解析は遅くなる)。None で無効
+MEMORY_BUDGET_MB = None
+# 重複カードの検出 (kyujinbox)。DEDUP_EXACT_FIELDS が一致し、カードの項目と正規化した詳細URLの
+# SimHash のハミング距離が DEDUP_MAX_DISTANCE 以下のカードは、外部ページを取得せず先に取得した結果を使う
+DEDUP_ENABLED = True
+DEDUP_MAX_DISTANCE = 6
+# 詳細URLの正規化で取り除くクエリパラメータ (* を含むパターンも可)
+DEDUP_IGNORED_PARAMS = ["utm_*"]
+# 外部詳細ページ (kyujinbox) を少しずつ受信して逐次解析し、EXTERNAL_SECTION_RULES のすべての項目の
+# 最優先の見出し (h1) と本文を受信した時点か、EXTERNAL_STREAM_MAX_BYTES に達した時点で受信を打ち切る
+# (h2 以下の見出しは後ろに h1 の見出しがあれば採用されないため、打ち切りの判定には使わない)
+# レスポンスをアーカイブする場合は、後から抽出ルールを追加して再抽出できるよう見出しでは打ち切らず
+# 逐次解析も行わない (EXTERNAL_STREAM_MAX_BYTES の上限のみ適用する)
+EXTERNAL_STREAMING = True
+EXTERNAL_STREAM_MAX_BYTES = 1024 * 1024
+# 本文を少しずつ受信するときのチャンクのサイズ (バイト)
+STREAM_CHUNK_BYTES = 16 * 1024
+# --discover で列挙したURLを更新日時の新しい順に並べ替える単位 (件数) と、サイトマップインデックスをたどる深さ
+DISCOVERY_PRIORITY_WINDOW = 1000
+DISCOVERY_MAX_DEPTH = 3
+# 詳細ページの処理中に先読みしておく一覧ページ数 (0で先読みしない)
+LISTING_PREFETCH = 1
+# 同一ホストへの同時接続数の上限
+PER_HOST_CONCURRENCY = 1
+
+# --- アクセス速度の自動調整 (ホストごとのトークンバケット + AIMD) ---
+# 初期速度 (リクエスト/秒)。MIN_INTERVAL〜MAX_INTERVAL の平均間隔に相当
+RATE_LIMIT_INITIAL = 2 / (MIN_INTERVAL + MAX_INTERVAL)
+# 速度の下限と上限 (上限は MIN_INTERVAL 秒に1回)
+RATE_LIMIT_MIN = 1 / 30
+RATE_LIMIT_MAX = 1 / MIN_INTERVAL if MIN_INTERVAL > 0 else 100
+# 連続して送れるリクエスト数
+RATE_LIMIT_BURST = 1
+# 正常な応答ごとに上げる速度 (リクエスト/秒) と、エラー時に掛ける減速率
+RATE_LIMIT_INCREASE = 0.05
+RATE_LIMIT_DECREASE = 0.5
+# これより遅い応答は過負荷の兆候として減速する (秒)
+RATE_LIMIT_LATENCY_TARGET = 2.0
+
+# 429/5xx・通信エラー時の再試行回数と、指数バックオフの基準・上限秒数
+MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 1.0
+RETRY_BACKOFF_MAX = 60.0
+
+# --- HTTP接続プール設定 ---
+# 接続プールを保持するホスト数
+HTTP_POOL_CONNECTIONS = 20
+# ホストごとに保持するKeep-Alive接続数
+HTTP_POOL_MAXSIZE = 10
+# ホスト個別のプールサイズ (例: {"01intern.com": 4})
+HTTP_POOL_MAXSIZE_BY_HOST = {}
+
+# --- レスポンスキャッシュ設定 ---
+CACHE_ENABLED = True
+CACHE_PATH = "cache/http_cache.sqlite3"
+# 再検証なしでキャッシュを使う秒数 (0で毎回条件付きリクエストにより再検証)
+CACHE_TTL = 0
+# キャッシュの最大サイズ (バイト, 圧縮後)。超過分は最終アクセスが古い順に削除する
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# 結果ファイルをフラッシュする間隔 (件数) と、ディスクへ同期 (fsync) する間隔 (件数)
+WRITER_FLUSH_EVERY = 10
+WRITER_FSYNC_EVERY = 100
+# 結果ファイルの形式 (csv / jsonl / jsonl.gz / jsonl.zst / parquet)。
+# jsonl.zst は zstandard、parquet は pyarrow のインストールが必要
+OUTPUT_FORMAT = "csv"
+# Parquet 形式で辞書エンコードする列 (値の種類が少なく同じ値が繰り返される項目)
+PARQUET_DICTIONARY_FIELDS = ["勤務地", "雇用形態", "掲載元"]
+# Parquet 形式で1つのパートファイルに書く最大件数。パートは閉じるまで読み出せないため、
+# 途中で停止した場合はこの件数ごとに書き出したパートまでが残る (再開時はその続きから取得する)
+PARQUET_ROWS_PER_PART = 100_000
+
+# 取得したレスポンスを保存するアーカイブ (WARC 形式のセグメントとURLの索引)。
+# --reextract で指定すると、通信を行わずに抽出し直せる。古いセグメントは自動で削除せず、
+# 本文はレスポンスキャッシュとも重なるため、既定では保存しない (--archive で有効)
+ARCHIVE_ENABLED = False
+ARCHIVE_PATH = "archive"
+# セグメントファイルを切り替えるサイズ (バイト, 圧縮後)
+ARCHIVE_SEGMENT_BYTES = 256 * 1024 * 1024
+
+# 途中再開用のチェックポイント (ページの進捗と取得済みURL) の保存先
+CHECKPOINT_PATH = "state/checkpoint.sqlite3"
+
+# 差分モード (--incremental) で使う求人インデックスの保存先
+POSTING_INDEX_PATH = "state/posting_index.sqlite3"
+# 差分モードで新規・変更のないページが何ページ続いたら巡回を打ち切るか (None で打ち切らない)
+INCREMENTAL_STOP_AFTER_PAGES = 3
+
+# 分散実行 (--coordinator / --worker) のタスクキュー
+# WORKQUEUE_URL を指定すると --serve-queue で公開したキューにHTTPで接続する（例: "http://192.168.0.10:8765"）
+WORKQUEUE_PATH = "state/workqueue.sqlite3"
+WORKQUEUE_URL = None
+# タスクのリース期間（秒）。期限内に完了しなければ別のワーカーが再試行する
+WORKQUEUE_LEASE_SECONDS = 120
+# タスクの最大試行回数
+WORKQUEUE_MAX_ATTEMPTS = 3
+# コーディネーターが先行して投入する一覧ページ数
+WORKQUEUE_LISTING_WINDOW = 3
+# キューをポーリングする間隔（秒）
+WORKQUEUE_POLL_INTERVAL = 1.0
+# タスクがない状態が続いたらワーカーを終了するまでの秒数（None で終了しない）
+WORKQUEUE_IDLE_TIMEOUT = None
+
+# フェーズごとの所要時間・転送量を計測して METRICS_DIR に保存する (--metrics でも有効化)
+METRICS_ENABLED = False
+METRICS_DIR = "output"
+
+# 複数サイトを並行実行するときに全体の進捗をログに出力する間隔（秒）
+PROGRESS_INTERVAL = 30
+
 # ログ出力のデフォルトレベル
 LOG_LEVEL = "INFO"
+# ログの書き込みをバックグラウンドのスレッドで行う (ログを出力したスレッドを待たせない)
+LOG_QUEUED = True
+# ログの形式 ("text" / "json"。json は1行1レコードの JSON、--log-format で上書き可)
+LOG_FORMAT = "text"
+# 同じメッセージ・ホストの DEBUG ログを1秒あたりに出力する上限 (None で制限しない)
+LOG_DEBUG_RATE = 20
@@ -0,0 +1,175 @@
+"""求人カードの SimHash による重複 (ほぼ同一の求人) の検出。
+
+アグリゲーターの一覧には同じ求人が掲載元・URL を変えて何度も現れるため、カードの
+項目と正規化した詳細URLから SimHash を作り、``exact_fields`` (会社名・給与・掲載元
+など) が一致するカードの中でハミング距離が ``max_distance`` 以下のものを重複とみなす。
+重複と判定したカードは、最初に現れたカード (代表) の取得結果を使い回す。
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+BITS = 64
+# 項目の値をこの文字数ごとに区切って特徴量にする
+SHINGLE_SIZE = 3
+
+
+def normalize_text(text: str) -> str:
+    """全角・半角と空白の違いを吸収した文字列を返す。"""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def normalize_url(url: str, ignored_params: Iterable[str] = ()) -> str:
+    """ホスト名の大文字小文字・既定のポート・フラグメント・クエリの順序の違いを除いたURLを返す。
+
+    ``ignored_params`` に一致するクエリパラメータ (``utm_*`` のようなパターンも可) は取り除く。
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    ignored = list(ignored_params)
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not any(fnmatch.fnmatchcase(name, pattern) for pattern in ignored)
+    )
+    return urlunsplit((scheme, host, parts.path.rstrip("/") or "/", urlencode(query), ""))
+
+
+def _hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def card_features(fields: Dict[str, str], url: str) -> List[str]:
+    """カードの項目ごとの部分文字列と、正規化したURLの要素を特徴量として返す。"""
+    features: List[str] = []
+    for key, value in fields.items():
+        value = normalize_text(value)
+        if len(value) <= SHINGLE_SIZE:
+            features.append(f"{key}\0{value}")
+            continue
+        features.extend(f"{key}\0{value[i:i + SHINGLE_SIZE]}" for i in range(len(value) - SHINGLE_SIZE + 1))
+    parts = urlsplit(url)
+    features.append(f"url\0{parts.netloc}")
+    features.extend(f"url\0{segment}" for segment in parts.path.split("/") if segment)
+    features.extend(f"url\0{pair}" for pair in parts.query.split("&") if pair)
+    return features
+
+
+def simhash(features: Iterable[str]) -> int:
+    """特徴量の SimHash (64ビット) を返す。"""
+    weights = [0] * BITS
+    for feature in features:
+        h = _hash(feature)
+        for bit in range(BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class Duplicate(NamedTuple):
+    """重複と判定したカード。"""
+
+    url: str
+    canonical_url: str
+    distance: int
+
+
+class _Canonical:
+    """代表のカードと、その取得結果 (重複のカードが待ち合わせる)。"""
+
+    def __init__(self, url: str, fingerprint: int):
+        self.url = url
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.sections: Optional[Dict[str, str]] = None
+
+
+class DuplicateDetector:
+    """カードの重複を検出し、代表のカードの取得結果を重複のカードに受け渡す。スレッド間で共有できる。
+
+    代表のカードは ``resolve`` で取得結果を登録する。取得に失敗した (None を登録した)
+    場合、重複のカードはそれぞれ自分で取得する。
+    """
+
+    def __init__(
+        self,
+        max_distance: int = 6,
+        exact_fields: Sequence[str] = (),
+        ignored_params: Iterable[str] = (),
+    ):
+        self.max_distance = max_distance
+        self.exact_fields = list(exact_fields)
+        self.ignored_params = list(ignored_params)
+        self.stats = {"cards": 0, "duplicates": 0}
+        self.duplicates: List[Duplicate] = []
+        self._lock = threading.Lock()
+        # exact_fields の値の組 → 代表のカード
+        self._blocks: Dict[Tuple[str, ...], List[_Canonical]] = {}
+        self._by_url: Dict[str, _Canonical] = {}
+
+    def claim(self, url: str, fields: Dict[str, str]) -> Optional[str]:
+        """カードが既出のカードの重複なら代表のURLを返し、そうでなければ代表として登録して None を返す。"""
+        normalized = normalize_url(url, self.ignored_params)
+        fingerprint = simhash(card_features(fields, normalized))
+        block = tuple(normalize_text(fields.get(name, "")) for name in self.exact_fields)
+        with self._lock:
+            self.stats["cards"] += 1
+            known = self._by_url.get(normalized)
+            distance = 0
+            if known is None:
+                best = None
+                for candidate in self._blocks.get(block, ()):
+                    distance = hamming(fingerprint, candidate.fingerprint)
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, candidate)
+                if best:
+                    distance, known = best
+            if known is None:
+                canonical = _Canonical(url, fingerprint)
+                self._blocks.setdefault(block, []).append(canonical)
+                self._by_url[normalized] = canonical
+                return None
+            if known.url == url:
+                # 同じカードの再処理
+                return None
+            self.stats["duplicates"] += 1
+            self.duplicates.append(Duplicate(url, known.url, distance))
+            self._by_url.setdefault(normalized, known)
+            return known.url
+
+    def resolve(self, url: str, sections: Optional[Dict[str, str]]) -> None:
+        """代表のカードの取得結果を登録する。"""
+        with self._lock:
+            canonical = self._by_url.get(normalize_url(url, self.ignored_params))
+        if canonical is None or canonical.url != url:
+            return
+        canonical.sections = dict(sections) if sections is not None else None
+        canonical.done.set()
+
+    def wait(self, canonical_url: str, timeout: Optional[float] = None) -> Optional[Dict[str, str]]:
+        """代表のカードの取得結果を待って返す。取得に失敗していれば None。"""
+        with self._lock:
+            canonical = self._by_url.get(normalize_url(canonical_url, self.ignored_params))
+        if canonical is None or not canonical.done.wait(timeout):
+            return None
+        return dict(canonical.sections) if canonical.sections is not None else None
+
+    def forget(self, url: str) -> None:
+        """重複の記録を取り消す (代表の取得結果が使えず自分で取得した場合)。"""
+        with self._lock:
+            for i, duplicate in enumerate(self.duplicates):
+                if duplicate.url == url:
+                    del self.duplicates[i]
+                    self.stats["duplicates"] -= 1
+                    return
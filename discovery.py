@@ -0,0 +1,198 @@
+"""サイトマップ・RSS/Atom フィードから詳細ページのURLを列挙する (一覧ページの巡回の代わり)。
+
+sitemap.xml・サイトマップインデックス (gzip 圧縮を含む)・RSS・Atom に対応する。
+取得した文書は一時ファイルに書き出してから iterparse で逐次解析し、読み終えた要素を
+その都度破棄するため、大きなサイトマップも全体をメモリに保持しない (一時ファイルに
+書き出すのは、詳細ページの取得中にサイトマップの接続を開いたままにしないため)。
+
+URL は lastmod (フィードでは updated / pubDate) の新しい順に優先する。並べ替えは
+``PRIORITY_WINDOW`` 件ごとに行い、サイトマップインデックスの子のサイトマップは
+更新日時の新しいものから読む。
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, IO, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import requests
+import urllib3
+
+import utils
+
+# 更新日時のないURLは最も古いものとして扱う
+_OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+# 1件分のURL (サイトマップの url / sitemap、RSS の item、Atom の entry) を表す要素
+ENTRY_TAGS = {"url": "url", "sitemap": "sitemap", "item": "url", "entry": "url"}
+DATE_TAGS = ("lastmod", "updated", "pubDate", "published")
+
+
+class DiscoveredUrl(NamedTuple):
+    """列挙した詳細ページのURLと更新日時。"""
+
+    url: str
+    lastmod: Optional[datetime]
+
+
+def parse_date(text: Optional[str]) -> Optional[datetime]:
+    """W3C Datetime (サイトマップ・Atom) と RFC 822 (RSS) の日時を UTC で返す。解釈できなければ None。"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            value = parsedate_to_datetime(text)
+        except (TypeError, ValueError):
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_document(stream: IO[bytes]) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    """サイトマップ・フィードを逐次解析し、(種類, URL, 更新日時) を返す。
+
+    種類は ``"sitemap"`` (サイトマップインデックスの子) か ``"url"``。
+    """
+    # 開いている要素 (読み終えた1件分の要素を親から取り除くため)
+    stack: List[ET.Element] = []
+    loc: Optional[str] = None
+    lastmod: Optional[datetime] = None
+    in_entry = False
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        name = _local_name(elem.tag)
+        if event == "start":
+            stack.append(elem)
+            if name in ENTRY_TAGS:
+                in_entry = True
+                loc = lastmod = None
+            continue
+
+        stack.pop()
+        if not in_entry:
+            continue
+        if name == "loc" and loc is None:
+            # 画像サイトマップなどの拡張 (image:loc) より先にある、ページ自身の loc を使う
+            loc = (elem.text or "").strip() or None
+        elif name == "link" and loc is None:
+            # RSS は本文、Atom は href 属性
+            if elem.text and elem.text.strip():
+                loc = elem.text.strip()
+            elif elem.get("href") and elem.get("rel", "alternate") == "alternate":
+                loc = elem.get("href")
+        elif name in DATE_TAGS:
+            value = parse_date(elem.text)
+            if value and (lastmod is None or value > lastmod):
+                lastmod = value
+        elif name in ENTRY_TAGS:
+            in_entry = False
+            if loc:
+                yield ENTRY_TAGS[name], loc, lastmod
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+
+def newest_first(entries: List[DiscoveredUrl]) -> List[DiscoveredUrl]:
+    """更新日時の新しい順に並べ替える (同じ日時・日時のないものは元の順)。"""
+    return sorted(entries, key=lambda entry: entry.lastmod or _OLDEST, reverse=True)
+
+
+class Discovery:
+    """サイト設定の ``DISCOVERY`` に従って詳細ページのURLを列挙する。
+
+    ``SITEMAPS`` / ``FEEDS`` の文書を順に読み、``URL_PATTERN`` に一致しないURLと、
+    ``MAX_AGE_DAYS`` より前に更新されたURLを除く。
+    """
+
+    def __init__(self, settings: Dict, session=None, priority_window: int = 1000, max_depth: int = 3):
+        self.sources: List[str] = list(settings.get("SITEMAPS", [])) + list(settings.get("FEEDS", []))
+        pattern = settings.get("URL_PATTERN")
+        self.pattern = re.compile(pattern) if pattern else None
+        max_age_days = settings.get("MAX_AGE_DAYS")
+        self.since = datetime.now(timezone.utc) - timedelta(days=max_age_days) if max_age_days else None
+        self.priority_window = max(1, settings.get("PRIORITY_WINDOW", priority_window))
+        self.max_depth = max_depth
+        self.session = session
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.stats = {"documents": 0, "urls": 0, "skipped": 0}
+        # すべての文書を読めたか (差分モードで削除を判定してよいか)
+        self.complete = True
+
+    def iter_urls(self) -> Iterator[DiscoveredUrl]:
+        """重複を除いたURLを、``priority_window`` 件ごとに更新日時の新しい順で返す。"""
+        seen: Set[str] = set()
+        window: List[DiscoveredUrl] = []
+        for source in self.sources:
+            for entry in self._iter_document(source, 0):
+                if entry.url in seen:
+                    continue
+                seen.add(entry.url)
+                self.stats["urls"] += 1
+                window.append(entry)
+                if len(window) >= self.priority_window:
+                    yield from newest_first(window)
+                    window = []
+        yield from newest_first(window)
+
+    def _is_stale(self, entry: DiscoveredUrl) -> bool:
+        return self.since is not None and entry.lastmod is not None and entry.lastmod < self.since
+
+    def _iter_document(self, url: str, depth: int) -> Iterator[DiscoveredUrl]:
+        children: List[DiscoveredUrl] = []
+        with tempfile.TemporaryFile() as spool:
+            if not self._download(url, spool):
+                self.complete = False
+                return
+            self.stats["documents"] += 1
+            magic = spool.read(2)
+            spool.seek(0)
+            # .xml.gz のサイトマップ (Content-Encoding ではなく本文自体が gzip)
+            stream: IO[bytes] = gzip.GzipFile(fileobj=spool) if magic == b"\x1f\x8b" else spool
+            try:
+                for kind, loc, lastmod in parse_document(stream):
+                    entry = DiscoveredUrl(loc, lastmod)
+                    if kind == "sitemap":
+                        children.append(entry)
+                    elif (self.pattern and not self.pattern.search(loc)) or self._is_stale(entry):
+                        self.stats["skipped"] += 1
+                    else:
+                        yield entry
+            except (ET.ParseError, OSError, EOFError) as e:
+                self.logger.error("サイトマップ・フィードの解析に失敗しました url=%s: %s", url, e)
+                self.complete = False
+
+        # 子のサイトマップは更新日時の新しいものから読む
+        for child in newest_first(children):
+            if self._is_stale(child):
+                continue
+            if depth >= self.max_depth:
+                self.logger.warning("サイトマップインデックスの入れ子が深すぎるためスキップしました url=%s", child.url)
+                self.complete = False
+                continue
+            yield from self._iter_document(child.url, depth + 1)
+
+    def _download(self, url: str, spool: IO[bytes]) -> bool:
+        """文書を一時ファイルに書き出す。取得に失敗すれば偽を返す。"""
+        self.logger.info("サイトマップ・フィードを取得します url=%s", url)
+        try:
+            with utils.open_stream(url, session=self.session) as stream:
+                shutil.copyfileobj(stream, spool)
+        except (requests.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            self.logger.error("サイトマップ・フィードの取得に失敗しました url=%s: %s", url, e)
+            return False
+        spool.seek(0)
+        return True
@@ -0,0 +1,144 @@
+"""サイト設定の EXTRACTION_TARGETS をコンパイルした抽出プラン。
+
+対象ごとに文書全体を ``find`` する代わりに、タグ名で引ける照合表を作っておき、
+文書を1回走査してすべての対象 (dl セクションの dt / dd を含む) を埋める。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup, NavigableString, PageElement, Tag
+
+
+class Target(NamedTuple):
+    """コンパイル済みの抽出対象。"""
+
+    key: str
+    tag: str
+    cls: Optional[str]
+    # 真なら dl セクション (配下の dt / dd を項目として展開する)
+    section: bool = False
+    # 真なら見つからないときに項目を出力しない (偽なら "N/A")
+    optional: bool = False
+
+
+def compile_target(key: str, target: Dict) -> Target:
+    """EXTRACTION_TARGETS の1項目をコンパイルする。"""
+    if "div_class" in target:
+        return Target(key, "div", target["div_class"], section=True)
+    return Target(key, target["tag"], target.get("class"), optional=target.get("optional", False))
+
+
+def class_matches(tag: Tag, cls: Optional[str]) -> bool:
+    """``find(class_=cls)`` と同じ規則で class 属性を照合する。
+
+    いずれかのクラス名と一致するか、クラス名を空白で連結した文字列全体と一致すれば真。
+    ``cls`` が None なら class 属性のない要素だけが一致する。
+    """
+    classes = tag.get("class")
+    if cls is None:
+        return classes is None
+    if not classes:
+        return False
+    if isinstance(classes, str):
+        classes = classes.split()
+    return cls in classes or " ".join(classes) == cls
+
+
+class _Open(NamedTuple):
+    """走査中に配下を処理している要素 (セクションの div または dl)。"""
+
+    tag: Tag
+    # 配下の走査が終わった次の要素 (None なら文書の末尾まで)
+    end: Optional[PageElement]
+    # セクションなら配下の dl ごとの [dt, dd] の一覧、dl なら自身の [dt, dd]
+    items: list
+    is_dl: bool
+
+
+def _following(tag: Tag) -> Optional[PageElement]:
+    """文書順で ``tag`` の配下の次に現れる要素を返す。"""
+    node: Optional[PageElement] = tag
+    while node is not None:
+        if node.next_sibling is not None:
+            return node.next_sibling
+        node = node.parent
+    return None
+
+
+class ExtractionPlan:
+    """EXTRACTION_TARGETS をコンパイルして再利用する抽出器。
+
+    各対象は ``root.find(tag, class_=cls)`` と同じく文書順で最初に一致した要素、
+    dl セクションは配下の dl ごとに最初の dt / dd を項目名・値とする。
+    """
+
+    def __init__(self, targets: Dict[str, Dict]):
+        self.targets: List[Target] = [compile_target(key, target) for key, target in targets.items()]
+        self._by_tag: Dict[str, List[Tuple[int, Target]]] = {}
+        for i, target in enumerate(self.targets):
+            self._by_tag.setdefault(target.tag, []).append((i, target))
+        self._has_sections = any(target.section for target in self.targets)
+
+    def find(self, root: Union[BeautifulSoup, Tag]) -> Tuple[List[Optional[Tag]], Dict[int, List[List[Optional[Tag]]]]]:
+        """文書を1回走査し、(対象ごとの要素, セクションの対象番号 → 配下の dl ごとの [dt, dd]) を返す。"""
+        found: List[Optional[Tag]] = [None] * len(self.targets)
+        sections: Dict[int, List[List[Optional[Tag]]]] = {}
+        remaining = len(self.targets)
+        by_tag = self._by_tag
+        track_dl = self._has_sections
+        # 配下を走査中のセクションと dl (外側から順)
+        stack: List[_Open] = []
+
+        for element in root.descendants:
+            while stack and stack[-1].end is element:
+                stack.pop()
+            if isinstance(element, NavigableString):
+                continue
+            if not remaining and not stack:
+                break
+
+            name = element.name
+            candidates = by_tag.get(name)
+            if candidates:
+                for i, target in candidates:
+                    if found[i] is None and class_matches(element, target.cls):
+                        found[i] = element
+                        remaining -= 1
+                        if target.section:
+                            sections[i] = []
+                            stack.append(_Open(element, _following(element), sections[i], False))
+
+            if not track_dl or not stack:
+                continue
+            if name == "dl":
+                # 走査中のすべてのセクションに属する (入れ子のセクションでは外側にも含まれる)
+                pair: List[Optional[Tag]] = [None, None]
+                for entry in stack:
+                    if not entry.is_dl:
+                        entry.items.append(pair)
+                stack.append(_Open(element, _following(element), pair, True))
+            elif name == "dt" or name == "dd":
+                # 走査中の dl それぞれで最初の dt / dd (dl.find と同じく入れ子の dl の中も含む)
+                slot = 0 if name == "dt" else 1
+                for entry in stack:
+                    if entry.is_dl and entry.items[slot] is None:
+                        entry.items[slot] = element
+        return found, sections
+
+    def extract(self, root: Union[BeautifulSoup, Tag], default: str = "N/A") -> Dict[str, str]:
+        """対象ごとのテキストを EXTRACTION_TARGETS の順に返す。"""
+        found, sections = self.find(root)
+        details: Dict[str, str] = {}
+        for i, target in enumerate(self.targets):
+            elem = found[i]
+            if target.section:
+                for dt, dd in sections.get(i, []):
+                    if dt is not None:
+                        details[dt.text.strip()] = " ".join(dd.text.strip().split()) if dd is not None else default
+            elif elem is not None:
+                details[target.key] = elem.get_text(separator=" ", strip=True)
+            elif not target.optional:
+                details[target.key] = default
+        return details
@@ -0,0 +1,164 @@
+"""URLをキーにHTTPレスポンスをディスクへ保存するキャッシュ。
+
+ETag / Last-Modified を保存して条件付きリクエストで再検証し、
+合計サイズが上限を超えた場合は最終アクセスが古いものから削除する (LRU)。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional
+
+
+class CacheEntry(NamedTuple):
+    """キャッシュ済みレスポンス。"""
+
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """TTL内であれば再検証なしで利用できる。"""
+        return ttl > 0 and time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """再検証用の条件付きリクエストヘッダを返す。"""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """SQLiteに本文と検証用ヘッダを保存するレスポンスキャッシュ。"""
+
+    def __init__(self, path: str, ttl: float = 0, max_bytes: Optional[int] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """URLに対応するエントリを返す。見つからなければ None。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url)
+            )
+            self._conn.commit()
+        body, etag, last_modified, stored_at = row
+        return CacheEntry(url, zlib.decompress(body), etag, last_modified, stored_at)
+
+    def put(self, url: str, body: bytes, headers) -> None:
+        """200レスポンスの本文と検証用ヘッダを保存する。"""
+        compressed = zlib.compress(body)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (url, body, etag, last_modified, stored_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    url,
+                    compressed,
+                    headers.get("ETag"),
+                    headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(compressed),
+                ),
+            )
+            self._total_bytes += len(compressed) - (row[0] if row else 0)
+            self.stats["stored"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def revalidated(self, url: str, headers) -> None:
+        """304応答を受けたエントリの保存時刻と検証用ヘッダを更新する。"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE responses
+                SET stored_at = ?,
+                    etag = COALESCE(?, etag),
+                    last_modified = COALESCE(?, last_modified)
+                WHERE url = ?
+                """,
+                (time.time(), headers.get("ETag"), headers.get("Last-Modified"), url),
+            )
+            self._conn.commit()
+            self.stats["revalidated"] += 1
+
+    def record_fresh_hit(self) -> None:
+        with self._lock:
+            self.stats["fresh_hits"] += 1
+
+    def _evict(self) -> None:
+        """合計サイズが上限を超えていれば、最終アクセスが古い順に削除する。"""
+        if self.max_bytes is None or self._total_bytes <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT url, size FROM responses ORDER BY last_access ASC"
+        ).fetchall()
+        for url, size in rows:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+            self._total_bytes -= size
+            self.stats["evicted"] += 1
+        self.logger.debug("キャッシュを整理しました。現在のサイズ: %d bytes", self._total_bytes)
+
+    def clear(self) -> None:
+        """すべてのエントリを削除する。"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
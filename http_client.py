@@ -0,0 +1,166 @@
+"""接続を再利用する共有HTTPセッションを提供するモジュール。"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import config
+from http_cache import ResponseCache
+from ratelimit import AdaptiveRateLimiter
+
+
+class ConnectionStats:
+    """リクエスト数と新規接続数を集計し、接続の再利用状況を把握する。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        # 本文の受信を途中で打ち切った件数と、そのうち Content-Length から分かった受信せずに済んだバイト数
+        self.truncated = 0
+        self.bytes_saved = 0
+        self.truncated_unknown = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self) -> None:
+        with self._lock:
+            self.new_connections += 1
+
+    def record_truncated(self, bytes_saved: Optional[int]) -> None:
+        """本文の受信を打ち切ったことを記録する。``bytes_saved`` が None なら本文の長さは不明。"""
+        with self._lock:
+            self.truncated += 1
+            if bytes_saved is None:
+                self.truncated_unknown += 1
+            else:
+                self.bytes_saved += bytes_saved
+
+    def summary(self) -> Dict[str, float]:
+        """集計結果を辞書形式で返す。"""
+        with self._lock:
+            requests_count = self.requests
+            new_connections = self.new_connections
+        reused = max(0, requests_count - new_connections)
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "reused_connections": reused,
+            "reuse_rate": reused / requests_count if requests_count else 0.0,
+            "truncated": self.truncated,
+            "bytes_saved": self.bytes_saved,
+            "truncated_unknown": self.truncated_unknown,
+        }
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """新規接続の生成を ``ConnectionStats`` に記録するHTTPアダプタ。"""
+
+    def __init__(self, stats: ConnectionStats, **kwargs) -> None:
+        # HTTPAdapter.__init__ から init_poolmanager が呼ばれるため先に設定する
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.record_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.record_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+def _accept_encoding() -> str:
+    """インストール済みのデコーダに応じた Accept-Encoding を返す (brotli/zstd は任意)。"""
+    return urllib3.util.make_headers(accept_encoding=True)["accept-encoding"]
+
+
+class HttpSession:
+    """Keep-Alive と接続プールを備えた、スクレイパー間で共有するHTTPセッション。
+
+    requests (urllib3) は HTTP/2 に対応していないため、HTTP/1.1 の持続的接続で
+    ハンドシェイクを削減する。アクセス速度はセッションごとの ``rate_limiter`` で制御する。
+    ``cache`` と ``archive`` (取得したレスポンスの保存先) は複数のセッションで共有できるため、
+    閉じるのは作成した側が行う。
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        pool_connections: Optional[int] = None,
+        pool_maxsize: Optional[int] = None,
+        pool_maxsize_by_host: Optional[Dict[str, int]] = None,
+        timeout: float = 10,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+        archive=None,
+    ) -> None:
+        self.stats = ConnectionStats()
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter.from_config()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept-Encoding": _accept_encoding(),
+            "Connection": "keep-alive",
+        })
+        self.session.headers.update(headers if headers is not None else config.HEADERS)
+
+        pool_connections = pool_connections or getattr(config, "HTTP_POOL_CONNECTIONS", 10)
+        pool_maxsize = pool_maxsize or getattr(config, "HTTP_POOL_MAXSIZE", 10)
+        adapter = PooledHTTPAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        if pool_maxsize_by_host is None:
+            pool_maxsize_by_host = getattr(config, "HTTP_POOL_MAXSIZE_BY_HOST", {})
+        for host, maxsize in pool_maxsize_by_host.items():
+            host_adapter = PooledHTTPAdapter(self.stats, pool_connections=1, pool_maxsize=maxsize)
+            self.session.mount(f"http://{host}/", host_adapter)
+            self.session.mount(f"https://{host}/", host_adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GETリクエストを送信する。"""
+        kwargs.setdefault("timeout", self.timeout)
+        self.stats.record_request()
+        return self.session.get(url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_default_session: Optional[HttpSession] = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session() -> HttpSession:
+    """プロセス共通のデフォルトセッションを返す。"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = HttpSession()
+        return _default_session
@@ -1,11 +1,30 @@
-"""ロギング設定を初期化するユーティリティ。"""
+"""ロギング設定を初期化するユーティリティ。
+
+キュー経由の出力 (``queued``) では、ログを出力したスレッドはレコードをキューに入れる
+だけで、メッセージの整形とファイル・コンソールへの書き込みはバックグラウンドの
+スレッド (QueueListener) が行う。DEBUG ログは同じメッセージ・ホストごとに1秒あたりの
+件数を制限し、超えた分は省略した件数だけを次に出力するログに付ける。
+"""
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
-from typing import List, Optional, Tuple
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+LOG_FORMATS = ("text", "json")
+# JSON 形式で extra として出力しない LogRecord の標準の属性
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+# キュー経由の出力で使用中の QueueListener
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 def _coerce_log_level(level_name: Optional[str]) -> Optional[int]:
@@ -52,12 +71,110 @@ def _select_log_level(
     return level, fallback_source, warnings
 
 
+class JsonFormatter(logging.Formatter):
+    """ログを1行1レコードの JSON で出力するフォーマッタ。
+
+    ``extra`` で渡した項目 (``url`` など) もそのまま出力する。
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "func": record.funcName,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _RECORD_ATTRIBUTES and name not in entry:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """DEBUG ログを、同じメッセージ・ホストごとに1秒あたり ``rate`` 件までに制限するフィルタ。
+
+    ホストは引数に含まれるURLから判定する。制限を超えて省略した件数は、同じ種類の
+    次に出力するログに付ける。
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self._lock = threading.Lock()
+        # (メッセージ, ホスト) → (残りの出力可能件数, 最後に補充した時刻, 省略した件数)
+        self._buckets: Dict[Tuple[object, str], Tuple[float, float, int]] = {}
+
+    @staticmethod
+    def _host(record: logging.LogRecord) -> str:
+        args = record.args if isinstance(record.args, tuple) else ()
+        for arg in args:
+            if isinstance(arg, str) and arg.startswith(("http://", "https://")):
+                # urlsplit より軽い (ログのたびに呼ばれるため)
+                return arg.split("/", 3)[2]
+        return ""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        key = (record.msg if isinstance(record.msg, str) else type(record.msg), self._host(record))
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(key, (self.rate, now, 0))
+            tokens = min(self.rate, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+        if suppressed and isinstance(record.msg, str):
+            record.msg = f"{record.msg} (同種のログを {suppressed} 件省略しました)"
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """レコードを整形せずにキューに入れるハンドラ (整形は QueueListener のスレッドで行う)。
+
+    同じプロセス内のキューに限るため、引数をそのまま渡してよい。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def stop_logging() -> None:
+    """キュー経由の出力を止め、キューに残ったログを書き出す。"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
 def setup_logging(
     log_level: Optional[str] = None,
     enable_console: bool = True,
     default_level: Optional[str] = None,
+    queued: bool = True,
+    log_format: str = "text",
+    debug_rate: Optional[float] = None,
 ) -> None:
-    """ロギング設定を構成する。"""
+    """ロギング設定を構成する。
+
+    ``queued`` ならログの書き込みをバックグラウンドのスレッドで行う。``log_format`` が
+    ``"json"`` なら1行1レコードの JSON で出力する。``debug_rate`` を指定すると、DEBUG
+    ログを同じメッセージ・ホストごとに1秒あたりその件数までに制限する。
+    """
+    global _listener
 
     log_dir = "log"
     os.makedirs(log_dir, exist_ok=True)
@@ -71,35 +188,50 @@ def setup_logging(
         env_level=os.environ.get("SCRAPING_LOG_LEVEL"),
         default_level=default_level,
     )
-    log_format = (
-        "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s:%(lineno)d - %(message)s"
-    )
-
-    logging.basicConfig(
-        level=level,
-        format=log_format,
-        filename=log_filepath,
-        filemode="w",
-        encoding="utf-8",
-        force=True,
-    )
-
+    if log_format not in LOG_FORMATS:
+        warnings.append(f"ログの形式 '{log_format}' は無効です。text 形式で出力します。")
+        log_format = "text"
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(name)s - %(funcName)s:%(lineno)d - %(message)s"
+        )
+
+    stop_logging()
     root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        handler.close()
     root_logger.setLevel(level)
 
+    handlers: List[logging.Handler] = [logging.FileHandler(log_filepath, mode="w", encoding="utf-8")]
     if enable_console:
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(level)
-        console_handler.setFormatter(logging.Formatter(log_format))
-        root_logger.addHandler(console_handler)
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+
+    if queued:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        handlers = [_DeferredQueueHandler(log_queue)]
+    for handler in handlers:
+        if debug_rate:
+            # ログを出力したスレッドで省略を判定し、キューに入れる件数も減らす
+            handler.addFilter(DebugRateLimitFilter(debug_rate))
+        root_logger.addHandler(handler)
 
     for warning_message in warnings:
         root_logger.warning(warning_message)
 
     root_logger.debug(
-        "ロギングを初期化しました。レベル=%s, 決定元=%s, 出力ファイル=%s",
+        "ロギングを初期化しました。レベル=%s, 決定元=%s, 出力ファイル=%s, キュー経由=%s, 形式=%s",
         logging.getLevelName(level),
         source,
         log_filepath,
+        queued,
+        log_format,
     )
 
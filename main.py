@@ -3,16 +3,30 @@
 from __future__ import annotations
 
 import argparse
-import csv
-import glob
+import json
 import logging
+import multiprocessing
 import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Optional, Type
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Type, Union
 
+import archive
 import config
+import dedup
+import http_client
 import logging_config
+import metrics
+import posting_index
+import workqueue
+import writers
+from http_cache import ResponseCache
+from memory import MB, MemoryBudget
 from scrapers import BaseScraper, InternScraper, KyujinboxScraper
+from checkpoint import CheckpointStore
+from posting_index import PostingIndex
 
 # サイト名とスクレイパークラスのマッピング
 SCRAPER_CLASSES: Dict[str, Type[BaseScraper]] = {
@@ -20,7 +34,24 @@ SCRAPER_CLASSES: Dict[str, Type[BaseScraper]] = {
     "kyujinbox": KyujinboxScraper,
 }
 
-def get_scraper(site_name: str) -> Optional[BaseScraper]:
+def setup_logging(log_level: Optional[str] = None, log_format: Optional[str] = None) -> None:
+    """config のログ設定 (LOG_LEVEL / LOG_QUEUED / LOG_FORMAT / LOG_DEBUG_RATE) でロギングを初期化する。"""
+    logging_config.setup_logging(
+        log_level=log_level,
+        default_level=getattr(config, "LOG_LEVEL", None),
+        queued=getattr(config, "LOG_QUEUED", True),
+        log_format=log_format or getattr(config, "LOG_FORMAT", "text"),
+        debug_rate=getattr(config, "LOG_DEBUG_RATE", None),
+    )
+
+
+def get_scraper(
+    site_name: str,
+    max_workers: int = 1,
+    session: Optional[http_client.HttpSession] = None,
+    parse_pool: Optional[Executor] = None,
+    memory_budget: Optional[MemoryBudget] = None,
+) -> Optional[BaseScraper]:
     """サイト名に対応するスクレイパーインスタンスを返す。"""
     if site_name not in config.SITE_CONFIGS:
         logging.error(f"設定ファイルにサイト '{site_name}' の設定が見つかりません。")
@@ -32,91 +63,757 @@ def get_scraper(site_name: str) -> Optional[BaseScraper]:
 
     site_config = config.SITE_CONFIGS[site_name]
     scraper_class = SCRAPER_CLASSES[site_name]
-    return scraper_class(site_name, site_config)
+    return scraper_class(
+        site_name,
+        site_config,
+        max_workers=max_workers,
+        session=session,
+        parse_pool=parse_pool,
+        memory_budget=memory_budget,
+    )
 
-def save_to_csv(site: str, all_job_details: List[Dict[str, str]], required_fields: List[str]) -> None:
-    """スクレイピング結果をCSVファイルに保存する。"""
-    if not all_job_details:
-        logging.warning("取得できた求人情報がありませんでした。CSVは作成されません。")
-        return
+def build_output_path(site: str, output_format: str = "csv") -> str:
+    """タイムスタンプ付きの出力ファイルのパスを返す。"""
+    output_dir = "output"
+    base_filename = f"{site}_job_listings_{datetime.now().strftime('%Y%m%d_%H%M%S')}{writers.extension(output_format)}"
+    return os.path.join(output_dir, base_filename)
 
-    logging.info(f"合計 {len(all_job_details)} 件の求人情報を取得しました。CSVファイルに保存します。")
+def save_results(
+    filepath: str,
+    job_details: Iterable[Dict[str, str]],
+    required_fields: List[str],
+    output_format: str = "csv",
+    checkpoint: Optional[CheckpointStore] = None,
+    append: bool = False,
+    start_row: int = 0,
+    progress: Optional["SiteRun"] = None,
+) -> int:
+    """スクレイピング結果を取得した順に ``output_format`` 形式のファイルへ書き出し、書き込んだ件数を返す。
 
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
+    ``checkpoint`` を渡すと、書き込んだ行が読み出せる状態になるたびに進捗を記録する。
+    ``progress`` を渡すと、1件書き込むたびに取得件数を更新する。
+    """
+    logging.info(f"スクレイピング結果を {filepath} に逐次保存します。")
 
-    base_filename = f"{site}_job_listings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    filepath = os.path.join(output_dir, base_filename)
-    logging.info(f"スクレイピング結果を {filepath} に保存しています。")
+    writer = writers.open_writer(
+        output_format,
+        filepath,
+        required_fields,
+        flush_every=getattr(config, "WRITER_FLUSH_EVERY", 10),
+        fsync_every=getattr(config, "WRITER_FSYNC_EVERY", 100),
+        append=append,
+        start_row=start_row,
+        on_flush=(lambda rows: checkpoint.commit(rows)) if checkpoint else None,
+        dictionary_fields=getattr(config, "PARQUET_DICTIONARY_FIELDS", None),
+        rows_per_part=getattr(config, "PARQUET_ROWS_PER_PART", 100_000),
+    )
+    try:
+        with writer:
+            for details in job_details:
+                writer.write(details)
+                if progress:
+                    progress.rows = writer.rows_written
+    except IOError as e:
+        logging.error(f"結果ファイルへの書き込みに失敗しました: {e}")
+        return writer.rows_written
+    finally:
+        if checkpoint:
+            checkpoint.commit()
 
-    fieldnames_set = set()
-    for details in all_job_details:
-        fieldnames_set.update(details.keys())
+    if not writer.rows_written:
+        logging.warning("取得できた求人情報がありませんでした。出力ファイルは作成されません。")
+        return 0
 
-    fieldnames = required_fields + sorted(list(fieldnames_set - set(required_fields)))
+    logging.info(f"合計 {writer.rows_written} 件の求人情報を取得しました。")
+    if writer.extra_rows_written:
+        logging.info(
+            "REQUIRED_FIELDS 以外の項目を %d 件分 %s に保存しました。",
+            writer.extra_rows_written,
+            writer.extra_filepath,
+        )
+    logging.info(f"--- スクレイピング処理が完了しました。結果は {filepath} に保存されました ---")
+    return writer.rows_written
 
+def save_delta(filepath: str, index: PostingIndex) -> None:
+    """差分モードで検出した追加・変更・削除された求人をJSONLファイルに保存する。"""
+    base = writers.strip_extension(filepath)
+    delta_path = base.replace("_job_listings_", "_delta_") + ".jsonl"
+    counts = {posting_index.ADDED: 0, posting_index.CHANGED: 0, posting_index.REMOVED: 0}
     try:
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames, restval="N/A")
-            writer.writeheader()
-            writer.writerows(all_job_details)
-        logging.info(f"--- スクレイピング処理が完了しました。結果は {filepath} に保存されました ---")
+        with open(delta_path, "w", encoding="utf-8") as f:
+            for change, url, details in index.iter_changes():
+                record = {"change": change, "求人URL": url, "details": details}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                counts[change] += 1
     except IOError as e:
-        logging.error(f"CSVファイルへの書き込みに失敗しました: {e}")
+        logging.error(f"差分ファイルへの書き込みに失敗しました: {e}")
+        return
+    logging.info(
+        "差分を %s に保存しました。追加 %d 件, 変更 %d 件, 削除 %d 件",
+        delta_path,
+        counts[posting_index.ADDED],
+        counts[posting_index.CHANGED],
+        counts[posting_index.REMOVED],
+    )
 
-def main(
-    site: str,
+def save_duplicates(filepath: str, site: str, detector: Optional[dedup.DuplicateDetector]) -> None:
+    """重複と判定したカードと重複元の対応をJSONLファイルに保存し、省略できた取得件数をログに出力する。"""
+    if not detector or not detector.stats["cards"]:
+        return
+    logging.info(
+        "[%s] 重複カード %d 件 / %d 件の外部ページ取得を省略しました。",
+        site,
+        detector.stats["duplicates"],
+        detector.stats["cards"],
+    )
+    if not detector.duplicates:
+        return
+    base = writers.strip_extension(filepath)
+    duplicates_path = base.replace("_job_listings_", "_duplicates_") + ".jsonl"
+    try:
+        with open(duplicates_path, "w", encoding="utf-8") as f:
+            for duplicate in detector.duplicates:
+                record = {"求人URL": duplicate.url, "重複元URL": duplicate.canonical_url, "distance": duplicate.distance}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except IOError as e:
+        logging.error(f"重複カードの対応ファイルへの書き込みに失敗しました: {e}")
+        return
+    logging.info("重複カードの対応を %s に保存しました。", duplicates_path)
+
+def log_connection_summary(site: str, session: http_client.HttpSession) -> None:
+    """HTTP接続の再利用状況をログに出力する。"""
+    stats = session.stats.summary()
+    logging.info(
+        "[%s] HTTP接続の統計: リクエスト %d 件, 新規接続 %d 件, 再利用 %d 件 (再利用率 %.1f%%)",
+        site,
+        stats["requests"],
+        stats["new_connections"],
+        stats["reused_connections"],
+        stats["reuse_rate"] * 100,
+    )
+    if stats["truncated"]:
+        logging.info(
+            "[%s] 本文の受信を途中で打ち切った応答 %d 件, 受信せずに済んだ転送量 %d バイト (長さ不明 %d 件)",
+            site,
+            stats["truncated"],
+            stats["bytes_saved"],
+            stats["truncated_unknown"],
+        )
+
+def create_cache(use_cache: bool = True, clear_cache: bool = False) -> Optional[ResponseCache]:
+    """設定に従ってレスポンスキャッシュを用意する。"""
+    cache_path = getattr(config, "CACHE_PATH", "cache/http_cache.sqlite3")
+    if clear_cache and os.path.exists(cache_path):
+        cache = ResponseCache(cache_path)
+        cache.clear()
+        cache.close()
+        logging.info("レスポンスキャッシュを削除しました: %s", cache_path)
+
+    if not use_cache or not getattr(config, "CACHE_ENABLED", True):
+        logging.info("レスポンスキャッシュを使用せずに実行します。")
+        return None
+
+    return ResponseCache(
+        cache_path,
+        ttl=getattr(config, "CACHE_TTL", 0),
+        max_bytes=getattr(config, "CACHE_MAX_BYTES", None),
+    )
+
+def create_archive(use_archive: bool) -> Optional[archive.ArchiveWriter]:
+    """設定に従って取得したレスポンスの保存先 (アーカイブ) を用意する。"""
+    if not use_archive:
+        return None
+    return archive.ArchiveWriter(
+        getattr(config, "ARCHIVE_PATH", "archive"),
+        segment_bytes=getattr(config, "ARCHIVE_SEGMENT_BYTES", 256 * 1024 * 1024),
+    )
+
+def log_archive_summary(writer: Optional[archive.ArchiveWriter]) -> None:
+    """アーカイブへの保存件数をログに出力する。"""
+    if not writer:
+        return
+    logging.info(
+        "アーカイブに %d 件 (%d バイト) 保存しました: %s",
+        writer.stats["records"],
+        writer.stats["bytes"],
+        writer.directory,
+    )
+
+def create_parse_pool(processes: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """詳細ページの解析・抽出を行うプロセスプールを用意する。0 ならプロセス内で解析する。"""
+    if processes is None:
+        processes = getattr(config, "PARSE_PROCESSES", 0)
+    if processes <= 0:
+        return None
+    logging.info("詳細ページの解析を %d プロセスで行います。", processes)
+    # 実行中のスレッドのロックを引き継がないよう fork は使わない
+    return ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+
+def log_rate_limit_summary(site: str, session: http_client.HttpSession) -> None:
+    """ホストごとの最終的なアクセス速度をログに出力する。"""
+    for host, stats in session.rate_limiter.summary().items():
+        logging.info(
+            "[%s] アクセス速度: %s %.2f リクエスト/秒 (リクエスト %d 件, エラー %d 件)",
+            site,
+            host,
+            stats["rate"],
+            stats["requests"],
+            stats["errors"],
+        )
+
+def write_metrics_reports() -> None:
+    """計測結果をファイルに書き出し、フェーズごとの所要時間をログに出力する。"""
+    target = metrics.active()
+    if target is None:
+        return
+    summary = target.summary()
+    for phase, stats in summary["phases"].items():
+        logging.info(
+            "計測: %s 合計 %.2f 秒 (%d 回, 平均 %.3f 秒, p90 %.3f 秒)",
+            phase, stats["sum"], stats["count"], stats["mean"], stats["p90"],
+        )
+    logging.info(
+        "計測: ページ %d 件 (%.2f 件/秒), 求人カード %d 件 (%.2f 件/秒), ダウンロード %d バイト",
+        summary["pages"],
+        summary["pages_per_second"],
+        summary["cards"],
+        summary["cards_per_second"],
+        sum(summary["bytes_downloaded"].values()),
+    )
+    paths = metrics.write_reports(
+        getattr(config, "METRICS_DIR", "output"),
+        f"metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+    )
+    logging.info("計測結果を %s と %s に保存しました。", *paths)
+
+def log_cache_summary(cache: Optional[ResponseCache]) -> None:
+    """レスポンスキャッシュの利用状況をログに出力する。"""
+    if not cache:
+        return
+    stats = cache.stats
+    logging.info(
+        "キャッシュの統計: 再検証なし %d 件, 304再検証 %d 件, 未登録 %d 件, 保存 %d 件, 削除 %d 件",
+        stats["fresh_hits"],
+        stats["revalidated"],
+        stats["misses"],
+        stats["stored"],
+        stats["evicted"],
+    )
+
+class SiteRun:
+    """1サイト分の実行状況 (取得件数・経過時間) を保持する。"""
+
+    def __init__(self, site: str):
+        self.site = site
+        self.rows = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.failed = False
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def throughput(self) -> float:
+        elapsed = self.elapsed()
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+
+def resolve_sites(sites: Sequence[str]) -> List[str]:
+    """指定されたサイト名の一覧を重複なしで返す。``all`` はすべてのサイトに展開する。"""
+    resolved: List[str] = []
+    for site in sites:
+        for name in (SCRAPER_CLASSES if site == "all" else [site]):
+            if name not in resolved:
+                resolved.append(name)
+    return resolved
+
+
+def log_progress(runs: List[SiteRun], started: float, final: bool = False) -> None:
+    """サイトごとと合計の取得件数・スループットをログに出力する。"""
+    label = "実行結果" if final else "進捗"
+    for run in runs:
+        status = "失敗" if run.failed else ("完了" if run.finished else "実行中")
+        logging.info(
+            "%s: %s %d 件 (%.1f 秒, %.2f 件/秒, %s)",
+            label, run.site, run.rows, run.elapsed(), run.throughput(), status,
+        )
+    total = sum(run.rows for run in runs)
+    elapsed = time.monotonic() - started
+    logging.info(
+        "%s: 合計 %d 件 (%.1f 秒, %.2f 件/秒)",
+        label, total, elapsed, total / elapsed if elapsed > 0 else 0.0,
+    )
+
+
+def _report_progress(runs: List[SiteRun], started: float, stop: threading.Event, interval: float) -> None:
+    while not stop.wait(interval):
+        log_progress(runs, started)
+
+
+def run_site(
+    run: SiteRun,
     start_page: int = 1,
     resume: bool = False,
-    log_level: Optional[str] = None,
+    workers: int = 1,
+    cache: Optional[ResponseCache] = None,
+    incremental: bool = False,
+    work_queue=None,
+    run_id: Optional[str] = None,
+    parse_pool: Optional[Executor] = None,
+    output_format: str = "csv",
+    archive_writer: Optional[archive.ArchiveWriter] = None,
+    replay: Optional[archive.ArchiveReader] = None,
+    memory_budget: Optional[MemoryBudget] = None,
+    discover: bool = False,
 ) -> None:
-    """求人情報をスクレイピングしてCSVに出力する。"""
-    logging_config.setup_logging(
-        log_level=log_level,
-        default_level=getattr(config, "LOG_LEVEL", None),
-    )
+    """1サイト分の求人情報をスクレイピングして ``output_format`` 形式のファイルに出力する。
+
+    サイトごとに専用のHTTPセッション (レートリミッタ)・出力ファイル・チェックポイントを使う。
+    ``work_queue`` を渡すとコーディネーターとして動作し、取得はワーカーに任せる。
+    ``replay`` を渡すと通信を行わず、アーカイブに保存されたレスポンスから抽出し直す。
+    ``discover`` なら一覧ページの代わりにサイトマップ・フィードから詳細ページのURLを列挙する。
+    """
+    site = run.site
+    run.started = time.monotonic()
     logging.info("--- %s のスクレイピング処理を開始します ---", site)
 
-    scraper = get_scraper(site)
+    if replay is not None:
+        session = archive.ArchiveSession(replay)
+    else:
+        rate_limiter = workqueue.GlobalRateLimiter.from_config(work_queue) if work_queue else None
+        session = http_client.HttpSession(cache=cache, rate_limiter=rate_limiter, archive=archive_writer)
+    scraper = get_scraper(
+        site, max_workers=workers, session=session, parse_pool=parse_pool, memory_budget=memory_budget
+    )
     if not scraper:
+        run.failed = True
+        run.finished = time.monotonic()
+        session.close()
         return
 
-    scraped_count = 0
-    if resume:
-        logging.info("再開モードで実行します。最新のCSVファイルを探しています...")
-        output_dir = "output"
-        list_of_files = glob.glob(os.path.join(output_dir, f'{site}_job_listings_*.csv'))
-        if list_of_files:
-            latest_file = max(list_of_files, key=os.path.getctime)
-            logging.info(f"最新のファイル: {latest_file}")
-            with open(latest_file, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                scraped_count = sum(1 for _ in reader) - 1  # ヘッダー分を引く
-            
-            items_per_page = scraper.site_config.get("ITEMS_PER_PAGE", 30)
-            start_page = (scraped_count // items_per_page) + 1
-            logging.info(f"取得済みの件数: {scraped_count}。{start_page}ページ目から再開します。")
+    discovery = scraper.create_discovery() if discover else None
+    if discover and discovery is None:
+        logging.warning("[%s] DISCOVERY が設定されていないため、一覧ページを巡回します。", site)
+    elif discovery is not None:
+        logging.info("[%s] サイトマップ・フィードから詳細ページのURLを列挙します。", site)
+
+    checkpoint = None
+    state = None
+    index = None
+    if work_queue:
+        # 進捗はキューに残るため、同じ実行IDで再実行すれば続きから処理される
+        filepath = build_output_path(site, output_format)
+        coordinator = workqueue.Coordinator(work_queue, scraper, f"{run_id}:{site}")
+        rows = coordinator.scrape(start_page, config.MAX_ITEMS)
+    elif replay is not None:
+        # 通常の実行のチェックポイント・求人インデックスは更新しない
+        filepath = build_output_path(site, output_format)
+        rows = scraper.scrape(start_page=start_page, max_items=config.MAX_ITEMS, discovery=discovery)
+    else:
+        checkpoint = CheckpointStore(getattr(config, "CHECKPOINT_PATH", "state/checkpoint.sqlite3"), site)
+        if resume:
+            logging.info("[%s] 再開モードで実行します。チェックポイントを読み込んでいます...", site)
+            state = checkpoint.load()
+            if state and not os.path.exists(state.output_path):
+                logging.info(f"前回の出力ファイル {state.output_path} が見つからないため、最初から開始します。")
+                state = None
+            elif state:
+                start_page = state.last_completed_page + 1
+                logging.info(
+                    f"前回の出力ファイル: {state.output_path} (取得済み {state.rows_written} 件)。"
+                    f"{start_page}ページ目から再開します。"
+                )
+            else:
+                logging.info("[%s] チェックポイントが見つかりませんでした。最初から開始します。", site)
+
+        if state:
+            filepath = state.output_path
+            # 前回と同じ形式で追記する
+            resumed_format = writers.format_from_path(filepath)
+            if resumed_format != output_format:
+                logging.info("[%s] 前回の出力形式 %s で続きを書き込みます。", site, resumed_format)
+                output_format = resumed_format
         else:
-            logging.info("再開できるCSVファイルが見つかりませんでした。最初から開始します。")
+            filepath = build_output_path(site, output_format)
+            checkpoint.start_run(filepath)
 
-    all_job_details = scraper.scrape(
-        start_page=start_page,
-        scraped_count=scraped_count,
-        max_items=config.MAX_ITEMS
+        if incremental:
+            index = PostingIndex(getattr(config, "POSTING_INDEX_PATH", "state/posting_index.sqlite3"), site)
+            logging.info("[%s] 差分モードで実行します。内容が変わっていない求人は詳細ページを取得しません。", site)
+
+        def snapshot_rows() -> Iterator[Dict[str, str]]:
+            yield from scraper.scrape(
+                start_page=start_page,
+                max_items=config.MAX_ITEMS,
+                checkpoint=checkpoint,
+                index=index,
+                stop_after_unchanged_pages=getattr(config, "INCREMENTAL_STOP_AFTER_PAGES", None),
+                discovery=discovery,
+            )
+            if index:
+                yield from index.finish_run()
+
+        rows = snapshot_rows()
+
+    try:
+        save_results(
+            filepath,
+            rows,
+            scraper.site_config.get("REQUIRED_FIELDS", []),
+            output_format,
+            checkpoint=checkpoint,
+            append=state is not None,
+            start_row=state.rows_written if state else 0,
+            progress=run,
+        )
+        if index:
+            save_delta(filepath, index)
+        save_duplicates(filepath, site, getattr(scraper, "duplicates", None))
+    finally:
+        run.finished = time.monotonic()
+        if checkpoint:
+            checkpoint.close()
+        if index:
+            index.close()
+        if replay is not None:
+            logging.info("[%s] アーカイブから %d 件のレスポンスを読み出しました (未保存 %d 件)。",
+                         site, session.stats.requests - session.misses, session.misses)
+            if session.truncated:
+                logging.warning(
+                    "[%s] 途中で打ち切って保存された本文が %d 件ありました。打ち切った位置より後ろの項目は再取得が必要です。",
+                    site, session.truncated,
+                )
+        else:
+            log_connection_summary(site, session)
+            log_rate_limit_summary(site, session)
+        session.close()
+
+
+def run_sites_concurrently(runs: List[SiteRun], started: float, **options) -> None:
+    """サイトごとのスレッドで並行して実行し、定期的に全体の進捗をログに出力する。
+
+    ``options`` はそのまま ``run_site`` に渡す。
+    """
+    logging.info("%d サイトを並行して実行します: %s", len(runs), ", ".join(run.site for run in runs))
+    stop = threading.Event()
+    reporter = threading.Thread(
+        target=_report_progress,
+        args=(runs, started, stop, getattr(config, "PROGRESS_INTERVAL", 30)),
+        name="progress",
+        daemon=True,
     )
+    reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=len(runs), thread_name_prefix="site") as executor:
+            futures = {executor.submit(run_site, run, **options): run for run in runs}
+            for future in as_completed(futures):
+                run = futures[future]
+                try:
+                    future.result()
+                except Exception:
+                    # 他のサイトの処理は続ける
+                    run.failed = True
+                    logging.exception("%s のスクレイピング中にエラーが発生しました。", run.site)
+    finally:
+        stop.set()
+        reporter.join()
+
+
+def run_worker(
+    work_queue,
+    workers: int = 1,
+    cache: Optional[ResponseCache] = None,
+    idle_timeout: Optional[float] = None,
+    parse_pool: Optional[Executor] = None,
+    archive_writer: Optional[archive.ArchiveWriter] = None,
+    memory_budget: Optional[MemoryBudget] = None,
+) -> None:
+    """キューのタスクを処理するワーカーとして動作する。"""
+    session = http_client.HttpSession(
+        cache=cache,
+        rate_limiter=workqueue.GlobalRateLimiter.from_config(work_queue),
+        archive=archive_writer,
+    )
+    logging.info("ワーカーとして %d スレッドでタスクを処理します。", workers)
+    try:
+        processed = workqueue.run_workers(
+            work_queue,
+            lambda site: get_scraper(site, session=session, parse_pool=parse_pool, memory_budget=memory_budget),
+            threads=workers,
+            idle_timeout=idle_timeout,
+        )
+        logging.info("ワーカーを終了します。処理したタスク: %d 件", processed)
+    finally:
+        log_connection_summary("worker", session)
+        session.close()
+
+
+def main(
+    sites: Union[str, Sequence[str]],
+    start_page: int = 1,
+    resume: bool = False,
+    log_level: Optional[str] = None,
+    workers: Optional[int] = None,
+    use_cache: bool = True,
+    clear_cache: bool = False,
+    incremental: bool = False,
+    coordinator: bool = False,
+    worker: bool = False,
+    queue_location: Optional[str] = None,
+    run_id: Optional[str] = None,
+    parse_processes: Optional[int] = None,
+    enable_metrics: Optional[bool] = None,
+    output_format: Optional[str] = None,
+    use_archive: Optional[bool] = None,
+    reextract: Optional[str] = None,
+    memory_budget_mb: Optional[float] = None,
+    discover: bool = False,
+    log_format: Optional[str] = None,
+) -> None:
+    """求人情報をスクレイピングして ``output_format`` 形式 (デフォルト: config.OUTPUT_FORMAT) のファイルに出力する。
+
+    複数のサイト (``all`` ですべて) を指定すると、サイトごとのスレッドで並行して実行する。
+    ``coordinator`` / ``worker`` を指定すると、``queue_location`` のタスクキューを介して
+    複数のプロセス・マシンで取得を分担する。``reextract`` にアーカイブを指定すると、
+    通信を行わずに保存済みのレスポンスから抽出し直す。``memory_budget_mb`` を指定すると
+    メモリ上限付きで実行し、解析木を使い終わった時点で解放してページごとのピークメモリを報告する。
+    ``discover`` なら一覧ページの代わりにサイト設定の DISCOVERY のサイトマップ・フィードから
+    詳細ページのURLを列挙する。``log_format`` はログの形式 (``text`` / ``json``。デフォルト: config.LOG_FORMAT)。
+    """
+    setup_logging(log_level, log_format)
 
-    save_to_csv(site, all_job_details, scraper.site_config.get("REQUIRED_FIELDS", []))
+    if output_format is None:
+        output_format = getattr(config, "OUTPUT_FORMAT", "csv")
+    try:
+        writers.check_available(output_format)
+    except ImportError as e:
+        logging.error(str(e))
+        return
+    if workers is None:
+        workers = getattr(config, "DETAIL_WORKERS", 1)
+    if enable_metrics is None:
+        enable_metrics = getattr(config, "METRICS_ENABLED", False)
+    if use_archive is None:
+        use_archive = getattr(config, "ARCHIVE_ENABLED", False)
+    replay = None
+    if reextract:
+        if coordinator or worker:
+            logging.error("--reextract は --coordinator / --worker と同時に使用できません。")
+            return
+        try:
+            replay = archive.ArchiveReader(reextract)
+        except FileNotFoundError as e:
+            logging.error(str(e))
+            return
+        logging.info("アーカイブ %s (%d 件) から、通信を行わずに抽出し直します。", reextract, len(replay))
+    if enable_metrics:
+        metrics.enable()
+    if memory_budget_mb is None:
+        memory_budget_mb = getattr(config, "MEMORY_BUDGET_MB", None)
+    memory_budget = MemoryBudget.from_megabytes(memory_budget_mb) if memory_budget_mb else None
+    if memory_budget:
+        memory_budget.start()
+        logging.info("メモリ上限 %g MB で実行します。", memory_budget_mb)
+    cache = create_cache(use_cache, clear_cache) if replay is None else None
+    archive_writer = create_archive(use_archive) if replay is None else None
+    work_queue = workqueue.open_queue(queue_location) if coordinator or worker else None
+    parse_pool = create_parse_pool(parse_processes)
+    started = time.monotonic()
+
+    try:
+        if worker:
+            run_worker(
+                work_queue,
+                workers,
+                cache,
+                getattr(config, "WORKQUEUE_IDLE_TIMEOUT", None),
+                parse_pool,
+                archive_writer,
+                memory_budget,
+            )
+            return
+
+        options = dict(
+            start_page=start_page,
+            resume=resume,
+            workers=workers,
+            cache=cache,
+            incremental=incremental,
+            parse_pool=parse_pool,
+            output_format=output_format,
+            archive_writer=archive_writer,
+            replay=replay,
+            memory_budget=memory_budget,
+            discover=discover,
+        )
+        if replay is not None and (resume or incremental):
+            logging.warning("--reextract では --resume / --incremental は使用できません。")
+            options.update(resume=False, incremental=False)
+        if work_queue:
+            if resume or incremental:
+                logging.warning("コーディネーターでは --resume / --incremental は使用できません。--run-id で実行を再開してください。")
+            if discover:
+                logging.warning("コーディネーターでは --discover は使用できません。一覧ページを巡回します。")
+            options.update(
+                resume=False,
+                incremental=False,
+                discover=False,
+                work_queue=work_queue,
+                run_id=run_id or datetime.now().strftime("%Y%m%d_%H%M%S"),
+            )
+            logging.info("コーディネーターとして実行します。実行ID: %s", options["run_id"])
+
+        runs = [SiteRun(site) for site in resolve_sites([sites] if isinstance(sites, str) else sites)]
+        if len(runs) == 1:
+            run_site(runs[0], **options)
+        else:
+            run_sites_concurrently(runs, started, **options)
+        log_progress(runs, started, final=True)
+    finally:
+        if parse_pool:
+            parse_pool.shutdown()
+        write_metrics_reports()
+        if work_queue:
+            work_queue.close()
+        log_cache_summary(cache)
+        if cache:
+            cache.close()
+        log_archive_summary(archive_writer)
+        if archive_writer:
+            archive_writer.close()
+        if replay:
+            replay.close()
+        if memory_budget:
+            logging.info(
+                "ピークメモリ: %.1f MB (上限 %g MB)", memory_budget.peak_bytes / MB, memory_budget.limit_bytes / MB
+            )
+            memory_budget.stop()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Webスクレイピングを実行します。")
-    parser.add_argument("site", help="スクレイピング対象のサイト名 (config.pyで定義)")
+    parser.add_argument(
+        "sites",
+        nargs="*",
+        help="スクレイピング対象のサイト名 (config.pyで定義)。複数指定または all で並行実行します",
+    )
     parser.add_argument("--start-page", type=int, default=1, help="スクレイピングを開始するページ番号")
-    parser.add_argument("--resume", action="store_true", help="前回の続きからスクレイピングを再開します")
+    parser.add_argument("--resume", action="store_true", help="チェックポイントから前回の続きを再開します")
     parser.add_argument(
         "--log-level",
         default=None,
         help="ログ出力レベル (例: DEBUG, INFO, WARNING)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="詳細ページを並列取得するワーカー数 (デフォルト: config.DETAIL_WORKERS)",
+    )
+    parser.add_argument(
+        "--parse-processes",
+        type=int,
+        default=None,
+        help="詳細ページの解析を行うプロセス数 (0でプロセス内。デフォルト: config.PARSE_PROCESSES)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(writers.FORMATS),
+        default=None,
+        help="結果ファイルの形式 (デフォルト: config.OUTPUT_FORMAT)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        default=None,
+        help="メモリ上限付きで実行し、ページごとのピークメモリを報告します。上限を超えている間は詳細ページの並列取得の"
+        "投入を控えます (--workers 1 では回収と警告のみ。デフォルト: config.MEMORY_BUDGET_MB)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを使用しません")
+    parser.add_argument("--clear-cache", action="store_true", help="実行前にレスポンスキャッシュを削除します")
+    parser.add_argument(
+        "--archive",
+        dest="archive",
+        action="store_true",
+        default=None,
+        help="取得したレスポンスをアーカイブ (config.ARCHIVE_PATH) に保存します (デフォルト: config.ARCHIVE_ENABLED)",
+    )
+    parser.add_argument(
+        "--no-archive", dest="archive", action="store_false", default=None, help="取得したレスポンスをアーカイブに保存しません"
+    )
+    parser.add_argument(
+        "--reextract",
+        metavar="ARCHIVE",
+        default=None,
+        help="通信を行わず、アーカイブ (config.ARCHIVE_PATH) に保存されたレスポンスから抽出し直します",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="差分モード: 新規・変更された求人だけ詳細ページを取得し、差分ファイルを出力します",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=logging_config.LOG_FORMATS,
+        default=None,
+        help="ログの形式 (json は1行1レコードの JSON。デフォルト: config.LOG_FORMAT)",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="一覧ページの代わりにサイトマップ・RSS/Atom フィード (サイト設定の DISCOVERY) から詳細ページのURLを列挙します",
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        default=None,
+        help="フェーズごとの所要時間・転送量・スループットを計測し、JSON と Prometheus 形式で保存します",
+    )
+    parser.add_argument("--coordinator", action="store_true", help="タスクキューに一覧ページを投入し、ワーカーの取得結果をファイルに出力します")
+    parser.add_argument("--worker", action="store_true", help="タスクキューのタスクを処理するワーカーとして動作します")
+    parser.add_argument(
+        "--serve-queue",
+        metavar="[HOST:]PORT",
+        default=None,
+        help="タスクキューをHTTPで公開し、他のマシンのワーカーから使えるようにします",
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help="タスクキューのSQLiteファイルまたはURL (デフォルト: config.WORKQUEUE_URL / WORKQUEUE_PATH)",
+    )
+    parser.add_argument("--run-id", default=None, help="コーディネーターの実行ID (同じIDで再実行すると続きから処理します)")
     args = parser.parse_args()
-    main(args.site, args.start_page, args.resume, args.log_level)
\ No newline at end of file
+    if args.serve_queue:
+        setup_logging(args.log_level, args.log_format)
+        host, _, port = args.serve_queue.rpartition(":")
+        queue_path = args.queue or getattr(config, "WORKQUEUE_PATH", "state/workqueue.sqlite3")
+        workqueue.serve_queue(workqueue.SqliteTaskQueue(queue_path), host or "127.0.0.1", int(port))
+        raise SystemExit(0)
+    if not args.sites and not args.worker:
+        parser.error("サイト名を指定してください。")
+    main(
+        args.sites,
+        args.start_page,
+        args.resume,
+        args.log_level,
+        args.workers,
+        use_cache=not args.no_cache,
+        clear_cache=args.clear_cache,
+        incremental=args.incremental,
+        coordinator=args.coordinator,
+        worker=args.worker,
+        queue_location=args.queue,
+        run_id=args.run_id,
+        parse_processes=args.parse_processes,
+        enable_metrics=args.metrics,
+        output_format=args.format,
+        use_archive=args.archive,
+        reextract=args.reextract,
+        memory_budget_mb=args.memory_budget,
+        discover=args.discover,
+        log_format=args.log_format,
+    )
\ No newline at end of file
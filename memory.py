@@ -0,0 +1,78 @@
+"""メモリ上限付きのクロールで使うメモリ使用量の追跡。
+
+tracemalloc で Python が確保したメモリを追跡し、上限の判定とページごとのピークの
+報告に使う。tracemalloc はメモリ確保のたびに記録を行うため、有効にすると解析が
+遅くなる。計測はプロセス全体で1つのため、複数サイトを並行して実行した場合の
+ページごとのピークは他のサイトの処理も含む。
+"""
+
+from __future__ import annotations
+
+import gc
+import threading
+import time
+import tracemalloc
+from typing import Optional
+
+MB = 1024 * 1024
+# 回収しても上限を超えたままだった場合に、次に回収するまでの間隔 (秒)
+COLLECT_INTERVAL = 1.0
+
+
+class MemoryBudget:
+    """メモリ使用量の上限 (``limit_bytes``) と、ページごと・実行全体のピークを保持する。"""
+
+    def __init__(self, limit_bytes: Optional[int]):
+        self.limit_bytes = limit_bytes
+        self.peak_bytes = 0
+        self._lock = threading.Lock()
+        self._started = False
+        # 最後に回収しても上限を超えたままだった時刻 (下回れば None)
+        self._still_over_at: Optional[float] = None
+
+    @classmethod
+    def from_megabytes(cls, limit_mb: float) -> "MemoryBudget":
+        return cls(int(limit_mb * MB))
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started = True
+
+    def stop(self) -> None:
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    def current(self) -> int:
+        """現在追跡しているメモリ量 (バイト) を返す。"""
+        return tracemalloc.get_traced_memory()[0]
+
+    def exceeded(self) -> bool:
+        """メモリ使用量が上限を超えていれば真を返す。
+
+        追跡中のメモリ量が上限以下なら回収せずに偽を返す。上限を超えているときだけ
+        循環参照を回収して判定し直し、回収しても超えたままなら ``COLLECT_INTERVAL`` 秒の間は
+        回収せずに真を返す。
+        """
+        if self.limit_bytes is None:
+            return False
+        if self.current() <= self.limit_bytes:
+            return False
+        with self._lock:
+            if self._still_over_at is not None and time.monotonic() - self._still_over_at < COLLECT_INTERVAL:
+                return True
+        # 解析木は循環参照を持つため、回収してから判定し直す
+        gc.collect()
+        over = self.current() > self.limit_bytes
+        with self._lock:
+            self._still_over_at = time.monotonic() if over else None
+        return over
+
+    def page_peak(self) -> int:
+        """前回の呼び出しからのピーク (バイト) を返し、ピークの計測をやり直す。"""
+        with self._lock:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            self.peak_bytes = max(self.peak_bytes, peak)
+        return peak
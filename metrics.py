@@ -0,0 +1,230 @@
+"""クロール処理のフェーズごとの所要時間と件数を集計する計測フック。
+
+``enable`` を呼ぶまではすべてのフックが何もせずに戻るため、無効時のコストは
+関数呼び出し1回分に収まる。集計結果は実行終了時に JSON と Prometheus の
+テキスト形式で書き出す。
+
+フェーズ:
+    wait     レートリミッタによる待機 (同時接続枠・アクセス間隔・Retry-After)
+    network  HTTPリクエストの送信から応答の受信まで
+    parse    BeautifulSoup による解析 (プロセス内で行ったもの)
+    extract  求人カード・詳細ページからの項目の抽出 (解析は含まない。プロセス内で行ったもの)
+    pool     プロセスプールでの解析と抽出 (受け渡しを含む)
+    card     求人カード1件の処理全体
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# ヒストグラムの上限値 (秒)
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """累積しないバケットごとの件数と合計・最大値を保持するヒストグラム。"""
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """バケットの上限値からおおよその分位点を返す。"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p90": round(self.quantile(0.9), 6),
+            "p99": round(self.quantile(0.99), 6),
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """フェーズごとのヒストグラムとラベル付きカウンタの集計先。"""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+
+    def observe(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(phase)
+            if histogram is None:
+                histogram = self._histograms[phase] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _total(self, name: str) -> float:
+        return sum(value for (counter, _), value in self._counters.items() if counter == name)
+
+    def _by_label(self, name: str, *label_names: str) -> Dict:
+        """カウンタをラベルの値で入れ子にした辞書を返す。"""
+        result: Dict = {}
+        for (counter, labels), value in sorted(self._counters.items()):
+            if counter != name:
+                continue
+            values = dict(labels)
+            node = result
+            for label in label_names[:-1]:
+                node = node.setdefault(values.get(label, ""), {})
+            node[values.get(label_names[-1], "")] = value
+        return result
+
+    def summary(self) -> Dict:
+        """実行全体の集計結果を返す。"""
+        with self._lock:
+            elapsed = time.time() - self.started
+            pages = self._total("pages")
+            cards = self._total("cards")
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "pages": pages,
+                "cards": cards,
+                "cards_failed": self._total("cards_failed"),
+                "pages_per_second": round(pages / elapsed, 3) if elapsed > 0 else 0.0,
+                "cards_per_second": round(cards / elapsed, 3) if elapsed > 0 else 0.0,
+                "pages_by_site": self._by_label("pages", "site"),
+                "cards_by_site": self._by_label("cards", "site"),
+                "phases": {phase: h.summary() for phase, h in sorted(self._histograms.items())},
+                "bytes_downloaded": self._by_label("bytes_downloaded", "host"),
+                "status_codes": self._by_label("responses", "host", "status"),
+            }
+
+    def prometheus(self) -> str:
+        """Prometheus のテキスト形式 (textfile collector 用) で返す。"""
+        lines: List[str] = [
+            "# HELP scraping_phase_seconds Time spent in each crawl phase.",
+            "# TYPE scraping_phase_seconds histogram",
+        ]
+        with self._lock:
+            for phase, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(BUCKETS, histogram.buckets):
+                    cumulative += n
+                    lines.append(f'scraping_phase_seconds_bucket{{phase="{phase}",le="{bound}"}} {cumulative}')
+                lines.append(f'scraping_phase_seconds_bucket{{phase="{phase}",le="+Inf"}} {histogram.count}')
+                lines.append(f'scraping_phase_seconds_sum{{phase="{phase}"}} {histogram.total:.6f}')
+                lines.append(f'scraping_phase_seconds_count{{phase="{phase}"}} {histogram.count}')
+
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                lines.append(f"# TYPE scraping_{name}_total counter")
+                for (counter, labels), value in sorted(self._counters.items()):
+                    if counter != name:
+                        continue
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                    lines.append(f"scraping_{name}_total{{{label_text}}} {value:g}")
+
+            elapsed = time.time() - self.started
+            lines.append("# TYPE scraping_run_seconds gauge")
+            lines.append(f"scraping_run_seconds {elapsed:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_active: Optional[Metrics] = None
+_NULL_TIMER = nullcontext()
+
+
+def enable() -> Metrics:
+    """計測を有効にし、新しい集計先を返す。"""
+    global _active
+    _active = Metrics()
+    return _active
+
+
+def disable() -> None:
+    global _active
+    _active = None
+
+
+def active() -> Optional[Metrics]:
+    """有効な集計先を返す。無効なら None。"""
+    return _active
+
+
+def observe(phase: str, seconds: float) -> None:
+    """フェーズの所要時間を記録する。"""
+    if _active is not None:
+        _active.observe(phase, seconds)
+
+
+def count(name: str, value: float = 1, **labels: str) -> None:
+    """カウンタを加算する。"""
+    if _active is not None:
+        _active.count(name, value, **labels)
+
+
+def timer(phase: str) -> ContextManager[None]:
+    """with 文の区間の所要時間をフェーズとして記録する。"""
+    if _active is None:
+        return _NULL_TIMER
+    return _timed(_active, phase)
+
+
+@contextmanager
+def _timed(target: Metrics, phase: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        target.observe(phase, time.perf_counter() - started)
+
+
+def write_reports(directory: str, prefix: str) -> Optional[Tuple[str, str]]:
+    """集計結果を JSON と Prometheus 形式で書き出し、(JSONのパス, Prometheusのパス) を返す。"""
+    if _active is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    json_path = os.path.join(directory, f"{prefix}.json")
+    prom_path = os.path.join(directory, f"{prefix}.prom")
+    _write_atomic(json_path, json.dumps(_active.summary(), ensure_ascii=False, indent=2) + "\n")
+    # textfile collector が書き込み途中のファイルを読まないよう置き換えで書く
+    _write_atomic(prom_path, _active.prometheus())
+    return json_path, prom_path
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
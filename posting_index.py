@@ -0,0 +1,170 @@
+"""差分クロールのために求人ごとのカード指紋と取得結果を保持するインデックス。"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ADDED = "added"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+REMOVED = "removed"
+
+
+def fingerprint(text: str) -> str:
+    """正規化したカードのテキストから指紋を作る。"""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class PostingIndex:
+    """求人URLをキーに、一覧カードの指紋と取得済みの求人情報をSQLiteに保存する。
+
+    実行ごとに追加・変更された求人を記録し、最後のページまで巡回できた実行では
+    今回見つからなかった求人を削除扱いにする。
+
+    複数のサイトが同じファイルを共有するため、書き込みは1件ごとに短いトランザクションで
+    確定し、書き込みのロックを保持したままにしない。
+    """
+
+    def __init__(self, path: str, site: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.site = site
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 1件ごとに確定するため、確定のたびにディスクへ同期しない (WAL では壊れることはない)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS postings (
+                site TEXT NOT NULL,
+                url TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                details TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (site, url)
+            )
+            """
+        )
+        self._conn.commit()
+        self._fingerprints: Dict[str, str] = {
+            url: fp for url, fp in self._conn.execute(
+                "SELECT url, fingerprint FROM postings WHERE site = ?", (site,)
+            )
+        }
+        self.run_started = time.time()
+        self.crawl_complete = False
+        self._seen: Dict[str, str] = {}
+        self._changes: List[Tuple[str, str]] = []
+        self._removed: Dict[str, Dict[str, str]] = {}
+
+    def classify(self, url: str, card_fingerprint: str) -> str:
+        """カードが新規・変更・変更なしのいずれかを返す。"""
+        known = self._fingerprints.get(url)
+        if known is None:
+            return ADDED
+        return UNCHANGED if known == card_fingerprint else CHANGED
+
+    def stored_details(self, url: str) -> Optional[Dict[str, str]]:
+        """前回取得した求人情報を返す。"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT details FROM postings WHERE site = ? AND url = ?", (self.site, url)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def mark_seen(self, url: str) -> None:
+        """一覧に掲載されていた求人 (変更なし・取得失敗・取得済み) を今回の実行で確認済みにする。"""
+        with self._lock:
+            self._seen[url] = UNCHANGED
+            self._conn.execute(
+                "UPDATE postings SET last_seen = ? WHERE site = ? AND url = ?",
+                (self.run_started, self.site, url),
+            )
+            self._conn.commit()
+
+    def record(self, url: str, card_fingerprint: str, details: Dict[str, str]) -> None:
+        """新規・変更された求人の指紋と取得結果を保存する。"""
+        with self._lock:
+            change = ADDED if url not in self._fingerprints else CHANGED
+            self._conn.execute(
+                """
+                INSERT INTO postings (site, url, fingerprint, details, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (site, url) DO UPDATE SET
+                    fingerprint = excluded.fingerprint,
+                    details = excluded.details,
+                    last_seen = excluded.last_seen
+                """,
+                (
+                    self.site,
+                    url,
+                    card_fingerprint,
+                    json.dumps(details, ensure_ascii=False),
+                    self.run_started,
+                    self.run_started,
+                ),
+            )
+            self._conn.commit()
+            self._fingerprints[url] = card_fingerprint
+            self._seen[url] = change
+            self._changes.append((change, url))
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def finish_run(self) -> Iterator[Dict[str, str]]:
+        """今回見つからなかった求人を処理する。
+
+        最後のページまで巡回できた場合は削除として記録する。途中で打ち切った場合は
+        まだ掲載中とみなし、スナップショットに含めるため保存済みの求人情報を返す。
+        """
+        with self._lock:
+            unseen = [url for url in self._fingerprints if url not in self._seen]
+
+        if self.crawl_complete:
+            for url in unseen:
+                self._removed[url] = self.stored_details(url) or {"求人URL": url}
+            with self._lock:
+                # 削除は1つのトランザクションにまとめ、読み出しの間は書き込みのロックを持たない
+                self._conn.executemany(
+                    "DELETE FROM postings WHERE site = ? AND url = ?", [(self.site, url) for url in unseen]
+                )
+                self._conn.commit()
+                for url in unseen:
+                    del self._fingerprints[url]
+                    self._changes.append((REMOVED, url))
+            return
+
+        self.logger.info("巡回を途中で終了したため、未確認の求人 %d 件を前回の内容で出力します。", len(unseen))
+        for url in unseen:
+            details = self.stored_details(url)
+            if details:
+                yield details
+        self.commit()
+
+    def iter_changes(self) -> Iterator[Tuple[str, str, Dict[str, str]]]:
+        """今回の実行で記録された (変更種別, 求人URL, 求人情報) を順に返す。"""
+        with self._lock:
+            changes = list(self._changes)
+        for change, url in changes:
+            details = self._removed.get(url) if change == REMOVED else self.stored_details(url)
+            yield change, url, details or {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
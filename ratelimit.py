@@ -0,0 +1,169 @@
+"""ホストごとのアクセス速度を応答状況に応じて調整するレートリミッタ。"""
+
+from __future__ import annotations
+
+import email.utils
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+import config
+
+# 再試行の対象とするステータスコード
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# 速度を落とすべき過負荷を示すステータスコード
+OVERLOAD_STATUSES = frozenset({429, 503})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After ヘッダ (秒数またはHTTP日付) を待機秒数に変換する。"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """ジッター付き指数バックオフ (full jitter) の待機秒数を返す。"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class _HostState:
+    def __init__(self, rate: float, burst: float, max_concurrency: int):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.requests = 0
+        self.errors = 0
+
+
+class AdaptiveRateLimiter:
+    """ホストごとのトークンバケットを AIMD で調整するレートリミッタ。
+
+    正常かつ応答時間が目標以内の応答ごとに速度を ``increase`` (リクエスト/秒) ずつ上げ、
+    429/503・サーバーエラー・通信エラー・目標を超える応答時間では ``decrease`` 倍に下げる。
+    ``block`` で指定した時刻まではそのホストへのリクエストを止める (Retry-After)。
+    """
+
+    def __init__(
+        self,
+        initial_rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: float = 1,
+        increase: float = 0.05,
+        decrease: float = 0.5,
+        latency_target: float = 2.0,
+        max_concurrency: int = 1,
+    ):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1.0, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.max_concurrency = max(1, max_concurrency)
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, _HostState] = {}
+
+    @classmethod
+    def from_config(cls) -> "AdaptiveRateLimiter":
+        return cls(
+            initial_rate=config.RATE_LIMIT_INITIAL,
+            min_rate=config.RATE_LIMIT_MIN,
+            max_rate=config.RATE_LIMIT_MAX,
+            burst=getattr(config, "RATE_LIMIT_BURST", 1),
+            increase=getattr(config, "RATE_LIMIT_INCREASE", 0.05),
+            decrease=getattr(config, "RATE_LIMIT_DECREASE", 0.5),
+            latency_target=getattr(config, "RATE_LIMIT_LATENCY_TARGET", 2.0),
+            max_concurrency=getattr(config, "PER_HOST_CONCURRENCY", 1),
+        )
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = _HostState(self.initial_rate, self.burst, self.max_concurrency)
+            self._hosts[host] = state
+        return state
+
+    def _acquire_token(self, host: str, url: str) -> None:
+        while True:
+            with self._lock:
+                state = self._state(host)
+                now = time.monotonic()
+                state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+                state.updated = now
+                if state.blocked_until > now:
+                    wait = state.blocked_until - now
+                elif state.tokens >= 1:
+                    state.tokens -= 1
+                    state.requests += 1
+                    return
+                else:
+                    wait = (1 - state.tokens) / state.rate
+            self.logger.debug("HTTPリクエスト前に %.2f 秒待機します url=%s", wait, url)
+            time.sleep(wait)
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """ホストの同時接続枠とトークンを確保してから処理を行う。"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._state(host).semaphore
+        with semaphore:
+            self._acquire_token(host, url)
+            yield
+
+    def adjust(self, rate: float, status: Optional[int], latency: float) -> Tuple[float, bool]:
+        """応答結果から (次のアクセス速度, エラーかどうか) を返す。``status`` が None なら通信エラー。"""
+        healthy = status is not None and status < 500 and status not in OVERLOAD_STATUSES
+        if healthy and latency <= self.latency_target:
+            return min(self.max_rate, rate + self.increase), False
+        return max(self.min_rate, rate * self.decrease), not healthy
+
+    def record(self, url: str, status: Optional[int], latency: float) -> None:
+        """応答結果から次のアクセス速度を調整する。``status`` が None なら通信エラー。"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            state = self._state(host)
+            previous = state.rate
+            state.rate, error = self.adjust(state.rate, status, latency)
+            state.errors += error
+            if state.rate >= previous:
+                return
+        self.logger.debug(
+            "アクセス速度を下げました host=%s status=%s latency=%.2f rate=%.3f->%.3f",
+            host, status, latency, previous, state.rate,
+        )
+
+    def block(self, url: str, seconds: float) -> None:
+        """指定秒数のあいだホストへのリクエストを止める。"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            state = self._state(host)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ホストごとの現在の速度とリクエスト数を返す。"""
+        with self._lock:
+            return {
+                host: {"rate": state.rate, "requests": state.requests, "errors": state.errors}
+                for host, state in self._hosts.items()
+            }
@@ -4,77 +4,478 @@
 from __future__ import annotations
 
 import abc
+import copy
+import itertools
 import logging
 import math
+import queue
 import re
+import threading
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from urllib.parse import urljoin
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
 
+import config
+import http_client
+import metrics
+import posting_index
 import utils
-from bs4 import BeautifulSoup
+from checkpoint import CheckpointStore
+from dedup import DuplicateDetector
+from discovery import Discovery
+from extraction_plan import ExtractionPlan
+from memory import MB, MemoryBudget
+from posting_index import PostingIndex
+from section_extractor import SectionExtractor, SectionStreamScanner
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+class CardTask(NamedTuple):
+    """詳細取得の対象となる求人カード。"""
+
+    index: int
+    # サイトマップ・フィードから列挙したURLでは None
+    job_card: Optional[BeautifulSoup]
+    detail_url: str
+    fingerprint: Optional[str] = None
+    # 差分モードで内容が変わっていないカードの前回の取得結果
+    cached_details: Optional[Dict[str, str]] = None
+
 
 class BaseScraper(abc.ABC):
     """すべてのスクレイパーの基底クラス。共通処理を定義する。"""
 
-    def __init__(self, site_name: str, site_config: Dict):
+    def __init__(
+        self,
+        site_name: str,
+        site_config: Dict,
+        max_workers: int = 1,
+        session: Optional[http_client.HttpSession] = None,
+        parse_pool: Optional[Executor] = None,
+        memory_budget: Optional[MemoryBudget] = None,
+    ):
         self.site_name = site_name
         self.site_config = site_config
         self.base_url = site_config["BASE_URL"]
+        self.max_workers = max(1, max_workers)
+        self.session = session or http_client.get_default_session()
+        self.parse_pool = parse_pool
+        # 指定されていればメモリ上限付きで実行する (解析木を使い終わった時点で解放する)
+        self.memory_budget = memory_budget
+        # メモリ使用量が上限を超えた警告を出したか (上限を下回るまで繰り返さない)
+        self._over_budget = False
+        self.parser = utils.resolve_parser(site_config.get("PARSER"))
+        self.listing_strainer = self._build_listing_strainer()
+        self.extraction_plan = self._build_extraction_plan()
         self.logger = logging.getLogger(self.__class__.__name__)
 
-    def scrape(self, start_page: int, scraped_count: int, max_items: Optional[int]) -> List[Dict[str, str]]:
-        """スクレイピングのメインフローを実行する。"""
-        all_job_details: List[Dict[str, str]] = []
-
-        total_items, last_page = self._get_pagination_info()
+    def scrape(
+        self,
+        start_page: int,
+        max_items: Optional[int],
+        checkpoint: Optional[CheckpointStore] = None,
+        index: Optional[PostingIndex] = None,
+        stop_after_unchanged_pages: Optional[int] = None,
+        discovery: Optional[Discovery] = None,
+    ) -> Iterator[Dict[str, str]]:
+        """スクレイピングのメインフローを実行し、取得した求人情報を1件ずつ返す。
+
+        ``checkpoint`` を渡すと取得済みの求人URLをスキップし、呼び出し側が
+        求人情報を受け取った後でURLとページの進捗を記録する。
+        ``index`` を渡すと差分モードになり、カードの内容が前回から変わっていない
+        求人は詳細ページを取得せず前回の結果を返す。新規・変更のないページが
+        ``stop_after_unchanged_pages`` ページ続いた時点で巡回を打ち切る。
+        ``discovery`` を渡すと一覧ページを巡回せず、サイトマップ・フィードから列挙した
+        詳細ページを取得する。
+        """
+        if discovery is not None:
+            yield from self._scrape_discovered(discovery, max_items, checkpoint, index)
+            return
+
+        collected = 0
+
+        first_page_soup = self._get_soup(self.site_config["TARGET_URL"], parse_only=self.listing_strainer)
+        total_items, last_page = (
+            self._get_pagination_info(first_page_soup) if first_page_soup else (None, None)
+        )
         if total_items is None or last_page is None:
             self.logger.error("総件数または最終ページの取得に失敗しました。処理を終了します。")
-            return []
+            return
+        if start_page != 1:
+            self._release(first_page_soup)
 
         page = start_page
-        skip_items = scraped_count % self.site_config.get("ITEMS_PER_PAGE", 30)
+        complete = start_page == 1
+        unchanged_pages = 0
 
-        while page <= last_page:
-            if max_items is not None and len(all_job_details) >= max_items:
-                self.logger.info(f"最大取得件数({max_items}件)に達しました。処理を中断します。")
-                break
-
-            self.logger.info(f"--- {page}ページ目の処理を開始します ---")
-            target_url = self._get_page_url(page)
-            list_soup = utils.get_soup(target_url)
-            if not list_soup:
-                self.logger.error(f"{target_url} の取得に失敗。このページをスキップします。")
-                page += 1
-                continue
+        listing_pages = self._iter_listing_pages(
+            start_page, last_page, first_page_soup if start_page == 1 else None
+        )
+        executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        try:
+            for page, target_url, list_soup in listing_pages:
+                if max_items is not None and collected >= max_items:
+                    self.logger.info("最大取得件数(%d件)に達しました。処理を中断します。", max_items)
+                    complete = False
+                    break
 
-            job_cards = self._find_job_cards(list_soup)
-            if not job_cards:
-                self.logger.warning(f"ページ {page} で求人カードが見つかりませんでした。")
-                break
+                self.logger.info("--- %dページ目の処理を開始します ---", page)
+                if not list_soup:
+                    self.logger.error("%s の取得に失敗。このページをスキップします。", target_url)
+                    complete = False
+                    continue
 
-            self.logger.info(f"ページ {page} で求人カードを {len(job_cards)} 件検出しました。")
+                job_cards = self._find_job_cards(list_soup)
+                if not job_cards:
+                    self.logger.warning("ページ %d で求人カードが見つかりませんでした。", page)
+                    complete = False
+                    break
 
-            for i, job_card in enumerate(job_cards):
-                if max_items is not None and len(all_job_details) >= max_items:
+                self.logger.info("ページ %d で求人カードを %d 件検出しました。", page, len(job_cards))
+
+                tasks: List[CardTask] = []
+                for i, job_card, detail_url in self._iter_detail_targets(job_cards):
+                    if checkpoint and checkpoint.is_done(detail_url):
+                        self.logger.debug("取得済みの求人をスキップしました url=%s", detail_url)
+                        if index:
+                            # 掲載中のため、巡回を終えたときに削除扱いにしない
+                            index.mark_seen(detail_url)
+                        continue
+                    tasks.append(self._make_task(i, self._detach(job_card), detail_url, index))
+                if self.memory_budget is not None:
+                    # カードは複製済みのため、詳細ページの取得前に一覧ページの木を解放する
+                    del job_cards
+                    self._release(list_soup)
+
+                fresh_cards = sum(1 for task in tasks if task.cached_details is None)
+                remaining = None if max_items is None else max_items - collected
+                for job_details in self._iter_results(tasks, remaining, executor, checkpoint, index):
+                    collected += 1
+                    yield job_details
+
+                metrics.count("pages", site=self.site_name)
+                if self.memory_budget is not None:
+                    self.logger.info(
+                        "ページ %d のピークメモリ: %.1f MB (現在 %.1f MB)",
+                        page, self.memory_budget.page_peak() / MB, self.memory_budget.current() / MB,
+                    )
+                if checkpoint and (max_items is None or collected < max_items):
+                    checkpoint.mark_page_done(page)
+                self.logger.info("ページ処理完了。現在の累計取得件数: %d", collected)
+
+                if index:
+                    index.commit()
+                    self.logger.info("新規・変更された求人: %d 件 / %d 件", fresh_cards, len(tasks))
+                    unchanged_pages = unchanged_pages + 1 if fresh_cards == 0 else 0
+                    if stop_after_unchanged_pages and unchanged_pages >= stop_after_unchanged_pages and page < last_page:
+                        self.logger.info(
+                            "新規・変更のないページが %d ページ続いたため巡回を終了します。", unchanged_pages
+                        )
+                        complete = False
+                        break
+        finally:
+            listing_pages.close()
+            if executor:
+                executor.shutdown(wait=True)
+
+        if index:
+            index.crawl_complete = complete
+
+    def _scrape_discovered(
+        self,
+        discovery: Discovery,
+        max_items: Optional[int],
+        checkpoint: Optional[CheckpointStore],
+        index: Optional[PostingIndex],
+    ) -> Iterator[Dict[str, str]]:
+        """サイトマップ・フィードから列挙した詳細ページを ``ITEMS_PER_PAGE`` 件ずつ取得する。
+
+        差分モードでは、カードの指紋の代わりに更新日時 (lastmod) で前回からの変更を判定する。
+        """
+        collected = 0
+        complete = True
+        batch_size = self.site_config.get("ITEMS_PER_PAGE", 30)
+        urls = discovery.iter_urls()
+        executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.max_workers > 1 else None
+        try:
+            while True:
+                if max_items is not None and collected >= max_items:
+                    self.logger.info("最大取得件数(%d件)に達しました。処理を中断します。", max_items)
+                    complete = False
+                    break
+                batch = list(itertools.islice(urls, batch_size))
+                if not batch:
                     break
-                if i < skip_items:
-                    continue
 
-                if "p-ad-item" in job_card.get("class", []):
-                    self.logger.debug("広告カードを検出しスキップしました index=%d", i)
-                    continue
+                tasks: List[CardTask] = []
+                for i, entry in enumerate(batch):
+                    if checkpoint and checkpoint.is_done(entry.url):
+                        self.logger.debug("取得済みの求人をスキップしました url=%s", entry.url)
+                        if index:
+                            index.mark_seen(entry.url)
+                        continue
+                    lastmod = entry.lastmod.isoformat() if entry.lastmod else None
+                    tasks.append(self._make_task(i, None, entry.url, index, card_fingerprint=lastmod))
+
+                remaining = None if max_items is None else max_items - collected
+                for job_details in self._iter_results(tasks, remaining, executor, checkpoint, index):
+                    collected += 1
+                    yield job_details
+                if index:
+                    index.commit()
+                self.logger.info("列挙したURLの処理完了。現在の累計取得件数: %d", collected)
+        finally:
+            urls.close()
+            if executor:
+                executor.shutdown(wait=True)
+
+        self.logger.info(
+            "サイトマップ・フィード %d 件から %d 件のURLを列挙しました (対象外 %d 件)。",
+            discovery.stats["documents"],
+            discovery.stats["urls"],
+            discovery.stats["skipped"],
+        )
+        if index:
+            index.crawl_complete = complete and discovery.complete
+
+    def _iter_results(
+        self,
+        tasks: List[CardTask],
+        remaining: Optional[int],
+        executor: Optional[ThreadPoolExecutor],
+        checkpoint: Optional[CheckpointStore],
+        index: Optional[PostingIndex],
+    ) -> Iterator[Dict[str, str]]:
+        """タスクを処理して取得できた求人情報を返し、求人インデックスとチェックポイントに記録する。"""
+        for task, job_details in self._process_job_cards(tasks, remaining, executor):
+            if job_details:
+                if index:
+                    if task.cached_details is not None:
+                        index.mark_seen(task.detail_url)
+                    else:
+                        index.record(task.detail_url, task.fingerprint or "", job_details)
+                if checkpoint:
+                    # 結果ファイルに書き込まれる前に記録する (記録はバッファされ、この行を含む
+                    # フラッシュの後に確定するため、書き込んだ行が未取得として残らない)
+                    checkpoint.mark_done(task.detail_url)
+                yield job_details
+            else:
+                self.logger.warning("求人情報の取得に失敗しました (カード %d)。", task.index + 1)
+                if index:
+                    # 一覧には掲載されているため削除扱いにしない (指紋は更新しないので次回また取得する)
+                    index.mark_seen(task.detail_url)
+
+    def _iter_listing_pages(
+        self,
+        start_page: int,
+        last_page: int,
+        first_page_soup: Optional[BeautifulSoup],
+    ) -> Iterator[Tuple[int, str, Optional[BeautifulSoup]]]:
+        """一覧ページを (ページ番号, URL, 解析結果) の順に返す。
+
+        ``LISTING_PREFETCH`` が1以上なら別スレッドで次のページを先読みし、
+        詳細ページの処理と一覧ページの取得を並行させる。先読みしたページは
+        その件数を上限とするキューに置かれる。
+        ``first_page_soup`` があれば1ページ目は再取得しない。
+        """
+        def fetch(page: int) -> Tuple[int, str, Optional[BeautifulSoup]]:
+            target_url = self._get_page_url(page)
+            if page == 1 and first_page_soup is not None:
+                return page, target_url, first_page_soup
+            return page, target_url, self._get_soup(target_url, parse_only=self.listing_strainer)
 
-                job_details = self._process_job_card(job_card)
-                if job_details:
-                    all_job_details.append(job_details)
-                else:
-                    self.logger.warning(f"求人情報の取得に失敗しました (カード {i+1})。")
+        prefetch = self.site_config.get("LISTING_PREFETCH", getattr(config, "LISTING_PREFETCH", 0))
+        if prefetch <= 0:
+            for page in range(start_page, last_page + 1):
+                yield fetch(page)
+            return
 
-            skip_items = 0
-            page += 1
-            self.logger.info("ページ処理完了。現在の累計取得件数: %d", len(all_job_details))
+        pages: "queue.Queue[Optional[Tuple[int, str, Optional[BeautifulSoup]]]]" = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
 
-        return all_job_details
+        def produce() -> None:
+            try:
+                for page in range(start_page, last_page + 1):
+                    item = fetch(page)
+                    while not stop.is_set():
+                        try:
+                            pages.put(item, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                self.logger.error("一覧ページの先読み中に例外が発生しました: %s", e)
+            finally:
+                while not stop.is_set():
+                    try:
+                        pages.put(None, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+
+        producer = threading.Thread(target=produce, name=f"{self.site_name}-listing", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is None:
+                    return
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+    def _make_task(
+        self,
+        index_in_page: int,
+        job_card: Optional[BeautifulSoup],
+        detail_url: str,
+        index: Optional[PostingIndex],
+        card_fingerprint: Optional[str] = None,
+    ) -> CardTask:
+        """求人カードから詳細取得のタスクを作る。差分モードでは前回の結果を引き当てる。
+
+        ``card_fingerprint`` を省略するとカードのテキストから指紋を作る。カードも指紋も
+        なければ (更新日時のない列挙したURL) 変更の有無が分からないため、常に取得する。
+        """
+        if index is None:
+            return CardTask(index_in_page, job_card, detail_url)
+
+        if card_fingerprint is None and job_card is not None:
+            card_fingerprint = posting_index.fingerprint(job_card.get_text(" ", strip=True))
+        if card_fingerprint is None:
+            return CardTask(index_in_page, job_card, detail_url)
+        cached_details = None
+        if index.classify(detail_url, card_fingerprint) == posting_index.UNCHANGED:
+            cached_details = index.stored_details(detail_url)
+        return CardTask(index_in_page, job_card, detail_url, card_fingerprint, cached_details)
+
+    def _run_task(self, task: CardTask) -> Optional[Dict[str, str]]:
+        try:
+            if task.cached_details is not None:
+                return dict(task.cached_details)
+            return self._process_job_card(task.job_card, task.detail_url)
+        finally:
+            self._release(task.job_card)
+
+    def _process_job_cards(
+        self,
+        tasks: List[CardTask],
+        remaining: Optional[int],
+        executor: Optional[ThreadPoolExecutor],
+    ) -> Iterator[Tuple[CardTask, Optional[Dict[str, str]]]]:
+        """求人カードを処理し、結果をカードの並び順で返す。
+
+        並列実行時も、成功件数が ``remaining`` を超えない範囲でのみ詳細取得を投入する。
+        取得に失敗した場合は次のカードを補充するため、逐次実行と同じ件数・順序になる。
+        メモリ上限を超えている間、並列実行では新たな取得を投入しない。逐次実行では
+        同時に取得するのは1件だけのため、取得のたびに回収を行い、超えたままなら警告する。
+        """
+        if executor is None:
+            collected = 0
+            for task in tasks:
+                if remaining is not None and collected >= remaining:
+                    return
+                if self.memory_budget is not None:
+                    self._check_memory_budget()
+                job_details = self._run_task(task)
+                if job_details:
+                    collected += 1
+                yield task, job_details
+            return
+
+        pending: Deque[Tuple[CardTask, Future]] = deque()
+        queue = iter(tasks)
+        collected = 0
+
+        def refill() -> None:
+            while remaining is None or collected + len(pending) < remaining:
+                if pending and self.memory_budget is not None and self.memory_budget.exceeded():
+                    # メモリ上限を超えている間は、処理中のカードが終わるまで新たに投入しない
+                    return
+                task = next(queue, None)
+                if task is None:
+                    return
+                pending.append((task, executor.submit(self._run_task, task)))
+
+        refill()
+        try:
+            while pending:
+                task, future = pending.popleft()
+                try:
+                    job_details = future.result()
+                except Exception as e:
+                    self.logger.error("求人カードの処理中に例外が発生しました (カード %d): %s", task.index + 1, e)
+                    job_details = None
+                if job_details:
+                    collected += 1
+                yield task, job_details
+                refill()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+    def _check_memory_budget(self) -> None:
+        """メモリ使用量が上限を超えていれば (回収しても下回らなければ) 警告する。"""
+        exceeded = self.memory_budget.exceeded()
+        if exceeded and not self._over_budget:
+            self.logger.warning(
+                "メモリ使用量が上限を超えています (現在 %.1f MB / 上限 %.1f MB)。逐次実行のため取得は続けます。",
+                self.memory_budget.current() / MB, self.memory_budget.limit_bytes / MB,
+            )
+        self._over_budget = exceeded
+
+    def _get_soup(self, url: str, parse_only: Optional[SoupStrainer] = None) -> Optional[BeautifulSoup]:
+        """共有セッションとサイト設定のパーサを使ってページを取得する。"""
+        return utils.get_soup(url, session=self.session, parser=self.parser, parse_only=parse_only)
+
+    def _get_body(
+        self,
+        url: str,
+        stop_when: Optional[Callable[[bytes], bool]] = None,
+        max_bytes: Optional[int] = None,
+    ) -> Optional[bytes]:
+        """共有セッションでページの本文を取得する。``stop_when`` / ``max_bytes`` で受信を途中で打ち切る。"""
+        return utils.get_body(url, session=self.session, stop_when=stop_when, max_bytes=max_bytes)
+
+    def _extract(self, body: Optional[bytes], job_card: Optional[BeautifulSoup]) -> Dict[str, str]:
+        """``extract_job_details`` を、プロセスプールがあればそこで実行する。"""
+        if self.parse_pool is None:
+            return self.extract_job_details(body, job_card)
+        card_html = str(job_card) if job_card is not None else None
+        with metrics.timer("pool"):
+            future = self.parse_pool.submit(
+                extract_in_worker, type(self), self.site_name, self.site_config, body, card_html
+            )
+            return future.result()
+
+    def _build_listing_strainer(self) -> Optional[SoupStrainer]:
+        """一覧ページで求人カードと総件数の要素だけを解析するストレーナを作る。"""
+        if not self.site_config.get("PARTIAL_PARSE", False):
+            return None
+        targets = [(self.site_config["JOB_CARD_TAG"], self.site_config["JOB_CARD_CLASS"])]
+        if "TOTAL_COUNT_TAG" in self.site_config:
+            targets.append((self.site_config["TOTAL_COUNT_TAG"], self.site_config["TOTAL_COUNT_CLASS"]))
+        return utils.make_strainer(targets)
+
+    def create_discovery(self) -> Optional[Discovery]:
+        """サイト設定の DISCOVERY から詳細ページのURLの列挙を用意する。設定がなければ None。"""
+        settings = self.site_config.get("DISCOVERY")
+        if not settings:
+            return None
+        return Discovery(
+            settings,
+            session=self.session,
+            priority_window=getattr(config, "DISCOVERY_PRIORITY_WINDOW", 1000),
+            max_depth=getattr(config, "DISCOVERY_MAX_DEPTH", 3),
+        )
+
+    def _build_extraction_plan(self) -> ExtractionPlan:
+        """EXTRACTION_TARGETS をコンパイルした抽出プランを作る (カード・詳細ページごとに再利用する)。"""
+        return ExtractionPlan(self.site_config.get("EXTRACTION_TARGETS", {}))
 
     def _get_page_url(self, page: int) -> str:
         """ページ番号に応じた一覧ページのURLを返す。"""
@@ -83,8 +484,8 @@ class BaseScraper(abc.ABC):
         return f'{self.site_config["TARGET_URL"]}&page={page}'
 
     @abc.abstractmethod
-    def _get_pagination_info(self) -> Tuple[Optional[int], Optional[int]]:
-        """総アイテム数と最終ページ番号を取得する。"""
+    def _get_pagination_info(self, list_soup: BeautifulSoup) -> Tuple[Optional[int], Optional[int]]:
+        """1ページ目の一覧ページから総アイテム数と最終ページ番号を取得する。"""
         raise NotImplementedError
 
     def _find_job_cards(self, soup: BeautifulSoup) -> List[BeautifulSoup]:
@@ -94,8 +495,37 @@ class BaseScraper(abc.ABC):
             class_=self.site_config["JOB_CARD_CLASS"]
         )
 
-    def _process_job_card(self, job_card: BeautifulSoup) -> Optional[Dict[str, str]]:
-        """単一の求人カードを処理して詳細情報を返す。"""
+    def _iter_detail_targets(
+        self, job_cards: List[BeautifulSoup]
+    ) -> Iterator[Tuple[int, BeautifulSoup, str]]:
+        """広告と詳細URLのないカードを除き、(カード番号, カード, 詳細URL) を返す。"""
+        for i, job_card in enumerate(job_cards):
+            if "p-ad-item" in job_card.get("class", []):
+                self.logger.debug("広告カードを検出しスキップしました index=%d", i)
+                continue
+            detail_url = self._get_detail_url(job_card)
+            if not detail_url:
+                self.logger.warning("求人情報の取得に失敗しました (カード %d)。", i + 1)
+                continue
+            yield i, job_card, detail_url
+
+    def _detach(self, job_card: BeautifulSoup) -> BeautifulSoup:
+        """メモリ上限付きの場合、一覧ページの木から切り離したカードの複製を返す。"""
+        if self.memory_budget is None:
+            return job_card
+        return copy.copy(job_card)
+
+    def _release(self, soup: Optional[BeautifulSoup]) -> None:
+        """メモリ上限付きの場合、使い終わった解析木を解放する (循環参照を断ち切る)。"""
+        if self.memory_budget is not None and soup is not None:
+            soup.decompose()
+
+    def _load_card(self, card_html: str) -> Optional[BeautifulSoup]:
+        """HTML文字列として受け渡された求人カードを解析し直す。"""
+        return BeautifulSoup(card_html, self.parser).find(self.site_config["JOB_CARD_TAG"])
+
+    def _get_detail_url(self, job_card: BeautifulSoup) -> Optional[str]:
+        """求人カードから詳細ページの絶対URLを取得する。"""
         detail_link_tag = job_card.find(
             self.site_config["DETAIL_URL_TAG"],
             class_=self.site_config["DETAIL_URL_CLASS"]
@@ -105,42 +535,37 @@ class BaseScraper(abc.ABC):
             return None
 
         relative_url = detail_link_tag['href']
-        detail_url = urljoin(self.base_url, relative_url)
+        return urljoin(self.base_url, relative_url)
 
-        job_details = self.get_job_details(detail_url, job_card)
+    def _process_job_card(self, job_card: Optional[BeautifulSoup], detail_url: str) -> Optional[Dict[str, str]]:
+        """単一の求人カードを処理して詳細情報を返す。"""
+        with metrics.timer("card"):
+            job_details = self.get_job_details(detail_url, job_card)
         if job_details:
             job_details.setdefault("求人URL", detail_url)
+            metrics.count("cards", site=self.site_name)
+        else:
+            metrics.count("cards_failed", site=self.site_name)
         return job_details
 
     @abc.abstractmethod
-    def get_job_details(self, detail_url: str, job_card: BeautifulSoup) -> Optional[Dict[str, str]]:
-        """詳細ページから求人情報を抽出する。"""
+    def get_job_details(self, detail_url: str, job_card: Optional[BeautifulSoup]) -> Optional[Dict[str, str]]:
+        """詳細ページから求人情報を抽出する。``job_card`` はサイトマップ・フィードから列挙したURLでは None。"""
         raise NotImplementedError
 
-    def _parse_dl_tags(self, section_div: BeautifulSoup) -> Dict[str, str]:
-        """dlタグ配下の情報を辞書形式に整形する。"""
-        details: Dict[str, str] = {}
-        if not section_div:
-            return details
-        for dl in section_div.find_all("dl"):
-            dt = dl.find("dt")
-            dd = dl.find("dd")
-            if dt:
-                key = dt.text.strip()
-                value = " ".join(dd.text.strip().split()) if dd else "N/A"
-                details[key] = value
-        return details
+    @abc.abstractmethod
+    def extract_job_details(self, body: Optional[bytes], job_card: Optional[BeautifulSoup]) -> Dict[str, str]:
+        """取得済みの詳細ページの本文と求人カードから求人情報を抽出する (通信は行わない)。"""
+        raise NotImplementedError
 
 
 class InternScraper(BaseScraper):
     """01intern.com用のスクレイパー。"""
 
-    def _get_pagination_info(self) -> Tuple[Optional[int], Optional[int]]:
-        list_soup = utils.get_soup(self.site_config["TARGET_URL"])
-        if not list_soup:
-            return None, None
-
-        total_items_text_element = list_soup.find("p", class_="i-recruitment-title")
+    def _get_pagination_info(self, list_soup: BeautifulSoup) -> Tuple[Optional[int], Optional[int]]:
+        total_items_text_element = list_soup.find(
+            self.site_config["TOTAL_COUNT_TAG"], class_=self.site_config["TOTAL_COUNT_CLASS"]
+        )
         if not total_items_text_element:
             self.logger.error("総件数の取得に失敗しました。")
             return None, None
@@ -154,40 +579,58 @@ class InternScraper(BaseScraper):
         total_items = int(match.group(1).replace(',', ''))
         items_per_page = self.site_config.get("ITEMS_PER_PAGE", 30)
         last_page = math.ceil(total_items / items_per_page)
-        self.logger.info(f"総求人件数: {total_items}件, 最終ページ: {last_page}")
+        self.logger.info("総求人件数: %d件, 最終ページ: %d", total_items, last_page)
         return total_items, last_page
 
-    def get_job_details(self, detail_url: str, job_card: BeautifulSoup) -> Optional[Dict[str, str]]:
-        soup = utils.get_soup(detail_url)
-        if not soup:
-            self.logger.error(f"詳細ページ ({detail_url}) の取得に失敗しました。")
+    def get_job_details(self, detail_url: str, job_card: Optional[BeautifulSoup]) -> Optional[Dict[str, str]]:
+        body = self._get_body(detail_url)
+        if body is None:
+            self.logger.error("詳細ページ (%s) の取得に失敗しました。", detail_url)
             return None
+        return self._extract(body, None)
 
-        details: Dict[str, str] = {}
-        for key, target in self.site_config['EXTRACTION_TARGETS'].items():
-            if "tag" in target and "class" in target:
-                elem = soup.find(target["tag"], class_=target.get("class"))
-                details[key] = elem.get_text(separator=" ", strip=True) if elem else "N/A"
-            elif "div_class" in target:
-                section_div = soup.find("div", class_=target["div_class"])
-                details.update(self._parse_dl_tags(section_div))
-        return details
+    def extract_job_details(self, body: Optional[bytes], job_card: Optional[BeautifulSoup]) -> Dict[str, str]:
+        soup = utils.parse_html(body, parser=self.parser)
+        try:
+            with metrics.timer("extract"):
+                return self.extraction_plan.extract(soup)
+        finally:
+            self._release(soup)
 
 
 class KyujinboxScraper(BaseScraper):
     """kyujinbox.com用のスクレイパー。"""
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.section_extractor = SectionExtractor(self.site_config.get("EXTERNAL_SECTION_RULES"))
+        self.duplicates = self._build_duplicate_detector()
+
+    def _build_extraction_plan(self) -> ExtractionPlan:
+        # 掲載元はカードにあるときだけ出力する
+        targets = dict(self.site_config.get("EXTRACTION_TARGETS", {}))
+        targets.setdefault("掲載元", {"tag": "div", "class": "p-result_source", "optional": True})
+        return ExtractionPlan(targets)
+
+    def _build_duplicate_detector(self) -> Optional[DuplicateDetector]:
+        """重複カードの検出器を作る。無効なら None。"""
+        if not self.site_config.get("DEDUP_ENABLED", getattr(config, "DEDUP_ENABLED", False)):
+            return None
+        return DuplicateDetector(
+            max_distance=self.site_config.get("DEDUP_MAX_DISTANCE", getattr(config, "DEDUP_MAX_DISTANCE", 6)),
+            exact_fields=self.site_config.get("DEDUP_EXACT_FIELDS", []),
+            ignored_params=getattr(config, "DEDUP_IGNORED_PARAMS", []),
+        )
+
     def _get_page_url(self, page: int) -> str:
         if page == 1:
             return self.site_config["TARGET_URL"]
         return f"{self.site_config['TARGET_URL']}?pg={page}"
 
-    def _get_pagination_info(self) -> Tuple[Optional[int], Optional[int]]:
-        list_soup = utils.get_soup(self.site_config["TARGET_URL"])
-        if not list_soup:
-            return None, None
-
-        total_items_text_element = list_soup.find("div", class_="p-resultArea_num")
+    def _get_pagination_info(self, list_soup: BeautifulSoup) -> Tuple[Optional[int], Optional[int]]:
+        total_items_text_element = list_soup.find(
+            self.site_config["TOTAL_COUNT_TAG"], class_=self.site_config["TOTAL_COUNT_CLASS"]
+        )
         if not total_items_text_element:
             self.logger.error("総件数の取得に失敗しました。")
             return None, None
@@ -201,55 +644,95 @@ class KyujinboxScraper(BaseScraper):
         total_items = int(match.group(1).replace(',', ''))
         items_per_page = self.site_config.get("ITEMS_PER_PAGE", 30)
         last_page = math.ceil(total_items / items_per_page)
-        self.logger.info(f"総求人件数: {total_items}件, 最終ページ: {last_page}")
+        self.logger.info("総求人件数: %d件, 最終ページ: %d", total_items, last_page)
         return total_items, last_page
 
-    def get_job_details(self, detail_url: str, job_card: BeautifulSoup) -> Optional[Dict[str, str]]:
-        details: Dict[str, str] = {}
-        for key, target in self.site_config['EXTRACTION_TARGETS'].items():
-            cls = target.get("class")
-            elem = job_card.find(target["tag"], class_=cls)
-            details[key] = elem.get_text(separator=" ", strip=True) if elem else "N/A"
+    def get_job_details(self, detail_url: str, job_card: Optional[BeautifulSoup]) -> Optional[Dict[str, str]]:
+        if job_card is None:
+            # サイトマップ・フィードから列挙したURL (カードがないため重複の判定もしない)
+            return self._get_external_sections(detail_url)
+        details = self.extraction_plan.extract(job_card)
+        canonical_url = self.duplicates.claim(detail_url, details) if self.duplicates else None
+        if canonical_url is not None:
+            sections = self.duplicates.wait(canonical_url)
+            if sections is not None:
+                self.logger.debug("重複カードのため外部ページの取得を省略しました url=%s 重複元=%s", detail_url, canonical_url)
+                metrics.count("duplicates", site=self.site_name)
+                details.update(sections)
+                return details
+            # 重複元の取得に失敗したため自分で取得する
+            self.duplicates.forget(detail_url)
+
+        sections = None
+        try:
+            sections = self._get_external_sections(detail_url)
+        finally:
+            if self.duplicates and canonical_url is None:
+                self.duplicates.resolve(detail_url, sections)
+        # 取得・解析に失敗した場合はカードの情報だけで返す
+        details.update(sections or {})
+        return details
 
-        source_elem = job_card.find("div", class_="p-result_source")
-        if source_elem:
-            details["掲載元"] = source_elem.get_text(separator=" ", strip=True)
+    def _get_external_sections(self, detail_url: str) -> Optional[Dict[str, str]]:
+        """外部詳細ページから見出しごとの項目を抽出する。取得・解析に失敗すれば None。"""
+        body = self._get_external_body(detail_url)
+        if body is None:
+            return None
+        try:
+            return self._extract(body, None)
+        except Exception as e:
+            self.logger.warning("外部詳細ページの解析に失敗: %s URL: %s", e, detail_url)
+            return None
 
-        soup_ext = utils.get_soup(detail_url)
-        if soup_ext:
-            try:
-                ext_details = self._extract_sections_from_external(
-                    soup_ext, self.site_config.get("EXTERNAL_SECTION_RULES")
-                )
-                details.update(ext_details)
-            except Exception as e:
-                self.logger.warning(f"外部詳細ページの解析に失敗: {e} URL: {detail_url}")
+    def _get_external_body(self, detail_url: str) -> Optional[bytes]:
+        """外部詳細ページの本文を取得する。ストリーミングが有効なら、すべての見出しと本文を受信した時点で打ち切る。
+
+        レスポンスをアーカイブする場合は見出しでは打ち切らないため、逐次解析を行わず上限のみ適用する。
+        """
+        if not self.site_config.get("EXTERNAL_STREAMING", getattr(config, "EXTERNAL_STREAMING", False)):
+            return self._get_body(detail_url)
+        max_bytes = self.site_config.get(
+            "EXTERNAL_STREAM_MAX_BYTES", getattr(config, "EXTERNAL_STREAM_MAX_BYTES", None)
+        )
+        if self.session.archive is not None:
+            return self._get_body(detail_url, max_bytes=max_bytes)
+        scanner = SectionStreamScanner(self.section_extractor)
+        return self._get_body(detail_url, stop_when=scanner.feed_bytes, max_bytes=max_bytes)
+
+    def extract_job_details(self, body: Optional[bytes], job_card: Optional[BeautifulSoup]) -> Dict[str, str]:
+        soup_ext = utils.parse_html(body, parser=self.parser) if body is not None else None
+        try:
+            with metrics.timer("extract"):
+                # 求人カードがなければ外部詳細ページの項目だけを返す
+                details = self.extraction_plan.extract(job_card) if job_card is not None else {}
+                if soup_ext is not None:
+                    details.update(self._extract_sections_from_external(soup_ext))
+        finally:
+            if soup_ext is not None:
+                self._release(soup_ext)
         return details
 
     def _extract_sections_from_external(self, soup: BeautifulSoup, rules: Optional[Dict] = None) -> Dict[str, str]:
-        result = {}
-        targets = rules or {}
-        heading_tags = ["h1", "h2", "h3", "h4", "dt", "th", "strong", "p", "div"]
-
-        for out_key, keywords in targets.items():
-            heading = None
-            for tag in heading_tags:
-                heading = soup.find(tag, string=lambda s: s and any(k in s for k in keywords))
-                if heading:
-                    break
-            if not heading:
-                continue
-
-            content = None
-            for finder in [
-                lambda h: h.find_next(["p", "ul", "ol", "section"]),
-                lambda h: h.find_parent().find_next(["p", "ul", "ol", "section"]) if h.find_parent() else None,
-                lambda h: h.find_next("div"),
-            ]:
-                content = finder(heading)
-                if content and content.get_text(strip=True):
-                    break
-            
-            if content:
-                result[out_key] = content.get_text(separator=" ", strip=True)
-        return result
+        extractor = self.section_extractor if rules is None else SectionExtractor(rules)
+        return extractor.extract(soup)
+
+
+# プロセスプールのワーカーごとに作成したスクレイパー
+_worker_scrapers: Dict[Tuple[type, str], BaseScraper] = {}
+
+
+def extract_in_worker(
+    scraper_class: type,
+    site_name: str,
+    site_config: Dict,
+    body: Optional[bytes],
+    card_html: Optional[str],
+) -> Dict[str, str]:
+    """プロセスプールで実行する抽出処理。求人カードはHTML文字列で受け取り解析し直す。"""
+    key = (scraper_class, site_name)
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = scraper_class(site_name, site_config)
+        _worker_scrapers[key] = scraper
+    job_card = scraper._load_card(card_html) if card_html is not None else None
+    return scraper.extract_job_details(body, job_card)
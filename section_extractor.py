@@ -0,0 +1,285 @@
+"""外部の求人詳細ページから見出しに対応する本文を抽出するエンジン。
+
+文書のテキストを1回だけ走査し、すべての抽出ルールのキーワードをまとめた
+Aho–Corasick オートマトンで照合して、そのテキストを持つ見出しのタグの索引を作る。
+受信途中の本文を逐次解析し、すべての出力キーの見出しと本文が揃ったかを
+判定する ``SectionStreamScanner`` も提供する (受信の打ち切りに使う)。
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+from collections import deque
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# 見出しとみなすタグ (先にあるものほど優先する)
+HEADING_TAGS: Tuple[str, ...] = ("h1", "h2", "h3", "h4", "dt", "th", "strong", "p", "div")
+HEADING_TAG_SET = frozenset(HEADING_TAGS)
+CONTENT_TAGS = ["p", "ul", "ol", "section"]
+# 受信の打ち切りの判定に使う見出し。SectionExtractor は最優先のタグ以外の見出しを、後ろに
+# 最優先のタグの見出しがあれば採用しないため、最優先のタグの見出しだけで判定する
+STREAM_HEADING_TAG = HEADING_TAGS[0]
+# 終了タグを持たない要素
+VOID_TAGS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"))
+# 開始すると閉じられていない p を閉じる要素
+P_CLOSING_TAGS = frozenset((
+    "address", "article", "aside", "blockquote", "div", "dl", "fieldset", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "main", "nav", "ol", "p", "pre", "section", "table", "ul",
+))
+
+
+class KeywordAutomaton:
+    """複数のキーワードを1回の走査で照合する Aho–Corasick オートマトン。"""
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        """``keywords`` はラベルからキーワードの一覧への対応。"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        for label, words in keywords.items():
+            for word in words:
+                self._add(word, label)
+        self._build()
+
+    def _add(self, word: str, label: str) -> None:
+        node = 0
+        for char in word:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            node = nxt
+        self._output[node].add(label)
+
+    def _build(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, nxt in self._goto[node].items():
+                pending.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._output[nxt] |= self._output[self._fail[nxt]]
+
+    def search(self, text: str) -> Set[str]:
+        """テキストに含まれるキーワードのラベルを返す。"""
+        found = set(self._output[0])
+        node = 0
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            if self._output[node]:
+                found |= self._output[node]
+        return found
+
+
+class SectionExtractor:
+    """抽出ルール (出力キー → 見出しキーワード) をコンパイルして再利用する抽出器。
+
+    出力キーごとに、優先度の高いタグから順に、テキストがキーワードを含む最初の
+    見出しを選び、その後に続く本文を返す。
+    """
+
+    def __init__(self, rules: Optional[Dict[str, List[str]]] = None):
+        self.rules = dict(rules or {})
+        self.automaton = KeywordAutomaton(self.rules)
+        # キーワードを含まないテキストを読み飛ばすための正規表現 (照合はオートマトンで行う)
+        words = sorted({word for words in self.rules.values() for word in words}, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, words))) if words else re.compile(r"(?!)")
+
+    def find_headings(self, soup: BeautifulSoup) -> Dict[str, Tag]:
+        """文書を1回走査し、出力キーごとに採用する見出しを返す。
+
+        要素ではなくテキストを走査し、キーワードを含むテキストを ``Tag.string`` とする
+        見出しのタグだけを候補にする (見出しでない p / div を1つずつ照合しない)。
+        """
+        first: Dict[Tuple[str, str], Tag] = {}
+        unresolved = set(self.rules)
+        top_tag = HEADING_TAGS[0]
+        if not unresolved:
+            return {}
+
+        for node in soup.descendants:
+            if not isinstance(node, NavigableString) or not self._pattern.search(node):
+                continue
+            keys = self.automaton.search(node)
+            # 外側の要素ほど文書の前にあるため、外側から登録する
+            for tag in reversed(_string_owners(node)):
+                if tag.name not in HEADING_TAG_SET:
+                    continue
+                for key in keys:
+                    first.setdefault((key, tag.name), tag)
+                if tag.name == top_tag:
+                    unresolved -= keys
+            if not unresolved:
+                # すべてのキーで最優先タグの見出しが見つかった
+                break
+
+        headings: Dict[str, Tag] = {}
+        for key in self.rules:
+            for name in HEADING_TAGS:
+                heading = first.get((key, name))
+                if heading is not None:
+                    headings[key] = heading
+                    break
+        return headings
+
+    def extract(self, soup: BeautifulSoup) -> Dict[str, str]:
+        """見出しに続く本文を出力キーごとに抽出する。"""
+        result: Dict[str, str] = {}
+        headings = self.find_headings(soup)
+        for key in self.rules:
+            heading = headings.get(key)
+            if heading is None:
+                continue
+            content = _find_content(heading)
+            if content:
+                result[key] = content.get_text(separator=" ", strip=True)
+        return result
+
+
+def _string_owners(node: NavigableString) -> List[Tag]:
+    """``Tag.string`` が ``node`` になる要素を内側から順に返す (子が1つだけの祖先)。"""
+    owners = []
+    tag = node.parent
+    while tag is not None and len(tag.contents) == 1:
+        owners.append(tag)
+        tag = tag.parent
+    return owners
+
+
+def _find_content(heading: Tag) -> Optional[Tag]:
+    """見出しに続く本文の要素を探す。"""
+    content = None
+    for finder in (
+        lambda h: h.find_next(CONTENT_TAGS),
+        lambda h: h.find_parent().find_next(CONTENT_TAGS) if h.find_parent() else None,
+        lambda h: h.find_next("div"),
+    ):
+        content = finder(heading)
+        if content and content.get_text(strip=True):
+            break
+    return content
+
+
+class _Open:
+    """走査中に開いている要素。``string`` は子が1つだけのときの ``Tag.string`` に相当する。"""
+
+    __slots__ = ("name", "children", "string", "last_text", "keys", "text")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.children = 0
+        self.string: Optional[str] = None
+        self.last_text = False
+        # 本文として待ち合わせている出力キー (本文の候補でなければ None)
+        self.keys: Optional[Set[str]] = None
+        self.text: List[str] = []
+
+
+class SectionStreamScanner(HTMLParser):
+    """受信途中の本文を逐次解析し、すべての出力キーの見出しと本文を受信し終えたかを判定する。
+
+    ``SectionExtractor`` と同じ規則で最優先のタグ (``STREAM_HEADING_TAG``) の見出しを照合し、
+    見出しの後の最初の本文の要素 (``CONTENT_TAGS``) が空でないテキストで閉じた時点で
+    その出力キーを解決済みとする。最優先のタグの最初の見出しは後ろに何があっても
+    採用が変わらないため、打ち切っても全体を解析した場合と同じ見出しが選ばれる。
+    それ以外のタグの見出ししかない出力キーや、見出しの後の最初の本文が空の出力キーが
+    あれば打ち切らない。
+    """
+
+    def __init__(self, extractor: SectionExtractor):
+        super().__init__(convert_charrefs=True)
+        self.automaton = extractor.automaton
+        self.unresolved = set(extractor.rules)
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._stack: List[_Open] = []
+        # 見出しが見つかり、本文の開始を待っている出力キー
+        self._waiting: Set[str] = set()
+        # 最優先のタグの見出しが見つかった出力キー (後の見出しは採用されない)
+        self._claimed: Set[str] = set()
+        # 本文のテキストを集めている要素
+        self._contents: List[_Open] = []
+
+    @property
+    def resolved(self) -> bool:
+        return not self.unresolved
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """受信した本文を解析し、すべての出力キーが解決済みなら真を返す。"""
+        if self.unresolved:
+            self.feed(self._decoder.decode(chunk))
+        return not self.unresolved
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in P_CLOSING_TAGS and self._stack and self._stack[-1].name == "p":
+            self._close(self._stack.pop())
+        self._add_child(None)
+        if tag in VOID_TAGS:
+            return
+        element = _Open(tag)
+        if self._waiting and tag in CONTENT_TAGS:
+            element.keys = self._waiting
+            self._waiting = set()
+            self._contents.append(element)
+        self._stack.append(element)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self._add_child(None)
+
+    def handle_endtag(self, tag: str) -> None:
+        if not any(element.name == tag for element in self._stack):
+            return
+        while self._stack:
+            element = self._stack.pop()
+            self._close(element)
+            if element.name == tag:
+                return
+
+    def handle_data(self, data: str) -> None:
+        if self._stack:
+            parent = self._stack[-1]
+            if parent.last_text:
+                # 受信の区切りで分かれたテキストは1つの子として扱う
+                parent.string = (parent.string or "") + data
+            else:
+                parent.children += 1
+                parent.string = data
+                parent.last_text = True
+        for element in self._contents:
+            element.text.append(data)
+
+    def _add_child(self, string: Optional[str]) -> None:
+        if not self._stack:
+            return
+        parent = self._stack[-1]
+        parent.children += 1
+        parent.string = string
+        parent.last_text = False
+
+    def _close(self, element: _Open) -> None:
+        string = element.string if element.children == 1 else None
+        if self._stack:
+            parent = self._stack[-1]
+            if parent.children == 1 and not parent.last_text:
+                parent.string = string
+        if element.keys is not None:
+            self._contents.remove(element)
+            if "".join(element.text).strip():
+                self.unresolved -= element.keys
+            # 本文が空なら SectionExtractor は親の後や後ろの div から本文を探すため、受信済みの
+            # 範囲では決められない (その出力キーは解決済みにせず、打ち切らない)
+        if string and element.name == STREAM_HEADING_TAG:
+            keys = self.automaton.search(string) & self.unresolved - self._claimed
+            self._claimed |= keys
+            self._waiting |= keys
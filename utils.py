@@ -1,35 +1,206 @@
+import io
 import logging
-import random
 import time
+from contextlib import ExitStack, contextmanager
+from typing import Callable, Iterable, Optional, Set, Tuple
+from urllib.parse import urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
 
 import config
+import http_client
+import metrics
+import ratelimit
 
 
-def get_soup(url):
-    """指定されたURLからBeautifulSoupオブジェクトを取得する"""
-    try:
-        sleep_time = random.uniform(config.MIN_INTERVAL, config.MAX_INTERVAL)
-        logging.debug("HTTPリクエスト前に %.2f 秒待機します url=%s", sleep_time, url)
-        time.sleep(sleep_time)
+DEFAULT_PARSER = "html.parser"
+_warned_parsers: Set[str] = set()
+
+
+def resolve_parser(name: Optional[str]) -> str:
+    """利用可能なパーサ名を返す。未インストールの場合は html.parser に切り替える。"""
+    if not name:
+        return DEFAULT_PARSER
+    if builder_registry.lookup(name) is None:
+        if name not in _warned_parsers:
+            _warned_parsers.add(name)
+            logging.warning("パーサ '%s' が利用できないため %s を使用します。", name, DEFAULT_PARSER)
+        return DEFAULT_PARSER
+    return name
+
+
+def make_strainer(targets: Iterable[Tuple[str, str]]) -> SoupStrainer:
+    """指定した (タグ名, クラス名) の要素とその子孫だけを解析対象にするストレーナを作る。"""
+    pairs = {(tag, cls) for tag, cls in targets}
+    names = sorted({tag for tag, _ in pairs})
+
+    def match_class(value) -> bool:
+        # 解析中の class 属性は分割前の文字列で渡される
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return any(cls in classes for _, cls in pairs)
+
+    return SoupStrainer(name=names, class_=match_class)
 
-        logging.debug("HTTPリクエストを送信します url=%s headers=%s", url, config.HEADERS)
-        res = requests.get(url, headers=config.HEADERS, timeout=10)
-        logging.debug("HTTPレスポンスを受信しました status_code=%s url=%s", res.status_code, url)
 
-        # res.encoding = res.apparent_encoding
-        res.encoding = 'utf-8'
+def fetch(url, session=None, stop_when=None, max_bytes=None):
+    """指定されたURLの本文を取得する。キャッシュがあれば条件付きリクエストで再検証する。
+
+    セッションにアーカイブがあれば、取得した本文 (キャッシュから返したものは未保存の場合のみ) を保存する。
+    ``stop_when`` (受信したチャンクを受け取り、真を返せば打ち切る) か ``max_bytes`` を指定すると
+    本文を少しずつ受信し、途中で打ち切った場合はそこまでの本文を返す。打ち切った本文は
+    キャッシュせず、アーカイブには打ち切ったことを記録して保存する。
+    アーカイブに保存する場合は ``stop_when`` を使わない (``max_bytes`` の上限のみ適用する)。
+    """
+    session = session or http_client.get_default_session()
+    cache = session.cache
+    archive = session.archive
+    if archive is not None:
+        # 打ち切った本文からは、後で抽出ルールを追加しても打ち切った位置より後ろの項目を
+        # 再抽出できないため、アーカイブする場合は全体を受信する
+        stop_when = None
+    entry = cache.get(url) if cache else None
+    if entry and entry.is_fresh(cache.ttl):
+        cache.record_fresh_hit()
+        logging.debug("キャッシュから取得しました url=%s", url)
+        if archive is not None and url not in archive:
+            archive.record(url, 200, None, entry.body)
+        return entry.body
+
+    headers = entry.conditional_headers() if entry else None
+    stream = stop_when is not None or max_bytes is not None
+    with _request_with_retry(url, session, headers, stream=stream) as res:
+        if entry and res.status_code == 304:
+            cache.revalidated(url, res.headers)
+            logging.debug("キャッシュを再検証しました (304) url=%s", url)
+            if archive is not None and url not in archive:
+                archive.record(url, 200, res.headers, entry.body)
+            return entry.body
+
         res.raise_for_status()
+        if stream:
+            body, truncated = _read_until(url, res, session, stop_when, max_bytes)
+        else:
+            body, truncated = res.content, False
+    if metrics.active():
+        metrics.count("bytes_downloaded", len(body), host=urlsplit(url).netloc)
+    if cache and not truncated:
+        cache.put(url, body, res.headers)
+    if archive is not None:
+        archive.record(url, res.status_code, res.headers, body, truncated=truncated)
+    return body
+
+
+def _read_until(
+    url: str,
+    res: requests.Response,
+    session,
+    stop_when: Optional[Callable[[bytes], bool]],
+    max_bytes: Optional[int],
+) -> Tuple[bytes, bool]:
+    """本文をチャンクごとに受信し、(受信した本文, 途中で打ち切ったか) を返す。
+
+    打ち切った場合は接続を閉じ (残りを読み捨てない)、Content-Length から分かれば
+    受信せずに済んだバイト数をセッションの統計に記録する。
+    """
+    chunks = []
+    received = 0
+    truncated = False
+    try:
+        for chunk in res.iter_content(chunk_size=getattr(config, "STREAM_CHUNK_BYTES", 16 * 1024)):
+            chunks.append(chunk)
+            received += len(chunk)
+            if (stop_when is not None and stop_when(chunk)) or (max_bytes is not None and received >= max_bytes):
+                truncated = True
+                break
+        if truncated:
+            length = res.headers.get("Content-Length")
+            read = res.raw.tell() if res.raw is not None else received
+            saved = max(0, int(length) - read) if length and length.isdigit() else None
+            if saved == 0:
+                # 最後のチャンクで条件を満たした
+                truncated = False
+            else:
+                session.stats.record_truncated(saved)
+                if saved and metrics.active():
+                    metrics.count("bytes_saved", saved, host=urlsplit(url).netloc)
+                logging.debug("本文の受信を打ち切りました url=%s received=%d saved=%s", url, received, saved)
+    finally:
+        res.close()
+    return b"".join(chunks), truncated
+
 
-        soup = BeautifulSoup(res.text, "html.parser")
-        logging.debug(
-            "BeautifulSoupオブジェクトを生成しました url=%s content_length=%d",
-            url,
-            len(res.text),
-        )
-        return soup
+def _record_response(url, status, latency):
+    """応答の計測値を記録する。``status`` が None なら通信エラー。"""
+    if not metrics.active():
+        return
+    metrics.observe("network", latency)
+    metrics.count("responses", host=urlsplit(url).netloc, status="error" if status is None else status)
+
+
+@contextmanager
+def _request_with_retry(url, session, headers, stream=False):
+    """セッションのレートリミッタを通してリクエストし、一時的なエラーはバックオフして再試行する。
+
+    with の中で応答を返し、抜けるときに応答を閉じる。``stream`` を指定した場合も本文を
+    読み終えるまで同じホストへの同時接続の枠を保持する。
+    """
+    limiter = session.rate_limiter
+    max_retries = getattr(config, "MAX_RETRIES", 0)
+    base = getattr(config, "RETRY_BACKOFF_BASE", 1.0)
+    cap = getattr(config, "RETRY_BACKOFF_MAX", 60.0)
+    attempt = 0
+    while True:
+        with ExitStack() as slot:
+            requested = started = time.monotonic()
+            try:
+                slot.enter_context(limiter.slot(url))
+                logging.debug("HTTPリクエストを送信します url=%s attempt=%d", url, attempt + 1)
+                started = time.monotonic()
+                metrics.observe("wait", started - requested)
+                res = session.get(url, headers=headers, stream=stream)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                slot.close()
+                latency = time.monotonic() - started
+                limiter.record(url, None, latency)
+                _record_response(url, None, latency)
+                if attempt >= max_retries:
+                    raise
+                delay = ratelimit.backoff_delay(attempt, base, cap)
+                logging.warning("通信エラーのため %.1f 秒後に再試行します (%d/%d) url=%s: %s",
+                                delay, attempt + 1, max_retries, url, e)
+            else:
+                latency = time.monotonic() - started
+                limiter.record(url, res.status_code, latency)
+                _record_response(url, res.status_code, latency)
+                logging.debug("HTTPレスポンスを受信しました status_code=%s url=%s", res.status_code, url)
+                if res.status_code not in ratelimit.RETRY_STATUSES or attempt >= max_retries:
+                    try:
+                        yield res
+                    finally:
+                        res.close()
+                    return
+                # 再試行する応答の本文は読まずに接続を返す
+                res.close()
+                retry_after = ratelimit.parse_retry_after(res.headers.get("Retry-After"))
+                delay = max(ratelimit.backoff_delay(attempt, base, cap), retry_after or 0)
+                logging.warning("ステータス %d のため %.1f 秒後に再試行します (%d/%d) url=%s",
+                                res.status_code, delay, attempt + 1, max_retries, url)
+        # 同じホストへの他のリクエストも待機させる
+        limiter.block(url, delay)
+        attempt += 1
+
+
+def get_body(url, session=None, stop_when=None, max_bytes=None):
+    """指定されたURLの本文を取得する。取得に失敗した場合は None を返す。
+
+    ``stop_when`` と ``max_bytes`` は ``fetch`` と同じく受信を途中で打ち切る条件。
+    """
+    try:
+        return fetch(url, session=session, stop_when=stop_when, max_bytes=max_bytes)
     except requests.Timeout:
         logging.error("タイムアウトが発生しました url=%s", url)
     except requests.RequestException as e:
@@ -37,3 +208,45 @@ def get_soup(url):
 
     logging.debug("URLの取得に失敗したため None を返します url=%s", url)
     return None
+
+
+@contextmanager
+def open_stream(url, session=None):
+    """本文を読み出さずにリクエストし、本文を少しずつ読み出せるファイルオブジェクトを返す。
+
+    本文はキャッシュ・アーカイブに保存しない。取得に失敗した場合は例外を送出する。
+    with を抜けるまで同じホストへの同時接続の枠を保持する。
+    """
+    session = session or http_client.get_default_session()
+    with _request_with_retry(url, session, None, stream=True) as res:
+        res.raise_for_status()
+        if res.raw is None:
+            # アーカイブから返した応答
+            yield io.BytesIO(res.content)
+            return
+        res.raw.decode_content = True
+        yield res.raw
+        if metrics.active():
+            metrics.count("bytes_downloaded", res.raw.tell(), host=urlsplit(url).netloc)
+
+
+def parse_html(body, parser=DEFAULT_PARSER, parse_only=None):
+    """取得した本文からBeautifulSoupオブジェクトを生成する。"""
+    # ページはUTF-8として解釈する
+    text = str(body, "utf-8", errors="replace")
+    with metrics.timer("parse"):
+        soup = BeautifulSoup(text, parser, parse_only=parse_only)
+    logging.debug(
+        "BeautifulSoupオブジェクトを生成しました parser=%s content_length=%d",
+        parser,
+        len(text),
+    )
+    return soup
+
+
+def get_soup(url, session=None, parser=DEFAULT_PARSER, parse_only=None):
+    """指定されたURLからBeautifulSoupオブジェクトを取得する"""
+    body = get_body(url, session=session)
+    if body is None:
+        return None
+    return parse_html(body, parser=parser, parse_only=parse_only)
@@ -0,0 +1,613 @@
+"""複数のワーカープロセス・マシンでクロールを分担するための永続タスクキュー。
+
+コーディネーターが一覧ページのタスクを投入し、ワーカーがリースして求人カードを
+詳細取得のタスクとして投入し直す。詳細取得の結果はキューに書き戻され、
+コーディネーターがページ順に受け取ってCSVへ出力する。
+
+キューは単一ホストなら SQLite ファイル (``SqliteTaskQueue``)、複数ホストなら
+``serve_queue`` で公開した SQLite キューに HTTP で接続する (``HttpTaskQueue``)。
+ホストごとのアクセス速度もキュー側で管理するため、すべてのワーカーで共通になる。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+import metrics
+from ratelimit import AdaptiveRateLimiter
+from scrapers import BaseScraper
+
+LISTING = "listing"
+DETAIL = "detail"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = frozenset({DONE, FAILED, CANCELLED})
+
+# HTTP 経由で呼び出せるキューのメソッド
+QUEUE_METHODS = frozenset({
+    "enqueue", "lease", "complete", "fail", "tasks", "cancel",
+    "reserve_host", "record_host", "block_host", "host_summary",
+})
+
+
+class SqliteTaskQueue:
+    """リースの期限切れと再試行に対応した SQLite のタスクキュー。
+
+    同じファイルを複数のプロセスから開いて共有できる。リースが ``lease_seconds``
+    以内に完了しなかったタスクは再びリース可能になり、``max_attempts`` 回失敗した
+    タスクは失敗として確定する。ホストごとのアクセス速度は ``rate_policy`` の
+    設定に従ってキュー側で調整する。
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        rate_policy: Optional[AdaptiveRateLimiter] = None,
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds or getattr(config, "WORKQUEUE_LEASE_SECONDS", 120)
+        self.max_attempts = max_attempts or getattr(config, "WORKQUEUE_MAX_ATTEMPTS", 3)
+        self.rate_policy = rate_policy or AdaptiveRateLimiter.from_config()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                idx INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_token TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                UNIQUE (run, key)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, page, kind, idx);
+            CREATE INDEX IF NOT EXISTS tasks_run_page ON tasks (run, page);
+            CREATE TABLE IF NOT EXISTS hosts (
+                host TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                next_allowed REAL NOT NULL,
+                blocked_until REAL NOT NULL,
+                requests INTEGER NOT NULL,
+                errors INTEGER NOT NULL
+            );
+            """
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # 他のプロセスと競合しないよう、書き込みロックを取ってから読み出す
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, run: str, kind: str, key: str, payload: Dict[str, Any], page: int = 0, index: int = 0) -> bool:
+        """タスクを投入する。同じ実行で同じキーのタスクがあれば何もせず False を返す。"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                INSERT OR IGNORE INTO tasks (run, kind, key, page, idx, payload, status)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (run, kind, key, page, index, json.dumps(payload, ensure_ascii=False), PENDING),
+            )
+            return cursor.rowcount == 1
+
+    def _expire_leases(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT id, attempts, lease_owner FROM tasks WHERE status = ? AND lease_expires < ?",
+            (LEASED, now),
+        ).fetchall()
+        for task_id, attempts, owner in expired:
+            status = FAILED if attempts >= self.max_attempts else PENDING
+            conn.execute(
+                "UPDATE tasks SET status = ?, lease_token = NULL, error = ? WHERE id = ?",
+                (status, f"リースの期限切れ (worker={owner})", task_id),
+            )
+            self.logger.warning("リースの期限が切れたタスクを%sしました id=%d worker=%s",
+                                "失敗に" if status == FAILED else "再投入", task_id, owner)
+
+    def lease(self, worker: str, lease_seconds: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """未処理のタスクを1件リースする。ページ順に、一覧ページを詳細ページより先に返す。"""
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as conn:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                """
+                SELECT id, run, kind, key, page, idx, payload, attempts FROM tasks
+                WHERE status = ? ORDER BY page, kind = ?, idx, id LIMIT 1
+                """,
+                (PENDING, DETAIL),
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, run, kind, key, page, index, payload, attempts = row
+            conn.execute(
+                """
+                UPDATE tasks SET status = ?, attempts = attempts + 1, lease_owner = ?,
+                    lease_token = ?, lease_expires = ?
+                WHERE id = ?
+                """,
+                (LEASED, worker, token, now + (lease_seconds or self.lease_seconds), task_id),
+            )
+        return {
+            "id": task_id,
+            "run": run,
+            "kind": kind,
+            "key": key,
+            "page": page,
+            "index": index,
+            "payload": json.loads(payload),
+            "attempts": attempts + 1,
+            "token": token,
+        }
+
+    def complete(self, task_id: int, token: str, result: Optional[Dict[str, Any]]) -> bool:
+        """リース中のタスクを完了にする。リースが失効していれば False を返す。"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE tasks SET status = ?, result = ?, lease_token = NULL, error = NULL
+                WHERE id = ? AND status = ? AND lease_token = ?
+                """,
+                (DONE, json.dumps(result, ensure_ascii=False), task_id, LEASED, token),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, token: str, error: str) -> bool:
+        """リース中のタスクを失敗にする。試行回数が上限未満なら再投入する。"""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM tasks WHERE id = ? AND status = ? AND lease_token = ?",
+                (task_id, LEASED, token),
+            ).fetchone()
+            if row is None:
+                return False
+            status = FAILED if row[0] >= self.max_attempts else PENDING
+            conn.execute(
+                "UPDATE tasks SET status = ?, lease_token = NULL, error = ? WHERE id = ?",
+                (status, error, task_id),
+            )
+            return True
+
+    def tasks(self, run: str, page: int) -> List[Dict[str, Any]]:
+        """実行とページを指定してタスクの状態と結果を返す。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, key, idx, status, result, error FROM tasks WHERE run = ? AND page = ? ORDER BY idx, id",
+                (run, page),
+            ).fetchall()
+        return [
+            {
+                "kind": kind,
+                "key": key,
+                "index": index,
+                "status": status,
+                "result": json.loads(result) if result else None,
+                "error": error,
+            }
+            for kind, key, index, status, result, error in rows
+        ]
+
+    def cancel(self, run: str) -> int:
+        """実行の未完了タスクを取り消し、取り消した件数を返す。"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET status = ?, lease_token = NULL WHERE run = ? AND status IN (?, ?)",
+                (CANCELLED, run, PENDING, LEASED),
+            )
+            return cursor.rowcount
+
+    def _host_row(self, conn: sqlite3.Connection, host: str) -> List[float]:
+        row = conn.execute(
+            "SELECT rate, next_allowed, blocked_until FROM hosts WHERE host = ?", (host,)
+        ).fetchone()
+        if row is None:
+            row = (self.rate_policy.initial_rate, 0.0, 0.0)
+            conn.execute(
+                "INSERT INTO hosts (host, rate, next_allowed, blocked_until, requests, errors) VALUES (?, ?, ?, ?, 0, 0)",
+                (host, *row),
+            )
+        return list(row)
+
+    def reserve_host(self, host: str) -> float:
+        """ホストへの次のリクエスト時刻を予約し、それまでの待機秒数を返す。"""
+        now = time.time()
+        with self._transaction() as conn:
+            rate, next_allowed, blocked_until = self._host_row(conn, host)
+            start = max(now, next_allowed, blocked_until)
+            conn.execute(
+                "UPDATE hosts SET next_allowed = ?, requests = requests + 1 WHERE host = ?",
+                (start + 1 / rate, host),
+            )
+        return start - now
+
+    def record_host(self, host: str, status: Optional[int], latency: float) -> float:
+        """応答結果からホストのアクセス速度を調整し、調整後の速度を返す。"""
+        with self._transaction() as conn:
+            rate, _, _ = self._host_row(conn, host)
+            rate, error = self.rate_policy.adjust(rate, status, latency)
+            conn.execute(
+                "UPDATE hosts SET rate = ?, errors = errors + ? WHERE host = ?",
+                (rate, int(error), host),
+            )
+        return rate
+
+    def block_host(self, host: str, seconds: float) -> None:
+        """指定秒数のあいだホストへのリクエストを止める。"""
+        with self._transaction() as conn:
+            self._host_row(conn, host)
+            conn.execute(
+                "UPDATE hosts SET blocked_until = MAX(blocked_until, ?) WHERE host = ?",
+                (time.time() + seconds, host),
+            )
+
+    def host_summary(self) -> Dict[str, Dict[str, float]]:
+        """ホストごとの現在の速度とリクエスト数を返す。"""
+        with self._lock:
+            rows = self._conn.execute("SELECT host, rate, requests, errors FROM hosts").fetchall()
+        return {
+            host: {"rate": rate, "requests": requests_count, "errors": errors}
+            for host, rate, requests_count, errors in rows
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class HttpTaskQueue:
+    """``serve_queue`` で公開されたキューに HTTP で接続するクライアント。
+
+    メソッドは ``SqliteTaskQueue`` と同じで、引数を JSON で送って結果を受け取る。
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def _call(self, method: str, **kwargs) -> Any:
+        res = self._session.post(f"{self.base_url}/{method}", json=kwargs, timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()["result"]
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        if name not in QUEUE_METHODS:
+            raise AttributeError(name)
+        return lambda **kwargs: self._call(name, **kwargs)
+
+    def close(self) -> None:
+        self._session.close()
+
+
+def open_queue(location: Optional[str] = None):
+    """URL なら HTTP キュー、それ以外は SQLite ファイルのキューを開く。"""
+    location = (
+        location
+        or getattr(config, "WORKQUEUE_URL", None)
+        or getattr(config, "WORKQUEUE_PATH", "state/workqueue.sqlite3")
+    )
+    if location.startswith(("http://", "https://")):
+        return HttpTaskQueue(location)
+    return SqliteTaskQueue(location)
+
+
+def serve_queue(queue: SqliteTaskQueue, host: str = "127.0.0.1", port: int = 8765) -> None:
+    """キューを HTTP で公開し、他のマシンのワーカーから使えるようにする。"""
+    logger = logging.getLogger("serve_queue")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            method = self.path.strip("/")
+            try:
+                if method not in QUEUE_METHODS:
+                    raise ValueError(f"未対応のメソッドです: {method}")
+                length = int(self.headers.get("Content-Length", 0))
+                kwargs = json.loads(self.rfile.read(length) or b"{}")
+                body, status = {"result": getattr(queue, method)(**kwargs)}, 200
+            except Exception as e:
+                logger.warning("キューの呼び出しに失敗しました method=%s: %s", method, e)
+                body, status = {"error": str(e)}, 400
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info("タスクキュー %s を http://%s:%d で公開します。", queue.path, host, server.server_port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class GlobalRateLimiter(AdaptiveRateLimiter):
+    """アクセス速度をキュー側で管理し、すべてのワーカーで共有するレートリミッタ。
+
+    同時接続数の上限 (``PER_HOST_CONCURRENCY``) はプロセスごとに適用する。
+    """
+
+    def __init__(self, queue, **kwargs):
+        super().__init__(**kwargs)
+        self.queue = queue
+
+    @classmethod
+    def from_config(cls, queue) -> "GlobalRateLimiter":
+        policy = AdaptiveRateLimiter.from_config()
+        return cls(
+            queue,
+            initial_rate=policy.initial_rate,
+            min_rate=policy.min_rate,
+            max_rate=policy.max_rate,
+            burst=policy.burst,
+            increase=policy.increase,
+            decrease=policy.decrease,
+            latency_target=policy.latency_target,
+            max_concurrency=policy.max_concurrency,
+        )
+
+    def _acquire_token(self, host: str, url: str) -> None:
+        wait = self.queue.reserve_host(host=host)
+        if wait > 0:
+            self.logger.debug("HTTPリクエスト前に %.2f 秒待機します url=%s", wait, url)
+            time.sleep(wait)
+
+    def record(self, url: str, status: Optional[int], latency: float) -> None:
+        host = _host(url)
+        rate = self.queue.record_host(host=host, status=status, latency=latency)
+        self.logger.debug("アクセス速度を更新しました host=%s status=%s rate=%.3f", host, status, rate)
+
+    def block(self, url: str, seconds: float) -> None:
+        self.queue.block_host(host=_host(url), seconds=seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return self.queue.host_summary()
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class Coordinator:
+    """1サイト分の一覧ページをキューに投入し、詳細取得の結果をページ順に返す。"""
+
+    def __init__(self, queue, scraper: BaseScraper, run: str, poll_interval: Optional[float] = None):
+        self.queue = queue
+        self.scraper = scraper
+        self.run = run
+        self.poll_interval = poll_interval or getattr(config, "WORKQUEUE_POLL_INTERVAL", 1.0)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+    def _enqueue_listing(self, page: int) -> None:
+        payload = {"site": self.scraper.site_name, "url": self.scraper._get_page_url(page)}
+        self.queue.enqueue(run=self.run, kind=LISTING, key=f"{LISTING}:{page}", payload=payload, page=page)
+
+    def scrape(self, start_page: int, max_items: Optional[int]) -> Iterator[Dict[str, str]]:
+        """``BaseScraper.scrape`` と同じ順序で、ワーカーが取得した求人情報を返す。
+
+        未出力のページのうち ``WORKQUEUE_LISTING_WINDOW`` ページ分まで先に投入する。
+        ``max_items`` に達したら残りのタスクを取り消す。
+        """
+        site_config = self.scraper.site_config
+        first_page_soup = self.scraper._get_soup(site_config["TARGET_URL"], parse_only=self.scraper.listing_strainer)
+        _, last_page = self.scraper._get_pagination_info(first_page_soup) if first_page_soup else (None, None)
+        if last_page is None:
+            self.logger.error("総件数または最終ページの取得に失敗しました。処理を終了します。")
+            return
+
+        window = max(1, getattr(config, "WORKQUEUE_LISTING_WINDOW", 3))
+        items_per_page = site_config.get("ITEMS_PER_PAGE", 30)
+        next_enqueue = start_page
+        page = start_page
+        collected = 0
+        self.logger.info("実行 %s のタスクを投入します (最終ページ: %d)", self.run, last_page)
+
+        while page <= last_page:
+            while (
+                next_enqueue <= last_page
+                and next_enqueue < page + window
+                and (max_items is None or collected + (next_enqueue - page) * items_per_page < max_items)
+            ):
+                self._enqueue_listing(next_enqueue)
+                next_enqueue += 1
+
+            tasks = self.queue.tasks(run=self.run, page=page)
+            listing = [task for task in tasks if task["kind"] == LISTING]
+            if not listing or any(task["status"] not in FINISHED_STATUSES for task in tasks):
+                time.sleep(self.poll_interval)
+                continue
+
+            if listing[0]["status"] != DONE:
+                self.logger.error("%dページ目の一覧ページの取得に失敗しました: %s", page, listing[0]["error"])
+            for task in tasks:
+                if task["kind"] != DETAIL:
+                    continue
+                if task["status"] != DONE or not task["result"]:
+                    self.logger.warning(f"求人情報の取得に失敗しました (カード {task['index']+1})。")
+                    continue
+                collected += 1
+                yield task["result"]
+                if max_items is not None and collected >= max_items:
+                    self.logger.info(f"最大取得件数({max_items}件)に達しました。処理を中断します。")
+                    self.queue.cancel(run=self.run)
+                    return
+            self.logger.info("%dページ目の処理完了。現在の累計取得件数: %d", page, collected)
+            page += 1
+
+
+class Worker:
+    """キューからタスクをリースして処理し、結果を書き戻すワーカー。"""
+
+    def __init__(self, queue, scraper_factory: Callable[[str], Optional[BaseScraper]], name: Optional[str] = None):
+        self.queue = queue
+        self.scraper_factory = scraper_factory
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._scrapers: Dict[str, Optional[BaseScraper]] = {}
+        self._scrapers_lock = threading.Lock()
+        self.processed = 0
+
+    def _scraper(self, site: str) -> BaseScraper:
+        with self._scrapers_lock:
+            if site not in self._scrapers:
+                self._scrapers[site] = self.scraper_factory(site)
+            scraper = self._scrapers[site]
+        if scraper is None:
+            raise ValueError(f"サイト '{site}' のスクレイパーを作成できません。")
+        return scraper
+
+    def handle(self, task: Dict[str, Any]) -> Dict[str, Any]:
+        """タスクを処理して結果を返す。処理できなければ例外を送出する。"""
+        payload = task["payload"]
+        scraper = self._scraper(payload["site"])
+        if task["kind"] == LISTING:
+            soup = scraper._get_soup(payload["url"], parse_only=scraper.listing_strainer)
+            if soup is None:
+                raise RuntimeError(f"{payload['url']} の取得に失敗しました。")
+            job_cards = scraper._find_job_cards(soup)
+            metrics.count("pages", site=scraper.site_name)
+            for i, job_card, detail_url in scraper._iter_detail_targets(job_cards):
+                self.queue.enqueue(
+                    run=task["run"],
+                    kind=DETAIL,
+                    key=f"{DETAIL}:{detail_url}",
+                    payload={"site": payload["site"], "url": detail_url, "card": str(job_card)},
+                    page=task["page"],
+                    index=i,
+                )
+            return {"cards": len(job_cards)}
+
+        job_card = scraper._load_card(payload["card"])
+        job_details = scraper._process_job_card(job_card, payload["url"])
+        if not job_details:
+            raise RuntimeError(f"詳細ページ ({payload['url']}) の取得に失敗しました。")
+        return job_details
+
+    def _call_queue(
+        self, action: str, call: Callable[[], Any], stop: threading.Event, poll_interval: float
+    ) -> Tuple[bool, Any]:
+        """キューの操作を成功するか ``stop`` が立つまで繰り返し、(成功したか, 戻り値) を返す。
+
+        キューのサーバーに接続できない・SQLite がロックされているなどの失敗では
+        ワーカーを終了しない。リースはそのまま保持し、期限が切れるまで手放さない。
+        """
+        while True:
+            try:
+                return True, call()
+            except Exception:
+                self.logger.exception("タスクキューの操作に失敗しました (%s)。%.1f 秒後に再試行します。", action, poll_interval)
+            if stop.wait(poll_interval):
+                return False, None
+
+    def run(self, idle_timeout: Optional[float] = None, stop: Optional[threading.Event] = None) -> None:
+        """タスクがなくなってから ``idle_timeout`` 秒経つか ``stop`` が立つまで処理を続ける。"""
+        poll_interval = getattr(config, "WORKQUEUE_POLL_INTERVAL", 1.0)
+        stop = stop or threading.Event()
+        idle_since = time.monotonic()
+        while not stop.is_set():
+            ok, task = self._call_queue("lease", lambda: self.queue.lease(worker=self.name), stop, poll_interval)
+            if not ok:
+                return
+            if task is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    self.logger.info("%.0f 秒間タスクがなかったため終了します。", idle_timeout)
+                    return
+                stop.wait(poll_interval)
+                continue
+
+            self.logger.debug("タスクを処理します kind=%s key=%s attempt=%d", task["kind"], task["key"], task["attempts"])
+            try:
+                result = self.handle(task)
+            except Exception as e:
+                self.logger.warning("タスクの処理に失敗しました key=%s: %s", task["key"], e)
+                self._call_queue(
+                    "fail",
+                    lambda: self.queue.fail(task_id=task["id"], token=task["token"], error=str(e)),
+                    stop,
+                    poll_interval,
+                )
+            else:
+                ok, completed = self._call_queue(
+                    "complete",
+                    lambda: self.queue.complete(task_id=task["id"], token=task["token"], result=result),
+                    stop,
+                    poll_interval,
+                )
+                if ok and not completed:
+                    self.logger.warning("リースの期限が切れていたため結果を破棄しました key=%s", task["key"])
+                self.processed += 1
+            idle_since = time.monotonic()
+
+
+def run_workers(
+    queue,
+    scraper_factory: Callable[[str], Optional[BaseScraper]],
+    threads: int = 1,
+    idle_timeout: Optional[float] = None,
+) -> int:
+    """スレッドごとにワーカーを動かし、処理したタスク数を返す。"""
+    base_name = f"{socket.gethostname()}-{os.getpid()}"
+    workers = [Worker(queue, scraper_factory, f"{base_name}-{i}") for i in range(max(1, threads))]
+    stop = threading.Event()
+    pool = [
+        threading.Thread(target=worker.run, args=(idle_timeout, stop), name=worker.name, daemon=True)
+        for worker in workers
+    ]
+    for thread in pool:
+        thread.start()
+    try:
+        for thread in pool:
+            while thread.is_alive():
+                thread.join(0.5)
+    except KeyboardInterrupt:
+        stop.set()
+        for thread in pool:
+            thread.join()
+    return sum(worker.processed for worker in workers)
@@ -0,0 +1,432 @@
+"""スクレイピング結果を逐次ファイルへ書き出すライター。
+
+出力形式は ``FORMATS`` のいずれかで、``open_writer`` で選ぶ。
+gzip 以外の圧縮 (zstd) と Parquet は任意の依存ライブラリ (zstandard / pyarrow) が必要。
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import zlib
+from typing import IO, Callable, Dict, List, Optional, TextIO, Tuple, Type
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 任意の依存
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 任意の依存
+    pyarrow = None
+    pq = None
+
+
+class ResultWriter:
+    """結果を1行ずつ書き出し、定期的にフラッシュ・fsyncするライターの基底クラス。
+
+    列は ``fieldnames`` で最初に固定する。列を固定する形式では、列に含まれないキーを
+    ``<出力ファイル名>.extra.jsonl`` に行番号と求人URLとともに書き出す。
+    ファイルは最初の行を書き込む時点で作成する。``append`` が真で既存ファイルが
+    あれば追記する (行番号は ``start_row`` から続ける)。
+    ``on_flush`` は書き込んだ行が読み出せる状態になるたびに書き込み済み件数を引数に呼ばれる。
+    """
+
+    # 列に含まれないキーを .extra.jsonl に分けるかどうか
+    separate_extras = True
+
+    def __init__(
+        self,
+        filepath: str,
+        fieldnames: List[str],
+        flush_every: int = 10,
+        fsync_every: int = 100,
+        append: bool = False,
+        start_row: int = 0,
+        on_flush: Optional[Callable[[int], None]] = None,
+    ):
+        self.filepath = filepath
+        self.extra_filepath = f"{filepath}.extra.jsonl"
+        self.fieldnames = list(fieldnames)
+        self.flush_every = max(1, flush_every)
+        self.fsync_every = max(1, fsync_every)
+        self.append = append
+        self.on_flush = on_flush
+        self.start_row = start_row
+        self.rows_written = 0
+        self.extra_rows_written = 0
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._fieldname_set = set(self.fieldnames)
+        self._opened = False
+        self._extra_file: Optional[TextIO] = None
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _appending(self) -> bool:
+        return self.append and os.path.exists(self.filepath) and os.path.getsize(self.filepath) > 0
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.filepath)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _write_row(self, row: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    def _sync(self, fsync: bool) -> bool:
+        """書き込んだ行をOSへ (``fsync`` なら ディスクへ) 書き出し、読み出せる状態になれば True を返す。"""
+        raise NotImplementedError
+
+    def _close_files(self) -> None:
+        raise NotImplementedError
+
+    def write(self, row: Dict[str, str]) -> None:
+        """1件の結果を書き込む。"""
+        if not self._opened:
+            self._open()
+            self._opened = True
+        self._write_row(row)
+        self.rows_written += 1
+
+        if self.separate_extras:
+            extras = {key: value for key, value in row.items() if key not in self._fieldname_set}
+            if extras:
+                self._write_extras(row, extras)
+
+        if self.rows_written % self.fsync_every == 0:
+            self.checkpoint()
+        elif self.rows_written % self.flush_every == 0:
+            self.flush()
+
+    def _write_extras(self, row: Dict[str, str], extras: Dict[str, str]) -> None:
+        if self._extra_file is None:
+            self._extra_file = open(self.extra_filepath, "a" if self.append else "w", encoding="utf-8")
+        record = {"row": self.start_row + self.rows_written, "求人URL": row.get("求人URL"), "fields": extras}
+        self._extra_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.extra_rows_written += 1
+
+    def _sync_extras(self, fsync: bool) -> None:
+        if self._extra_file is not None:
+            self._extra_file.flush()
+            if fsync:
+                os.fsync(self._extra_file.fileno())
+
+    def flush(self) -> None:
+        """バッファをOSへ書き出す。"""
+        if not self._opened:
+            return
+        self._sync_extras(False)
+        if self._sync(False) and self.on_flush:
+            self.on_flush(self.start_row + self.rows_written)
+
+    def checkpoint(self) -> None:
+        """ディスクへ同期する。"""
+        if not self._opened:
+            return
+        self._sync_extras(True)
+        if self._sync(True) and self.on_flush:
+            self.on_flush(self.start_row + self.rows_written)
+        self.logger.debug("結果ファイルを同期しました rows=%d", self.rows_written)
+
+    def close(self) -> None:
+        if not self._opened:
+            return
+        self.checkpoint()
+        self._close_files()
+        if self._extra_file is not None:
+            self._extra_file.close()
+            self._extra_file = None
+        self._opened = False
+
+
+class CsvResultWriter(ResultWriter):
+    """結果を1行ずつCSVに書き出すライター。既存ファイルへの追記時はヘッダーを書かない。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._file: Optional[TextIO] = None
+        self._writer: Optional[csv.DictWriter] = None
+
+    def _open(self) -> None:
+        super()._open()
+        appending = self._appending()
+        self._file = open(self.filepath, "a" if appending else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(
+            self._file, fieldnames=self.fieldnames, restval="N/A", extrasaction="ignore"
+        )
+        if not appending:
+            self._writer.writeheader()
+
+    def _write_row(self, row: Dict[str, str]) -> None:
+        self._writer.writerow(row)
+
+    def _sync(self, fsync: bool) -> bool:
+        self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+        return True
+
+    def _close_files(self) -> None:
+        self._file.close()
+        self._file = None
+
+
+class JsonlResultWriter(ResultWriter):
+    """結果を1行1件のJSONで書き出すライター。``compression`` は None / "gzip" / "zstd"。
+
+    すべての項目をそのまま書き出すため .extra.jsonl は作らない。``fieldnames`` の項目が
+    欠けていれば CSV と同じく "N/A" で補う。圧縮時はディスクへ同期するたびに gzip のメンバー
+    (zstd のフレーム) を閉じ、進捗はその時点で通知する。追記時は末尾の閉じていない
+    メンバーを切り詰めてから新しいメンバーを連結する。
+    """
+
+    separate_extras = False
+
+    def __init__(self, *args, compression: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if compression == "zstd":
+            check_available("jsonl.zst")
+        self.compression = compression
+        self._raw: Optional[IO[bytes]] = None
+        self._stream: Optional[IO[bytes]] = None
+        self._file: Optional[TextIO] = None
+
+    def _open(self) -> None:
+        super()._open()
+        appending = self._appending()
+        if appending and self.compression:
+            self._truncate_incomplete_tail()
+        self._raw = open(self.filepath, "ab" if appending else "wb")
+
+    def _truncate_incomplete_tail(self) -> None:
+        with open(self.filepath, "rb") as f:
+            data = f.read()
+        complete = _complete_length(data, self.compression)
+        if complete < len(data):
+            self.logger.warning(
+                "%s の末尾の不完全な圧縮データ (%d バイト) を切り詰めます。", self.filepath, len(data) - complete
+            )
+            with open(self.filepath, "r+b") as f:
+                f.truncate(complete)
+
+    def _open_stream(self) -> None:
+        if self.compression == "gzip":
+            self._stream = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        elif self.compression == "zstd":
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._raw, closefd=False)
+        else:
+            self._stream = self._raw
+        self._file = io.TextIOWrapper(self._stream, encoding="utf-8", newline="\n", write_through=True)
+
+    def _finish_stream(self) -> None:
+        """書き込み中の gzip メンバー (zstd フレーム) を閉じる。"""
+        self._file.flush()
+        self._file.detach()
+        if self._stream is not self._raw:
+            # GzipFile / stream_writer(closefd=False) は下位のファイルを閉じない
+            self._stream.close()
+        self._stream = self._file = None
+
+    def _write_row(self, row: Dict[str, str]) -> None:
+        if self._file is None:
+            self._open_stream()
+        record = {key: row.get(key, "N/A") for key in self.fieldnames}
+        record.update(row)
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _sync(self, fsync: bool) -> bool:
+        if self._file is not None:
+            if fsync and self.compression:
+                self._finish_stream()
+            else:
+                # 圧縮時はブロックを区切って書き出す (閉じるまでは寛容な読み手でのみ読める)
+                self._file.flush()
+        self._raw.flush()
+        if fsync:
+            os.fsync(self._raw.fileno())
+        return fsync or not self.compression
+
+    def _close_files(self) -> None:
+        if self._file is not None:
+            self._finish_stream()
+        self._raw.close()
+        self._raw = None
+
+
+def _complete_length(data: bytes, compression: str) -> int:
+    """連結された gzip メンバー (zstd フレーム) のうち、完結している部分のバイト数を返す。"""
+    error = zlib.error if compression == "gzip" else zstandard.ZstdError
+    offset = 0
+    while offset < len(data):
+        if compression == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+        try:
+            decompressor.decompress(data[offset:])
+        except error:
+            break
+        if not decompressor.eof:
+            break
+        offset = len(data) - len(decompressor.unused_data)
+    return offset
+
+
+class ParquetResultWriter(ResultWriter):
+    """結果を Parquet のデータセット (ディレクトリ) に書き出すライター。
+
+    1回の実行の結果を1つのパートファイル (``part-00000.parquet`` …) に書き、
+    ``ROW_GROUP_ROWS`` 件ごとに行グループとして追記する。Parquet はフッターを書くまで
+    読み出せないため、パートを閉じた時点 (``close`` と、``rows_per_part`` 件に達した時点)
+    で進捗を通知する。書き込み中のパートは一時ファイルで、停止した場合は次の実行で削除する。
+    追記時は既存のパートに続く番号で新しいパートを作る。列はすべて文字列で、
+    ``dictionary_fields`` の列は辞書エンコードする。
+    """
+
+    # 行グループの件数 (辞書は行グループごとに作られるため、小さすぎると辞書エンコードが効かない)
+    ROW_GROUP_ROWS = 5000
+
+    def __init__(
+        self,
+        *args,
+        dictionary_fields: Optional[List[str]] = None,
+        rows_per_part: int = 100_000,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        check_available("parquet")
+        # 先頭が "_" / "." のファイルはデータセットの読み込み時に無視される
+        self.extra_filepath = os.path.join(self.filepath, "_extra.jsonl")
+        self.dictionary_fields = [f for f in (dictionary_fields or []) if f in self._fieldname_set]
+        self.rows_per_part = max(1, rows_per_part)
+        self._schema = pyarrow.schema([(name, pyarrow.string()) for name in self.fieldnames])
+        self._buffer: List[Dict[str, str]] = []
+        self._next_part = 0
+        self._part: Optional["pq.ParquetWriter"] = None
+        self._part_rows = 0
+        self._closing = False
+
+    def _part_paths(self) -> Tuple[str, str]:
+        """書き込み中のパートの (パス, 一時ファイルのパス) を返す。"""
+        part_name = f"part-{self._next_part:05d}.parquet"
+        return os.path.join(self.filepath, part_name), os.path.join(self.filepath, f".{part_name}.tmp")
+
+    def _open(self) -> None:
+        os.makedirs(self.filepath, exist_ok=True)
+        for name in os.listdir(self.filepath):
+            stale_part = name.startswith(".part-") and name.endswith(".tmp")
+            if stale_part or (not self.append and name.startswith("part-") and name.endswith(".parquet")):
+                os.remove(os.path.join(self.filepath, name))
+        existing = [name for name in os.listdir(self.filepath) if name.startswith("part-") and name.endswith(".parquet")]
+        self._next_part = len(existing)
+
+    def _write_row(self, row: Dict[str, str]) -> None:
+        self._buffer.append({key: row.get(key, "N/A") for key in self.fieldnames})
+        if len(self._buffer) >= self.ROW_GROUP_ROWS:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if not self._buffer:
+            return
+        if self._part is None:
+            self._part = pq.ParquetWriter(
+                self._part_paths()[1],
+                self._schema,
+                compression="zstd",
+                use_dictionary=self.dictionary_fields or False,
+            )
+        columns = {name: [row[name] for row in self._buffer] for name in self.fieldnames}
+        self._part.write_table(pyarrow.table(columns, schema=self._schema), row_group_size=len(self._buffer))
+        self._part_rows += len(self._buffer)
+        self._buffer = []
+
+    def _sync(self, fsync: bool) -> bool:
+        # パートを閉じるまでは読み出せないため、閉じたときだけ書き込み済みとして通知する
+        if not fsync or not (self._closing or self._part_rows + len(self._buffer) >= self.rows_per_part):
+            return False
+        self._write_row_group()
+        if self._part is None:
+            return False
+        self._part.close()
+        self._part = None
+        self._part_rows = 0
+        part_path, tmp_path = self._part_paths()
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, part_path)
+        self._next_part += 1
+        return True
+
+    def close(self) -> None:
+        self._closing = True
+        try:
+            super().close()
+        finally:
+            self._closing = False
+
+    def _close_files(self) -> None:
+        self._buffer = []
+        if self._part is not None:
+            # パートを閉じる前に失敗した場合は書きかけのパートを残さない
+            self._part.close()
+            self._part = None
+            os.remove(self._part_paths()[1])
+
+
+# 出力形式 → (ライタークラス, 拡張子, ライターへの追加引数)
+FORMATS: Dict[str, tuple] = {
+    "csv": (CsvResultWriter, ".csv", {}),
+    "jsonl": (JsonlResultWriter, ".jsonl", {}),
+    "jsonl.gz": (JsonlResultWriter, ".jsonl.gz", {"compression": "gzip"}),
+    "jsonl.zst": (JsonlResultWriter, ".jsonl.zst", {"compression": "zstd"}),
+    "parquet": (ParquetResultWriter, ".parquet", {}),
+}
+
+
+def extension(output_format: str) -> str:
+    """出力形式に対応するファイルの拡張子を返す。"""
+    return FORMATS[output_format][1]
+
+
+def format_from_path(filepath: str) -> str:
+    """出力ファイルのパスから出力形式を判定する (再開時に使う)。"""
+    for name, (_, suffix, _) in sorted(FORMATS.items(), key=lambda item: -len(item[1][1])):
+        if filepath.endswith(suffix):
+            return name
+    return "csv"
+
+
+def strip_extension(filepath: str) -> str:
+    """出力ファイルのパスから出力形式の拡張子を除いたパスを返す。"""
+    suffix = extension(format_from_path(filepath))
+    if filepath.endswith(suffix):
+        return filepath[: -len(suffix)]
+    return os.path.splitext(filepath)[0]
+
+
+def check_available(output_format: str) -> None:
+    """出力形式に必要な任意の依存が使えなければ ImportError を送出する。"""
+    if output_format == "jsonl.zst" and zstandard is None:
+        raise ImportError("jsonl.zst 形式での出力には zstandard のインストールが必要です (pip install zstandard)")
+    if output_format == "parquet" and pyarrow is None:
+        raise ImportError("parquet 形式での出力には pyarrow のインストールが必要です (pip install pyarrow)")
+
+
+def open_writer(output_format: str, filepath: str, fieldnames: List[str], **kwargs) -> ResultWriter:
+    """出力形式に対応するライターを作る。任意の依存がなければ ImportError を送出する。"""
+    writer_class: Type[ResultWriter]
+    writer_class, _, options = FORMATS[output_format]
+    if writer_class is not ParquetResultWriter:
+        kwargs.pop("dictionary_fields", None)
+        kwargs.pop("rows_per_part", None)
+    return writer_class(filepath, fieldnames, **options, **kwargs)